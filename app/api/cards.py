@@ -1,17 +1,31 @@
 """
 卡片 CRUD API 端点
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from datetime import date, datetime
 import asyncio
+import base64
+import csv
+import io
+import zlib
 import httpx
 
 from .. import crud, schemas, models
-from ..database import get_db
+from ..database import get_async_db, AsyncSessionLocal
 from ..utils.activation import auto_activate_if_needed, extract_card_info, query_card_from_api, get_card_transactions, is_card_activated
-from ..utils.auth import get_current_user
+from ..utils.auth import get_current_user, get_optional_user
 from ..utils.vocard import verify_3ds_code
+from ..utils.cache import card_list_cache, card_record_cache, card_stats_cache, write_generation
+from ..utils.provider_limits import provider_limits
+from ..utils.log_archive import activation_log_archiver
+from ..utils.batch_activation import resolve_max_retries, run_batch_activation
+from ..utils.activation_jobs import activation_job_manager, check_job_token, new_job_token
+from ..utils import json_codec
+from ..utils.json_codec import response_json
 
 router = APIRouter(prefix="/cards", tags=["cards"])
 
@@ -19,19 +33,54 @@ router = APIRouter(prefix="/cards", tags=["cards"])
 @router.post("/", response_model=schemas.CardResponse, status_code=201)
 async def create_card(
     card: schemas.CardCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """创建新卡片（需要鉴权）"""
     # 检查卡密是否已存在
-    existing_card = crud.get_card_by_id(db, card.card_id)
+    existing_card = await crud.get_card_by_id(db, card.card_id)
     if existing_card:
         raise HTTPException(status_code=400, detail="卡密已存在")
 
-    db_card = crud.create_card(db, card)
+    db_card = await crud.create_card(db, card)
     return db_card
 
 
+def _encode_cursor(after_id: int) -> str:
+    """将分页位置编码为不透明游标"""
+    raw = json_codec.dumps({"id": after_id})
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    """解析分页游标，返回上一页最后一张卡片的 id"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after_id = json_codec.loads(base64.urlsafe_b64decode(padded))["id"]
+        if not isinstance(after_id, int):
+            raise ValueError(after_id)
+        return after_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
+# 精简模式可选字段（与 CardResponse 一致）
+LEAN_FIELDS = set(schemas.CardResponse.model_fields)
+
+
+def _parse_fields(fields: str) -> list[str]:
+    """解析精简模式字段列表，id 总是放在第一列（游标分页依赖 id）"""
+    columns = ["id"]
+    for name in fields.split(","):
+        name = name.strip()
+        if not name or name in columns:
+            continue
+        if name not in LEAN_FIELDS:
+            raise HTTPException(status_code=400, detail=f"不支持的字段: {name}")
+        columns.append(name)
+    return columns
+
+
 @router.get("/", response_model=schemas.CardListResponse)
 async def list_cards(
     skip: int = Query(0, ge=0),
@@ -44,15 +93,21 @@ async def list_cards(
     is_sold: Optional[bool] = Query(None, description="售卖状态筛选"),
     card_header: Optional[str] = Query(None, description="卡头筛选"),
     exclude_deleted: bool = Query(False, description="是否排除已删除的卡片"),
-    db: Session = Depends(get_db),
+    paginate: str = Query("offset", pattern="^(offset|cursor)$", description="分页模式：offset(skip/limit) 或 cursor(游标)"),
+    cursor: Optional[str] = Query(None, description="游标分页：上一页返回的 next_cursor（传入时自动使用游标模式）"),
+    fields: Optional[str] = Query(None, description="精简模式：只返回指定字段，逗号分隔（如 card_id,status,card_limit），id 总是返回"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """获取卡片列表（支持分页、筛选、搜索）（需要鉴权）"""
-    cards, total = crud.get_cards(
-        db, 
-        skip=skip, 
-        limit=limit, 
-        status=status, 
+    """获取卡片列表（支持分页、筛选、搜索）（需要鉴权）
+
+    - 偏移分页（默认）：skip/limit，返回 total
+    - 游标分页：paginate=cursor 或传入 cursor，按 id 排序，返回 next_cursor；
+      只有首页返回 total，深度翻页的响应时间保持不变
+    - 精简模式：传入 fields 时只查询这些列，直接以字典返回，不构造 ORM 对象、不做逐行校验
+    """
+    filters = dict(
+        status=status,
         search=search,
         card_limit=card_limit,
         refund_requested=refund_requested,
@@ -61,22 +116,277 @@ async def list_cards(
         card_header=card_header,
         exclude_deleted=exclude_deleted
     )
+
+    use_cursor = paginate == "cursor" or cursor is not None
+    after_id = _decode_cursor(cursor) if cursor else None
+    columns = _parse_fields(fields) if fields else None
+
+    # 按完整筛选条件查缓存，任何卡片写入都会使缓存失效
+    cache_key = (
+        ("cursor", after_id) if use_cursor else ("offset", skip),
+        limit,
+        tuple(sorted(filters.items())),
+        tuple(columns) if columns else None
+    )
+    cached = card_list_cache.get(cache_key)
+    if cached is None:
+        generation = write_generation.value
+        if use_cursor:
+            cards, total, next_after_id = await crud.get_cards_after(
+                db,
+                after_id=after_id,
+                limit=limit,
+                with_total=after_id is None,
+                columns=columns,
+                **filters
+            )
+        else:
+            cards, total = await crud.get_cards(db, skip=skip, limit=limit, columns=columns, **filters)
+            next_after_id = None
+        if columns is None:
+            items = [schemas.CardResponse.model_validate(card) for card in cards]
+        else:
+            # 数据库中的数据可信，精简模式不做逐行校验（地址字段已由地址字典解析）
+            items = cards
+        card_list_cache.set(cache_key, generation, (items, total, next_after_id))
+    else:
+        items, total, next_after_id = cached
+
+    if use_cursor:
+        payload = {
+            "items": items,
+            "total": total,
+            "skip": 0,
+            "limit": limit,
+            "next_cursor": _encode_cursor(next_after_id) if next_after_id is not None else None
+        }
+    else:
+        payload = {
+            "items": items,
+            "total": total,
+            "skip": skip,
+            "limit": limit
+        }
+
+    if columns is not None:
+        # 精简模式的列表项不是完整的 CardResponse，跳过响应模型校验直接序列化
+        return Response(content=json_codec.dumps(payload), media_type="application/json")
+    return payload
+
+
+@router.get("/cache/stats", response_model=schemas.APIResponse)
+async def get_cache_stats(
+    current_user: dict = Depends(get_current_user)
+):
+    """获取卡片列表缓存、统计缓存和单卡记录缓存的命中统计（需要鉴权）"""
+    return {
+        "success": True,
+        "message": "查询成功",
+        "data": {
+            "card_list": card_list_cache.stats(),
+            "card_stats": card_stats_cache.stats(),
+            "card_record": card_record_cache.stats()
+        }
+    }
+
+
+@router.get("/providers/stats", response_model=schemas.APIResponse)
+async def get_provider_stats(
+    current_user: dict = Depends(get_current_user)
+):
+    """获取各上游渠道的限额、进行中和排队中的请求数（需要鉴权）"""
     return {
-        "items": cards,
-        "total": total,
-        "skip": skip,
-        "limit": limit
+        "success": True,
+        "message": "查询成功",
+        "data": provider_limits.stats()
     }
 
 
+@router.get("/stats", response_model=schemas.APIResponse)
+async def get_card_stats(
+    status: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    card_limit: Optional[float] = Query(None, description="卡片额度筛选"),
+    refund_requested: Optional[bool] = Query(None, description="退款状态筛选"),
+    is_used: Optional[bool] = Query(None, description="使用状态筛选"),
+    is_sold: Optional[bool] = Query(None, description="售卖状态筛选"),
+    card_header: Optional[str] = Query(None, description="卡头筛选"),
+    exclude_deleted: bool = Query(False, description="是否排除已删除的卡片"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    卡片统计（需要鉴权）
+    按状态、激活、使用/售卖/退款标记、额度、卡头分组计数，支持与列表相同的筛选条件
+    """
+    filters = dict(
+        status=status,
+        search=search,
+        card_limit=card_limit,
+        refund_requested=refund_requested,
+        is_used=is_used,
+        is_sold=is_sold,
+        card_header=card_header,
+        exclude_deleted=exclude_deleted
+    )
+
+    cache_key = tuple(sorted(filters.items()))
+    stats = card_stats_cache.get(cache_key)
+    if stats is None:
+        generation = write_generation.value
+        stats = await crud.get_card_stats(db, **filters)
+        card_stats_cache.set(cache_key, generation, stats)
+
+    return {
+        "success": True,
+        "message": "查询成功",
+        "data": stats
+    }
+
+
+@router.get("/stats/summary", response_model=schemas.APIResponse)
+async def get_card_summary(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    管理界面概览计数（需要鉴权）
+    读取增量维护的计数表，不随卡片数量增长
+    """
+    return {
+        "success": True,
+        "message": "查询成功",
+        "data": await crud.get_card_counters(db)
+    }
+
+
+@router.get("/logs/archive", response_model=schemas.APIResponse)
+async def search_archived_logs(
+    card_id: Optional[str] = Query(None, description="卡密"),
+    start_date: Optional[date] = Query(None, description="开始日期（UTC，YYYY-MM-DD）"),
+    end_date: Optional[date] = Query(None, description="结束日期（UTC，YYYY-MM-DD）"),
+    status: Optional[str] = Query(None, description="激活状态：success / failed"),
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    检索已归档的激活记录（需要鉴权）
+    超过保留天数的激活记录会从数据库移到按天压缩的归档文件中
+    """
+    items = await asyncio.to_thread(
+        activation_log_archiver.search,
+        card_id=card_id,
+        start_date=start_date,
+        end_date=end_date,
+        status=status,
+        limit=limit
+    )
+    return {
+        "success": True,
+        "message": f"找到 {len(items)} 条归档记录",
+        "data": {
+            "items": items,
+            "archived_days": [day.isoformat() for day in activation_log_archiver.archived_days()]
+        }
+    }
+
+
+# 可导出的列（cards 表全部字段，address_id 展开为账单地址和详细地址，默认全部导出）
+EXPORT_COLUMNS = [
+    name
+    for column in models.Card.__table__.columns
+    for name in (("billing_address", "legal_address") if column.key == "address_id" else (column.key,))
+]
+
+
+def _export_value(value):
+    """导出值格式化：时间转 ISO 格式字符串"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+@router.get("/export")
+async def export_cards(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="导出格式：csv 或 ndjson"),
+    columns: Optional[str] = Query(None, description="导出的列，逗号分隔（默认全部）"),
+    gzip: bool = Query(False, description="是否 gzip 压缩"),
+    status: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    card_limit: Optional[float] = Query(None, description="卡片额度筛选"),
+    refund_requested: Optional[bool] = Query(None, description="退款状态筛选"),
+    is_used: Optional[bool] = Query(None, description="使用状态筛选"),
+    is_sold: Optional[bool] = Query(None, description="售卖状态筛选"),
+    card_header: Optional[str] = Query(None, description="卡头筛选"),
+    exclude_deleted: bool = Query(False, description="是否排除已删除的卡片"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    导出卡片（需要鉴权）
+    支持与列表相同的筛选条件；按 id 顺序流式读取、边查询边输出，内存占用与导出数量无关
+    """
+    selected = [name.strip() for name in columns.split(",") if name.strip()] if columns else EXPORT_COLUMNS
+    unknown = [name for name in selected if name not in EXPORT_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的导出列: {', '.join(unknown)}")
+
+    filters = dict(
+        status=status,
+        search=search,
+        card_limit=card_limit,
+        refund_requested=refund_requested,
+        is_used=is_used,
+        is_sold=is_sold,
+        card_header=card_header,
+        exclude_deleted=exclude_deleted
+    )
+
+    def encode_rows(rows) -> str:
+        if format == "ndjson":
+            return "".join(json_codec.dumps_str(dict(zip(selected, row))) + "\n" for row in rows)
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([_export_value(value) for value in row] for row in rows)
+        return buffer.getvalue()
+
+    async def generate_text():
+        if format == "csv":
+            # 先输出表头，客户端立即开始接收
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(selected)
+            yield buffer.getvalue()
+        async with AsyncSessionLocal() as db:
+            async for rows in crud.stream_card_rows(db, selected, **filters):
+                yield encode_rows(rows)
+
+    async def generate():
+        if not gzip:
+            async for text in generate_text():
+                yield text.encode("utf-8")
+            return
+        compressor = zlib.compressobj(wbits=31)  # gzip 格式
+        async for text in generate_text():
+            chunk = compressor.compress(text.encode("utf-8"))
+            if chunk:
+                yield chunk
+        yield compressor.flush()
+
+    filename = f"cards-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson")
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/{card_id}", response_model=schemas.CardResponse)
 async def get_card(
     card_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """获取单个卡片信息（需要鉴权）"""
-    db_card = crud.get_card_by_id(db, card_id)
+    db_card = await crud.get_card_by_id(db, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="卡片不存在")
     return db_card
@@ -85,24 +395,24 @@ async def get_card(
 @router.get("/public/{card_id}", response_model=schemas.CardResponse)
 async def get_card_for_copy(
     card_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取单个卡片信息（不需要鉴权，用于复制卡片信息）"""
-    db_card = crud.get_card_by_id(db, card_id)
-    if not db_card:
+    card = await crud.get_card_record(db, card_id)
+    if not card:
         raise HTTPException(status_code=404, detail="卡片不存在")
-    return db_card
+    return card
 
 
 @router.put("/{card_id}", response_model=schemas.CardResponse)
 async def update_card(
     card_id: str,
     card_update: schemas.CardUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """更新卡片信息（需要鉴权）"""
-    db_card = crud.update_card(db, card_id, card_update)
+    db_card = await crud.update_card(db, card_id, card_update)
     if not db_card:
         raise HTTPException(status_code=404, detail="卡片不存在")
     return db_card
@@ -111,11 +421,11 @@ async def update_card(
 @router.delete("/{card_id}", response_model=schemas.APIResponse)
 async def delete_card(
     card_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """删除卡片（软删除）（需要鉴权）"""
-    success = crud.delete_card(db, card_id)
+    success = await crud.delete_card(db, card_id)
     if not success:
         raise HTTPException(status_code=404, detail="卡片不存在")
     return {"success": True, "message": "卡片已删除"}
@@ -123,12 +433,12 @@ async def delete_card(
 
 @router.post("/batch/activate", response_model=schemas.APIResponse)
 async def batch_activate_cards(
-    card_ids: schemas.BatchActivateRequest,
-    db: Session = Depends(get_db)
+    card_ids: schemas.BatchActivateRequest
 ):
     """
     批量激活卡片（并发处理）
-    支持同时激活多张卡片，自动重试失败的卡片
+    支持同时激活多张卡片，自动重试失败的卡片（执行逻辑见 app/utils/batch_activation.py）
+    大批量建议使用后台任务接口 /batch/jobs，避免请求超时丢失结果
     """
     if not card_ids.card_ids:
         raise HTTPException(status_code=400, detail="卡片ID列表不能为空")
@@ -136,205 +446,14 @@ async def batch_activate_cards(
     print(f"\n{'#'*60}")
     print(f"[批量激活] 开始批量激活 {len(card_ids.card_ids)} 张卡片")
     print(f"[批量激活] 并发数: {card_ids.concurrency}")
-    print(f"[批量激活] 最大重试次数: {card_ids.max_retries}")
+    print(f"[批量激活] 最大重试次数: {resolve_max_retries(card_ids.max_retries)}")
     print(f"{'#'*60}\n")
     
-    # 创建信号量来限制并发数
-    semaphore = asyncio.Semaphore(card_ids.concurrency)
-    
-    # 存储激活结果
-    results = {
-        "success": [],
-        "failed": [],
-        "total": len(card_ids.card_ids),
-        "success_count": 0,
-        "failed_count": 0
-    }
-    
-    async def activate_single_card(card_id: str, retry_count: int = 0):
-        """激活单张卡片（带重试逻辑）"""
-        async with semaphore:  # 限制并发数
-            retry_text = f" (重试 {retry_count}/{card_ids.max_retries})" if retry_count > 0 else ""
-            print(f"[批量激活] 正在处理: {card_id}{retry_text}")
-            
-            try:
-                # 检查本地数据库是否已有该卡且已激活
-                db_card = crud.get_card_by_id(db, card_id)
-                if db_card and db_card.is_activated:
-                    print(f"[批量激活] ✓ 本地已激活，跳过API请求: {card_id}")
-                    result = {
-                        "card_id": card_id,
-                        "success": True,
-                        "message": "卡片已激活 (从本地读取)",
-                        "retry_count": retry_count,
-                        "status": "已激活"
-                    }
-                    results["success"].append(result)
-                    results["success_count"] += 1
-                    return result
-
-                # 自动激活流程
-                success, card_data, message = await auto_activate_if_needed(card_id)
-                
-                if not success:
-                    # 激活失败
-                    # 尝试记录日志（如果卡片存在）
-                    db_card = crud.get_card_by_id(db, card_id)
-                    if db_card:
-                        crud.create_activation_log(db, card_id, "failed", error_message=message)
-                    
-                    # 检查是否需要重试
-                    # 如果错误信息表明卡密无效或已使用，不再重试
-                    stop_keywords = ["已失效", "已使用", "already used", "invalid", "not found", "不存在", "已激活", "activated"]
-                    should_stop = any(kw in str(message) for kw in stop_keywords)
-
-                    if not should_stop and retry_count < card_ids.max_retries:
-                        print(f"[批量激活] ⚠️  失败，将重试: {card_id}")
-                        await asyncio.sleep(1)  # 延迟后重试
-                        return await activate_single_card(card_id, retry_count + 1)
-                    elif should_stop:
-                        print(f"[批量激活] 🛑 致命错误(不重试): {card_id} - {message}")
-                    else:
-                        result = {
-                            "card_id": card_id,
-                            "success": False,
-                            "message": message,
-                            "retry_count": retry_count
-                        }
-                        results["failed"].append(result)
-                        results["failed_count"] += 1
-                        print(f"[批量激活] ✗ 最终失败: {card_id} - {message}")
-                        return result
-                
-                # 验证卡片是否真正激活（status == "已激活"/或者有数据）
-                if not is_card_activated(card_data):
-                    status = card_data.get("status") if card_data else "未知"
-                    error_msg = f"激活未完成: 卡片状态为 {status}"
-                    
-                    db_card = crud.get_card_by_id(db, card_id)
-                    if db_card:
-                        crud.create_activation_log(db, card_id, "failed", error_message=error_msg)
-                    
-                    # 检查是否需要重试
-                    if retry_count < card_ids.max_retries:
-                        print(f"[批量激活] ⚠️  状态异常，将重试: {card_id} - {error_msg}")
-                        await asyncio.sleep(1)
-                        return await activate_single_card(card_id, retry_count + 1)
-                    else:
-                        result = {
-                            "card_id": card_id,
-                            "success": False,
-                            "message": error_msg,
-                            "retry_count": retry_count
-                        }
-                        results["failed"].append(result)
-                        results["failed_count"] += 1
-                        print(f"[批量激活] ✗ 最终失败: {card_id} - {error_msg}")
-                        return result
-                
-                # 提取卡片信息并验证
-                card_info = extract_card_info(card_data)
-                
-                # 如果没有卡号但激活成功，尽量接受（取决于业务需求，这里先暂时要求必须有卡号）
-                if not card_info.get("card_number"):
-                    # 尝试宽容处理，如果没有卡号，可能是还在处理中?
-                    # 但为了保证一致性，如果真的“已激活”应该有卡号。
-                    pass
-                
-                # 更新或创建数据库记录
-                from datetime import datetime
-                exp_date = None
-                if card_info.get("exp_date"):
-                    try:
-                        exp_date = datetime.fromisoformat(card_info["exp_date"].replace('Z', '+00:00'))
-                    except:
-                        pass
-                
-                # 尝试更新，如果返回None说明卡片不存在，需要创建
-                print(f"[批量激活-存入数据库] CardID: {card_id}, exp_date: {exp_date}")
-                db_card = crud.activate_card_in_db(
-                    db,
-                    card_id,
-                    str(card_info.get("card_number") or ""),
-                    str(card_info.get("card_cvc") or ""),
-                    str(card_info.get("card_exp_date") or ""),
-                    billing_address=card_info.get("billing_address"),
-                    validity_hours=card_info.get("validity_hours"),
-                    exp_date=exp_date,
-                    legal_address=card_info.get("legal_address")
-                )
-                
-                if not db_card:
-                    # 卡片不存在，自动创建
-                    print(f"[批量激活] ⚠️  本地库无此卡，正在自动创建: {card_id}")
-                    new_card = schemas.CardCreate(
-                        card_id=card_id,
-                        card_limit=float(card_info.get("card_limit") or 0.0),
-                        card_nickname=f"Auto-Import {card_info.get('card_limit') or ''}",
-                        validity_hours=card_info.get("validity_hours")
-                    )
-                    crud.create_card(db, new_card, is_external=True)
-                    # 再次尝试更新激活信息
-                    print(f"[批量激活-自动创建后存入] CardID: {card_id}, exp_date: {exp_date}")
-                    crud.activate_card_in_db(
-                        db,
-                        card_id,
-                        str(card_info.get("card_number") or ""),
-                        str(card_info.get("card_cvc") or ""),
-                        str(card_info.get("card_exp_date") or ""),
-                        card_info.get("billing_address"),
-                        validity_hours=card_info.get("validity_hours"),
-                        exp_date=exp_date,
-                        legal_address=card_info.get("legal_address")
-                    )
-                
-                try:
-                    crud.create_activation_log(db, card_id, "success")
-                except Exception:
-                    # 忽略日志创建失败（例如并发导致的主键冲突等，虽然不太可能）
-                    pass
-                
-                result = {
-                    "card_id": card_id,
-                    "success": True,
-                    "message": message,
-                    "retry_count": retry_count,
-                    "status": "已激活",
-                    "billing_address": card_info.get("billing_address"),
-                    "card_number": card_info.get("card_number"),
-                    "card_cvc": card_info.get("card_cvc"),
-                    "card_exp_date": card_info.get("card_exp_date"),
-                    "exp_date": card_info.get("exp_date"),
-                    "card_limit": card_info.get("card_limit")
-                }
-                results["success"].append(result)
-                results["success_count"] += 1
-                print(f"[批量激活] ✓ 成功: {card_id} (状态: 已激活)")
-                return result
-                
-            except Exception as e:
-                error_msg = f"处理异常: {str(e)}"
-                
-                # 检查是否需要重试
-                if retry_count < card_ids.max_retries:
-                    print(f"[批量激活] ⚠️  异常，将重试: {card_id} - {error_msg}")
-                    await asyncio.sleep(1)
-                    return await activate_single_card(card_id, retry_count + 1)
-                else:
-                    result = {
-                        "card_id": card_id,
-                        "success": False,
-                        "message": error_msg,
-                        "retry_count": retry_count
-                    }
-                    results["failed"].append(result)
-                    results["failed_count"] += 1
-                    print(f"[批量激活] ✗ 最终失败: {card_id} - {error_msg}")
-                    return result
-    
-    # 并发执行所有激活任务
-    tasks = [activate_single_card(card_id) for card_id in card_ids.card_ids]
-    await asyncio.gather(*tasks)
+    results = await run_batch_activation(
+        card_ids.card_ids,
+        concurrency=card_ids.concurrency,
+        max_retries=card_ids.max_retries
+    )
     
     print(f"\n{'#'*60}")
     print(f"[批量激活] 批量激活完成!")
@@ -350,10 +469,195 @@ async def batch_activate_cards(
     }
 
 
+# 流式批量激活在没有新结果时发送心跳注释的间隔（秒），避免代理断开空闲连接
+SSE_PING_INTERVAL = 15
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json_codec.dumps_str(data)}\n\n"
+
+
+@router.post("/batch/activate/stream")
+async def batch_activate_cards_stream(request: schemas.BatchActivateRequest):
+    """
+    流式批量激活（Server-Sent Events）
+    每张卡片得到最终结果时推送一条 result 事件，字段与 /batch/activate 的结果项一致；
+    开始时推送 start（total），结束时推送 done（total/success_count/failed_count），执行异常时推送 error。
+    服务端不保存完整结果列表；客户端断开连接时停止激活
+    """
+    if not request.card_ids:
+        raise HTTPException(status_code=400, detail="卡片ID列表不能为空")
+
+    total = len(request.card_ids)
+    print(f"[流式批量激活] 开始: {total} 张卡片, 并发数 {request.concurrency}")
+
+    async def generate():
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(run_batch_activation(
+            request.card_ids,
+            concurrency=request.concurrency,
+            max_retries=request.max_retries,
+            on_result=queue.put_nowait,
+            collect=False
+        ))
+        # 执行结束（包括异常）时放入 None 作为结束标记
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            yield _sse_event("start", {"total": total})
+            while True:
+                try:
+                    result = await asyncio.wait_for(queue.get(), timeout=SSE_PING_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if result is None:
+                    break
+                yield _sse_event("result", result)
+
+            if task.exception():
+                print(f"[流式批量激活] ✗ 执行异常: {task.exception()}")
+                yield _sse_event("error", {"message": f"批量激活异常: {task.exception()}"})
+                return
+            results = task.result()
+            print(f"[流式批量激活] 完成: 成功 {results['success_count']}/{results['total']}")
+            yield _sse_event("done", {
+                "total": results["total"],
+                "success_count": results["success_count"],
+                "failed_count": results["failed_count"]
+            })
+        finally:
+            if not task.done():
+                print(f"[流式批量激活] 客户端断开，停止激活")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _job_data(job: models.ActivationJob) -> dict:
+    return schemas.ActivationJobResponse.model_validate(job).model_dump()
+
+
+async def _get_authorized_job(
+    db: AsyncSession,
+    job_id: str,
+    current_user: Optional[dict],
+    job_token: Optional[str]
+) -> models.ActivationJob:
+    """读取任务并校验访问权限：已登录，或 X-Job-Token 与提交时返回的令牌一致"""
+    job = await crud.get_activation_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if current_user is None and not check_job_token(job, job_token):
+        raise HTTPException(status_code=403, detail="无权访问该任务")
+    return job
+
+
+@router.post("/batch/jobs", response_model=schemas.APIResponse, status_code=202)
+async def submit_batch_activation_job(request: schemas.BatchActivateRequest):
+    """
+    提交批量激活后台任务（立即返回任务 ID 和访问令牌 token）
+    通过 /batch/jobs/{job_id} 查询进度，/batch/jobs/{job_id}/results 分页读取结果；
+    未登录时这些接口需要在 X-Job-Token 请求头中带上 token（只在提交时返回一次）
+    """
+    if not request.card_ids:
+        raise HTTPException(status_code=400, detail="卡片ID列表不能为空")
+
+    token, token_hash = new_job_token()
+    job = await activation_job_manager.submit(request.card_ids, request.concurrency, request.max_retries, token_hash)
+    print(f"[批量激活任务] 已提交 {job.id}: {job.total} 张卡片, 并发数 {job.concurrency}")
+    return {
+        "success": True,
+        "message": f"批量激活任务已提交: {job.total} 张卡片",
+        "data": {**_job_data(job), "token": token}
+    }
+
+
+@router.get("/batch/jobs", response_model=schemas.APIResponse)
+async def list_batch_activation_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """最近的批量激活任务（需要鉴权）"""
+    jobs = await crud.list_activation_jobs(db, limit=limit)
+    return {
+        "success": True,
+        "message": "查询成功",
+        "data": {"items": [_job_data(job) for job in jobs]}
+    }
+
+
+@router.get("/batch/jobs/{job_id}", response_model=schemas.APIResponse)
+async def get_batch_activation_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[dict] = Depends(get_optional_user),
+    job_token: Optional[str] = Header(None, alias="X-Job-Token")
+):
+    """查询批量激活任务进度（需要鉴权或任务令牌）"""
+    job = await _get_authorized_job(db, job_id, current_user, job_token)
+    return {
+        "success": True,
+        "message": "查询成功",
+        "data": _job_data(job)
+    }
+
+
+@router.get("/batch/jobs/{job_id}/results", response_model=schemas.APIResponse)
+async def get_batch_activation_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    status: Optional[str] = Query(None, pattern="^(pending|success|failed|cancelled|interrupted)$", description="按卡片状态筛选"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[dict] = Depends(get_optional_user),
+    job_token: Optional[str] = Header(None, alias="X-Job-Token")
+):
+    """分页读取批量激活任务的结果（按提交顺序，结果项字段与同步批量激活接口一致；需要鉴权或任务令牌）"""
+    job = await _get_authorized_job(db, job_id, current_user, job_token)
+    items, total = await crud.get_activation_job_items(db, job_id, offset=offset, limit=limit, status=status)
+    return {
+        "success": True,
+        "message": "查询成功",
+        "data": {
+            "job": _job_data(job),
+            "items": items,
+            "total": total,
+            "offset": offset,
+            "limit": limit
+        }
+    }
+
+
+@router.post("/batch/jobs/{job_id}/cancel", response_model=schemas.APIResponse)
+async def cancel_batch_activation_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[dict] = Depends(get_optional_user),
+    job_token: Optional[str] = Header(None, alias="X-Job-Token")
+):
+    """取消批量激活任务（已激活成功的卡片不受影响，未处理的卡片记为 cancelled；需要鉴权或任务令牌）"""
+    job = await _get_authorized_job(db, job_id, current_user, job_token)
+    if not await activation_job_manager.cancel(job_id):
+        raise HTTPException(status_code=400, detail=f"任务已结束: {job.status}")
+    job = await crud.get_activation_job(db, job_id)
+    print(f"[批量激活任务] 已取消 {job_id}: 已处理 {job.processed}/{job.total}")
+    return {
+        "success": True,
+        "message": "任务已取消",
+        "data": _job_data(job)
+    }
+
+
 @router.post("/{card_id}/activate", response_model=schemas.ActivationResponse)
 async def activate_card(
     card_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     激活卡片（保留原有自动激活逻辑）
@@ -361,14 +665,14 @@ async def activate_card(
     2. 更新本地数据库（如果不存在则自动创建）
     3. 记录激活日志
     """
-    # 检查本地是否已激活
-    db_card = crud.get_card_by_id(db, card_id)
-    if db_card and db_card.is_activated:
+    # 检查本地是否已激活（读取单卡记录缓存）
+    card = await crud.get_card_record(db, card_id)
+    if card and card.is_activated:
         print(f"[激活卡片] ✓ 本地已激活，直接返回: {card_id}")
         return {
             "success": True,
             "message": "卡片已激活",
-            "card_data": db_card
+            "card_data": card
         }
 
     # 直接进行自动激活流程，不预检数据库
@@ -376,9 +680,8 @@ async def activate_card(
 
     if not success:
         # 尝试记录失败日志（如果卡片存在）
-        db_card = crud.get_card_by_id(db, card_id)
-        if db_card:
-            crud.create_activation_log(db, card_id, "failed", error_message=message)
+        if await crud.get_card_record(db, card_id):
+            crud.create_activation_log(card_id, "failed", error_message=message)
         raise HTTPException(status_code=400, detail=message)
 
     # 验证卡片是否真正激活
@@ -386,9 +689,8 @@ async def activate_card(
         status = card_data.get("status") if card_data else "未知"
         error_msg = f"激活未完成: 卡片状态为 {status}"
         
-        db_card = crud.get_card_by_id(db, card_id)
-        if db_card:
-            crud.create_activation_log(db, card_id, "failed", error_message=error_msg)
+        if await crud.get_card_record(db, card_id):
+            crud.create_activation_log(card_id, "failed", error_message=error_msg)
             
         raise HTTPException(status_code=400, detail=error_msg)
 
@@ -412,9 +714,9 @@ async def activate_card(
         except:
             pass
 
-    # 尝试更新
+    # 保存激活信息（本地不存在时自动创建为外部卡），直接返回写入后的卡片
     print(f"[单张激活-存入数据库] CardID: {card_id}, exp_date: {exp_date}")
-    db_card = crud.activate_card_in_db(
+    db_card = await crud.upsert_card_activation(
         db,
         card_id,
         str(card_info.get("card_number") or ""),
@@ -423,43 +725,17 @@ async def activate_card(
         card_info.get("billing_address"),
         validity_hours=card_info.get("validity_hours"),
         exp_date=exp_date,
-        legal_address=card_info.get("legal_address")
+        legal_address=card_info.get("legal_address"),
+        card_limit=card_info.get("card_limit"),
+        card_nickname=f"Auto-Active {card_info.get('card_limit') or ''}"
     )
 
-    if not db_card:
-         # 卡片不存在，自动创建
-        print(f"[激活卡片] ⚠️  本地库无此卡，正在自动创建: {card_id}")
-        new_card = schemas.CardCreate(
-            card_id=card_id,
-            card_limit=float(card_info.get("card_limit") or 0.0),
-            card_nickname=f"Auto-Active {card_info.get('card_limit') or ''}",
-            validity_hours=card_info.get("validity_hours")
-        )
-        crud.create_card(db, new_card, is_external=True)
-        
-        # 再次更新激活信息
-        print(f"[单张激活-自动创建后存入] CardID: {card_id}, exp_date: {exp_date}")
-        db_card = crud.activate_card_in_db(
-            db,
-            card_id,
-            str(card_info.get("card_number") or ""),
-            str(card_info.get("card_cvc") or ""),
-            str(card_info.get("card_exp_date") or ""),
-            card_info.get("billing_address"),
-            validity_hours=card_info.get("validity_hours"),
-            exp_date=exp_date,
-            legal_address=card_info.get("legal_address")
-        )
-
     # 记录成功日志
-    if db_card:
-        try:
-            crud.create_activation_log(db, card_id, "success")
-        except:
-            pass
+    try:
+        crud.create_activation_log(card_id, "success")
+    except:
+        pass
 
-    # 重新获取更新后的卡片
-    db_card = crud.get_card_by_id(db, card_id)
     return {
         "success": True,
         "message": message,
@@ -470,26 +746,26 @@ async def activate_card(
 @router.post("/{card_id}/query", response_model=schemas.ActivationResponse)
 async def query_card(
     card_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     从API查询卡片信息并更新数据库
     用于获取最新的卡片状态、过期时间等信息
     """
     # 检查卡片是否存在
-    db_card = crud.get_card_by_id(db, card_id)
-    if not db_card:
+    card = await crud.get_card_record(db, card_id)
+    if not card:
         raise HTTPException(status_code=404, detail="卡片不存在于本地数据库")
 
     # 针对 Vocard (LR-) 卡片的特殊处理
     # Vocard 是一次性激活，API 不支持查询（再次请求会提示失效）
     # 所以如果本地已经激活，直接返回本地数据，视为查询成功
-    if card_id.upper().startswith("LR-") and db_card.is_activated:
+    if card_id.upper().startswith("LR-") and card.is_activated:
         print(f"[查询卡片] LR-卡片已激活，跳过远程查询，直接返回本地数据: {card_id}")
         return {
             "success": True,
             "message": "查询成功 (本地缓存)",
-            "card_data": db_card
+            "card_data": card
         }
 
     # 从API查询卡片信息
@@ -519,7 +795,7 @@ async def query_card(
     # 如果有卡号信息，说明已激活，更新完整信息
     if card_info.get("card_number"):
         print(f"[查询卡片-存入数据库] CardID: {card_id}, exp_date: {exp_date}")
-        crud.activate_card_in_db(
+        db_card = await crud.upsert_card_activation(
             db,
             card_id,
             str(card_info["card_number"]),
@@ -532,12 +808,12 @@ async def query_card(
         )
     else:
         # 未激活，只更新基本信息和过期时间
-        db_card.validity_hours = card_info.get("validity_hours")
-        db_card.exp_date = exp_date
-        crud.update_card(db, card_id, update_data)
+        db_card = await crud.get_card_by_id(db, card_id)
+        if db_card:
+            db_card.validity_hours = card_info.get("validity_hours")
+            crud.set_card_exp_date(db_card, exp_date)
+            db_card = await crud.update_card(db, card_id, update_data)
 
-    # 重新获取更新后的卡片
-    db_card = crud.get_card_by_id(db, card_id)
     return {
         "success": True,
         "message": "查询成功",
@@ -548,11 +824,10 @@ async def query_card(
 @router.get("/{card_id}/logs", response_model=List[dict])
 async def get_activation_logs(
     card_id: str,
-    db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """获取卡片的激活历史记录（需要鉴权）"""
-    logs = crud.get_activation_logs(db, card_id)
+    logs = await crud.get_activation_logs(card_id)
     return [
         {
             "id": log.id,
@@ -567,31 +842,19 @@ async def get_activation_logs(
 @router.post("/{card_id}/refund", response_model=schemas.APIResponse)
 async def toggle_refund_status(
     card_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     切换卡片的退款状态（标记/取消标记退款）（需要鉴权）
     """
-    from datetime import datetime
-
-    db_card = crud.get_card_by_id(db, card_id)
+    db_card = await crud.get_card_by_id(db, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="卡片不存在")
 
     # 切换退款状态
-    db_card.refund_requested = not db_card.refund_requested
-
-    if db_card.refund_requested:
-        from datetime import timezone
-        db_card.refund_requested_time = datetime.now(timezone.utc)
-        message = "已标记为申请退款"
-    else:
-        db_card.refund_requested_time = None
-        message = "已取消退款标记"
-
-    db.commit()
-    db.refresh(db_card)
+    db_card = await crud.toggle_refund_requested(db, db_card)
+    message = "已标记为申请退款" if db_card.refund_requested else "已取消退款标记"
 
     return {
         "success": True,
@@ -603,30 +866,19 @@ async def toggle_refund_status(
 @router.post("/{card_id}/mark-used", response_model=schemas.APIResponse)
 async def toggle_used_status(
     card_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     切换卡片的使用状态（标记/取消标记已使用）（需要鉴权）
     """
-    from datetime import datetime, timezone
-
-    db_card = crud.get_card_by_id(db, card_id)
+    db_card = await crud.get_card_by_id(db, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="卡片不存在")
 
     # 切换使用状态
-    db_card.is_used = not db_card.is_used
-
-    if db_card.is_used:
-        db_card.used_time = datetime.now(timezone.utc)
-        message = "已标记为已使用"
-    else:
-        db_card.used_time = None
-        message = "已取消使用标记"
-
-    db.commit()
-    db.refresh(db_card)
+    db_card = await crud.toggle_used(db, db_card)
+    message = "已标记为已使用" if db_card.is_used else "已取消使用标记"
 
     return {
         "success": True,
@@ -638,57 +890,99 @@ async def toggle_used_status(
 @router.post("/{card_id}/mark-sold", response_model=schemas.APIResponse)
 async def toggle_sold_status(
     card_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     切换卡片的售卖状态（标记/取消标记已售卖）（需要鉴权）
     """
-    from datetime import datetime, timezone
-
-    db_card = crud.get_card_by_id(db, card_id)
+    db_card = await crud.get_card_by_id(db, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="卡片不存在")
 
     # 切换售卖状态
-    db_card.is_sold = not db_card.is_sold
+    db_card = await crud.toggle_sold(db, db_card)
+    message = "已标记为已售卖" if db_card.is_sold else "已取消售卖标记"
+
+    return {
+        "success": True,
+        "message": message,
+        "data": {"is_sold": db_card.is_sold}
+    }
+
 
-    if db_card.is_sold:
-        db_card.sold_time = datetime.now(timezone.utc)
-        message = "已标记为已售卖"
+@router.post("/batch/update", response_model=schemas.APIResponse)
+async def batch_update_cards(
+    request: schemas.CardBatchUpdateRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    批量修改卡片状态（需要鉴权）
+    按卡密列表或筛选条件，批量 标记/取消 已使用、已售卖、已申请退款，或批量删除；
+    整批修改只执行一条 UPDATE / DELETE 语句，返回每张卡片的处理结果
+    """
+    if (request.card_ids is None) == (request.filters is None):
+        raise HTTPException(status_code=400, detail="card_ids 与 filters 必须且只能提供一个")
+
+    if request.filters is not None:
+        filters = request.filters.model_dump()
+        if not any(value is not None for key, value in filters.items() if key != "exclude_deleted"):
+            raise HTTPException(status_code=400, detail="按条件批量修改至少需要一个筛选条件")
+        changed = await crud.bulk_update_cards(db, request.action, filters=filters)
+        results = [{"card_id": card_id, "outcome": "updated"} for card_id in changed]
+        unchanged_count = not_found_count = 0
     else:
-        db_card.sold_time = None
-        message = "已取消售卖标记"
+        card_ids = list(dict.fromkeys(request.card_ids))
+        # 区分“已处于目标状态”和“卡片不存在”
+        existing = await crud.get_existing_card_ids(db, card_ids)
+        changed = set(await crud.bulk_update_cards(db, request.action, card_ids=card_ids))
+        results = []
+        for card_id in card_ids:
+            if card_id in changed:
+                outcome = "updated"
+            elif card_id in existing:
+                outcome = "unchanged"
+            else:
+                outcome = "not_found"
+            results.append({"card_id": card_id, "outcome": outcome})
+        unchanged_count = sum(1 for item in results if item["outcome"] == "unchanged")
+        not_found_count = sum(1 for item in results if item["outcome"] == "not_found")
 
-    db.commit()
-    db.refresh(db_card)
+    print(f"[批量修改] {request.action}: 修改 {len(changed)} 张，无需修改 {unchanged_count} 张，不存在 {not_found_count} 张")
 
     return {
         "success": True,
-        "message": message,
-        "data": {"is_sold": db_card.is_sold}
+        "message": f"成功处理 {len(changed)} 张卡片" + (f"，{not_found_count} 张不存在" if not_found_count else ""),
+        "data": {
+            "action": request.action,
+            "updated": len(changed),
+            "unchanged": unchanged_count,
+            "not_found": not_found_count,
+            "results": results
+        }
     }
 
 
 @router.get("/batch/unreturned-card-numbers", response_model=schemas.APIResponse)
 async def get_unreturned_card_numbers(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     获取所有已过期、未退款且已激活的卡号列表（需要鉴权）
     用于批量复制和申请退款
     """
-    # 先更新所有过期卡片的状态
-    crud.update_expired_cards(db)
-
     # 筛选条件：已过期 + 已激活 + 未退款 + 有卡号
-    cards = db.query(models.Card).filter(
-        models.Card.status == 'expired',  # 只获取已过期的卡片
-        models.Card.is_activated == True,
-        models.Card.refund_requested == False,
-        models.Card.card_number.isnot(None)
-    ).all()
+    result = await db.execute(
+        select(models.Card).where(
+            models.Card.status == 'expired',  # 只获取已过期的卡片
+            models.Card.is_activated == True,
+            models.Card.refund_requested == False,
+            models.Card.card_number.isnot(None)
+        )
+    )
+    cards = result.scalars().all()
 
     card_numbers = [str(card.card_number) for card in cards]
 
@@ -697,7 +991,8 @@ async def get_unreturned_card_numbers(
         "message": f"找到 {len(card_numbers)} 张已过期未退款的卡片",
         "data": {
             "count": len(card_numbers),
-            "card_numbers": card_numbers
+            "card_numbers": card_numbers,
+            "card_ids": [card.card_id for card in cards]
         }
     }
 
@@ -705,7 +1000,7 @@ async def get_unreturned_card_numbers(
 @router.get("/{card_id}/transactions", response_model=schemas.APIResponse)
 async def get_card_transaction_history(
     card_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -713,7 +1008,7 @@ async def get_card_transaction_history(
     需要卡片已激活（有卡号）才能查询
     """
     # 检查卡片是否存在
-    db_card = crud.get_card_by_id(db, card_id)
+    db_card = await crud.get_card_by_id(db, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="卡片不存在")
 
@@ -745,26 +1040,26 @@ async def get_card_transaction_history(
 @router.post("/{card_id}/transactions/query", response_model=schemas.APIResponse)
 async def query_card_transactions_by_card_id(
     card_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     通过卡密查询交易记录（不需要鉴权，用于查询激活页面）
     需要卡片已激活（有卡号）才能查询
     """
-    # 检查卡片是否存在
-    db_card = crud.get_card_by_id(db, card_id)
-    if not db_card:
+    # 检查卡片是否存在（读取单卡记录缓存）
+    card = await crud.get_card_record(db, card_id)
+    if not card:
         raise HTTPException(status_code=404, detail="卡片不存在")
 
     # 检查卡片是否已激活
-    if not db_card.card_number:
+    if not card.card_number:
         raise HTTPException(status_code=400, detail="卡片未激活，无法查询消费记录")
 
     # 从API查询消费记录
     # 对于 Vocard (CDK/LR) 和 Mercury (UUID)，使用 card_id 查询
-    identifier = str(db_card.card_number)
-    if db_card.card_id:
-        cid = db_card.card_id
+    identifier = str(card.card_number)
+    if card.card_id:
+        cid = card.card_id
         # Vocard (CDK/LR) 或 Mercury/UUID (36 chars, 4 dashes) 或 NodeCard (-node)
         if cid.upper().startswith(("CDK-", "LR-")) or (len(cid) == 36 and cid.count("-") == 4) or cid.lower().endswith("-node"):
             identifier = cid
@@ -804,21 +1099,21 @@ async def query_transactions_by_card_number(
 @router.get("/query/by-limit", response_model=schemas.APIResponse)
 async def query_cards_by_limit(
     limit: float = Query(..., description="卡片额度"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     根据额度查询卡密信息（需要鉴权）
     返回所有匹配该额度的卡片信息
     """
-    # 先更新所有过期卡片的状态
-    crud.update_expired_cards(db)
-    
     # 查询指定额度的卡片（排除已删除的）
-    cards = db.query(models.Card).filter(
-        models.Card.card_limit == limit,
-        models.Card.status != 'deleted'
-    ).all()
+    result = await db.execute(
+        select(models.Card).where(
+            models.Card.card_limit == limit,
+            models.Card.status != 'deleted'
+        )
+    )
+    cards = result.scalars().all()
     
     if not cards:
         return {
@@ -881,7 +1176,7 @@ async def get_email_verification_codes():
                 }
             
             try:
-                raw_data = response.json()
+                raw_data = response_json(response)
             except:
                 raw_data = response.text
                 
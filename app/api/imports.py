@@ -1,15 +1,19 @@
 """
 批量导入 API 端点
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import Optional
+from typing import AsyncIterator, Optional
+import codecs
 
 from .. import crud, schemas
-from ..database import get_db
-from ..utils.parser import parse_txt_file, validate_card_id
+from ..database import get_async_db, AsyncSessionLocal
+from ..utils.parser import parse_card_line, parse_txt_file, validate_card_id
 from ..utils.auth import get_current_user
+from ..utils import json_codec
 
 router = APIRouter(prefix="/import", tags=["import"])
 
@@ -20,10 +24,62 @@ class TextImportRequest(BaseModel):
     card_header: Optional[str] = None  # 备注卡头，用于标识本批次卡片
 
 
+async def import_cards(db: AsyncSession, cards: list[dict]) -> dict:
+    """
+    批量导入卡片
+
+    按输入顺序校验卡密格式，一次 IN 查询找出已存在的卡密（批次内重复的卡密同样视为已存在），
+    其余卡片在单个事务中批量插入；返回 CardImportResponse 格式的结果，失败项保持输入顺序
+
+    参数:
+        cards: 卡片数据列表（CardCreate 字段）
+    """
+    failures = []  # (输入序号, 失败项)
+    valid = []  # (输入序号, CardCreate)
+
+    for index, card_data in enumerate(cards):
+        card_id = card_data.get("card_id", "未知")
+        # 验证卡密格式
+        if not validate_card_id(card_id):
+            failures.append((index, {"card_id": card_id, "reason": "卡密格式不正确"}))
+            continue
+        try:
+            valid.append((index, schemas.CardCreate(**card_data)))
+        except Exception as e:
+            failures.append((index, {"card_id": card_id, "reason": str(e)}))
+
+    # 检查是否已存在（数据库中已有，或本批次中已出现过）
+    existing = await crud.get_existing_card_ids(db, {card.card_id for _, card in valid})
+    pending = []
+    for index, card in valid:
+        if card.card_id in existing:
+            failures.append((index, {"card_id": card.card_id, "reason": "卡密已存在"}))
+            continue
+        existing.add(card.card_id)
+        pending.append((index, card))
+
+    # 单个事务批量插入；查询之后被其它请求抢先写入的卡密同样报告为已存在
+    inserted = await crud.bulk_create_cards(db, [card for _, card in pending])
+    for index, card in pending:
+        if card.card_id not in inserted:
+            failures.append((index, {"card_id": card.card_id, "reason": "卡密已存在"}))
+
+    success_count = len(inserted)
+    failed_count = len(failures)
+    failures.sort(key=lambda item: item[0])
+
+    return {
+        "success_count": success_count,
+        "failed_count": failed_count,
+        "failed_items": [item for _, item in failures],
+        "message": f"成功导入 {success_count} 张卡片，失败 {failed_count} 张"
+    }
+
+
 @router.post("/text", response_model=schemas.CardImportResponse)
 async def import_from_text(
     request: TextImportRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -49,108 +105,149 @@ async def import_from_text(
             detail=f"没有成功解析任何卡片数据。失败的行: {failed_lines}"
         )
 
-    # 批量导入
-    success_count = 0
-    failed_count = 0
-    failed_items = []
-
-    for card_data in parsed_cards:
-        try:
-            # 验证卡密格式
-            if not validate_card_id(card_data["card_id"]):
-                failed_count += 1
-                failed_items.append({
-                    "card_id": card_data["card_id"],
-                    "reason": "卡密格式不正确"
-                })
-                continue
-
-            # 检查是否已存在
-            existing_card = crud.get_card_by_id(db, card_data["card_id"])
-            if existing_card:
-                failed_count += 1
-                failed_items.append({
-                    "card_id": card_data["card_id"],
-                    "reason": "卡密已存在"
-                })
-                continue
-
-            # 创建卡片（优先使用解析出的卡头，否则用请求级别的备注卡头）
-            final_card_header = card_data.get("card_header") or request.card_header
-            card_data_with_header = {**card_data, "card_header": final_card_header}
-            card_create = schemas.CardCreate(**card_data_with_header)
-            crud.create_card(db, card_create)
-            success_count += 1
-
-        except Exception as e:
-            failed_count += 1
-            failed_items.append({
-                "card_id": card_data.get("card_id", "未知"),
-                "reason": str(e)
-            })
-
-    return {
-        "success_count": success_count,
-        "failed_count": failed_count,
-        "failed_items": failed_items,
-        "message": f"成功导入 {success_count} 张卡片，失败 {failed_count} 张"
-    }
+    # 批量导入（优先使用解析出的卡头，否则用请求级别的备注卡头）
+    return await import_cards(db, [
+        {**card_data, "card_header": card_data.get("card_header") or request.card_header}
+        for card_data in parsed_cards
+    ])
 
 
 @router.post("/json", response_model=schemas.CardImportResponse)
 async def import_from_json(
     import_data: schemas.CardImportRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     从 JSON 数据批量导入卡片（需要鉴权）
     """
-    success_count = 0
-    failed_count = 0
-    failed_items = []
+    # 支持每张卡单独设置备注卡头
+    return await import_cards(db, [
+        {
+            "card_id": card_item.card_id,
+            "card_limit": card_item.card_limit,
+            "validity_hours": card_item.validity_hours,
+            "card_header": card_item.card_header
+        }
+        for card_item in import_data.cards
+    ])
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    边读取请求体边输出的流式响应
+    StreamingResponse 会另起任务监听客户端断开，该任务会与生成器争抢请求体消息；
+    这里由生成器自己读取请求体（断开时 request.stream() 抛出 ClientDisconnect），不再单独监听
+    """
 
-    for card_item in import_data.cards:
-        try:
-            # 验证卡密格式
-            if not validate_card_id(card_item.card_id):
-                failed_count += 1
-                failed_items.append({
-                    "card_id": card_item.card_id,
-                    "reason": "卡密格式不正确"
-                })
-                continue
-
-            # 检查是否已存在
-            existing_card = crud.get_card_by_id(db, card_item.card_id)
-            if existing_card:
-                failed_count += 1
-                failed_items.append({
-                    "card_id": card_item.card_id,
-                    "reason": "卡密已存在"
-                })
-                continue
-
-            # 创建卡片（支持每张卡单独设置备注卡头）
-            card_create = schemas.CardCreate(
-                card_id=card_item.card_id,
-                card_limit=card_item.card_limit,
-                validity_hours=card_item.validity_hours,
-                card_header=card_item.card_header
-            )
-            crud.create_card(db, card_create)
-            success_count += 1
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+# 流式导入单行最大长度（字符），超长的行按无法解析处理，避免无换行的输入占满内存
+STREAM_MAX_LINE_LENGTH = 4096
+
+
+async def iter_stream_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Optional[str]]]:
+    """将字节流逐行解码为 (行号, 行内容)，内存中只保留当前未结束的一行；超长的行内容为 None"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    overlong = False
+    line_num = 0
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            line_num += 1
+            yield line_num, None if overlong or len(line) > STREAM_MAX_LINE_LENGTH else line
+            overlong = False
+        if len(pending) > STREAM_MAX_LINE_LENGTH:
+            # 丢弃超长行已收到的部分，直到遇到下一个换行
+            pending = ""
+            overlong = True
+
+    pending += decoder.decode(b"", final=True)
+    if pending or overlong:
+        line_num += 1
+        yield line_num, None if overlong else pending
+
+
+@router.post("/stream")
+async def import_from_stream(
+    request: Request,
+    card_header: Optional[str] = Query(None, description="备注卡头，用于标识本批次卡片"),
+    chunk_size: int = Query(1000, ge=100, le=10000, description="每次提交的卡片数"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    流式导入卡片文件（需要鉴权）
+    请求体为原始文本（与文本导入相同的每行格式），边接收边逐行解析，每 chunk_size 张卡片提交一次；
+    响应为 NDJSON，每提交一块或每读取 chunk_size 行输出一行进度（failed_items 为上一行进度之后的失败明细），
+    最后一行 done=true 为汇总结果
+    """
+    async def generate():
+        progress = {"lines": 0, "parsed": 0, "inserted": 0, "rejected": 0}
+        cards = []
+        failed_items = []
+
+        async def commit_chunk(db):
+            result = await import_cards(db, cards)
+            progress["inserted"] += result["success_count"]
+            progress["rejected"] += result["failed_count"]
+            failed_items.extend(result["failed_items"])
+            cards.clear()
+
+        reported_lines = 0
+
+        def progress_line(**extra) -> str:
+            nonlocal reported_lines
+            reported_lines = progress["lines"]
+            line = {**progress, "failed_items": list(failed_items), **extra}
+            failed_items.clear()
+            return json_codec.dumps_str(line) + "\n"
 
+        try:
+            async with AsyncSessionLocal() as db:
+                async for line_num, line in iter_stream_lines(request.stream()):
+                    if line is not None and not line.strip():
+                        continue
+                    progress["lines"] += 1
+
+                    parsed = parse_card_line(line) if line is not None else None
+                    if not parsed:
+                        progress["rejected"] += 1
+                        failed_items.append({
+                            "line": line_num,
+                            "reason": "无法解析" if line is not None else "行过长"
+                        })
+                    else:
+                        progress["parsed"] += 1
+                        # 优先使用解析出的卡头，否则用请求级别的备注卡头
+                        cards.append({**parsed, "card_header": parsed.get("card_header") or card_header})
+                        if len(cards) >= chunk_size:
+                            await commit_chunk(db)
+                            yield progress_line()
+
+                    if progress["lines"] - reported_lines >= chunk_size:
+                        # 大量无法解析的行没有触发提交时，也每 chunk_size 行输出一次进度并释放失败明细
+                        yield progress_line()
+
+                if cards:
+                    await commit_chunk(db)
+        except ClientDisconnect:
+            print(f"[流式导入] 客户端断开，已导入 {progress['inserted']} 张")
+            return
         except Exception as e:
-            failed_count += 1
-            failed_items.append({
-                "card_id": card_item.card_id,
-                "reason": str(e)
-            })
+            print(f"[流式导入] 导入中断: {e}")
+            yield progress_line(done=True, error=str(e))
+            return
 
-    return {
-        "success_count": success_count,
-        "failed_count": failed_count,
-        "failed_items": failed_items,
-        "message": f"成功导入 {success_count} 张卡片，失败 {failed_count} 张"
-    }
+        yield progress_line(
+            done=True,
+            message=f"成功导入 {progress['inserted']} 张卡片，失败 {progress['rejected']} 张"
+        )
+
+    return DuplexStreamingResponse(generate(), media_type="application/x-ndjson")
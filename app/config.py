@@ -27,12 +27,38 @@ MISACARD_API_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
 }
 
-# 激活轮询配置
-ACTIVATION_MAX_RETRIES = int(os.getenv("ACTIVATION_MAX_RETRIES", 20))  # 最大重试次数
-ACTIVATION_RETRY_DELAY = int(os.getenv("ACTIVATION_RETRY_DELAY", 3))   # 重试间隔（秒）
+# 激活重试配置（批量激活，见 app/utils/activation_errors.py）
+ACTIVATION_MAX_RETRIES = int(os.getenv("ACTIVATION_MAX_RETRIES", 20))  # 每张卡片最大重试次数（默认值及请求参数的上限）
+ACTIVATION_RETRY_DELAY = float(os.getenv("ACTIVATION_RETRY_DELAY", 3))   # 退避基数（秒），按错误类别倍增并指数退避
+
+# 上游渠道限流配置（进程内全局生效，见 app/utils/provider_limits.py）
+PROVIDER_MAX_IN_FLIGHT = int(os.getenv("PROVIDER_MAX_IN_FLIGHT", 10))  # 每个渠道同时进行的请求数上限（0 表示不限）
+PROVIDER_RATE_LIMIT = float(os.getenv("PROVIDER_RATE_LIMIT", 5))  # 每个渠道每秒发起的请求数上限（0 表示不限）
+PROVIDER_LIMITS = os.getenv("PROVIDER_LIMITS", "")  # 按渠道覆盖，格式 "渠道=并发:每秒请求数"，如 "vocard=5:2,holy=3:1"
+
+# 过期调度配置
+EXPIRY_RESYNC_INTERVAL = int(os.getenv("EXPIRY_RESYNC_INTERVAL", 300))  # 全量重建过期堆的间隔（秒）
+EXPIRY_WINDOW_SIZE = int(os.getenv("EXPIRY_WINDOW_SIZE", 10000))  # 过期堆中最多跟踪的即将过期卡片数
+
+# 缓存配置
+CARD_LIST_CACHE_SIZE = int(os.getenv("CARD_LIST_CACHE_SIZE", 256))  # 卡片列表缓存条目数（0 表示关闭）
+CARD_STATS_CACHE_SIZE = int(os.getenv("CARD_STATS_CACHE_SIZE", 64))  # 卡片统计缓存条目数（0 表示关闭）
+CARD_RECORD_CACHE_SIZE = int(os.getenv("CARD_RECORD_CACHE_SIZE", 2048))  # 单卡记录缓存条目数（0 表示关闭）
+CARD_RECORD_CACHE_TTL = float(os.getenv("CARD_RECORD_CACHE_TTL", 60))  # 单卡记录缓存有效期（秒）
 
 # 数据库配置
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./cards.db")
+# 激活记录单独存放的数据库（为空则与主库共用），避免日志写入与 cards 写入争用 SQLite 写锁
+ACTIVATION_LOG_DATABASE_URL = os.getenv("ACTIVATION_LOG_DATABASE_URL", "")
+
+# 激活记录写入配置
+ACTIVATION_LOG_FLUSH_INTERVAL = float(os.getenv("ACTIVATION_LOG_FLUSH_INTERVAL", 1.0))  # 定时批量提交间隔（秒）
+ACTIVATION_LOG_BATCH_SIZE = int(os.getenv("ACTIVATION_LOG_BATCH_SIZE", 200))  # 缓冲条数达到该值立即提交
+
+# 激活记录归档配置
+ACTIVATION_LOG_RETENTION_DAYS = int(os.getenv("ACTIVATION_LOG_RETENTION_DAYS", 30))  # 数据库中保留的天数（0 表示不归档）
+ACTIVATION_LOG_ARCHIVE_DIR = os.getenv("ACTIVATION_LOG_ARCHIVE_DIR", "./log_archive")  # 归档文件目录（按天 gzip 压缩）
+ACTIVATION_LOG_ARCHIVE_INTERVAL = int(os.getenv("ACTIVATION_LOG_ARCHIVE_INTERVAL", 3600))  # 归档检查间隔（秒）
 
 # 服务器配置
 HOST = os.getenv("HOST", "0.0.0.0")
@@ -1,48 +1,153 @@
 """
 数据库 CRUD 操作
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select, insert, update, delete, func, table, column, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime
+import time
+import uuid
+import weakref
 from typing import Optional
 from . import models, schemas
+from .utils.expiry import expiry_scheduler, exp_date_to_epoch
+from .utils.cache import write_generation, card_record_cache
+from .utils.addresses import address_cache, address_fingerprint, encode_legal_address
+from .utils.counters import summarize_counters
+from .utils.activation_log import activation_log_writer
+from .utils import json_codec
+from .database import LogAsyncSessionLocal
 
 
-def get_card_by_id(db: Session, card_id: str) -> Optional[models.Card]:
-    """根据卡密获取卡片"""
-    card = db.query(models.Card).filter(models.Card.card_id == card_id).first()
+async def get_card_by_id(db: AsyncSession, card_id: str) -> Optional[models.Card]:
+    """根据卡密获取卡片（只读，过期状态由后台过期调度器维护）"""
+    result = await db.execute(select(models.Card).where(models.Card.card_id == card_id))
+    card = result.scalars().first()
+    if card is not None:
+        await load_addresses(db, [card.address_id])
+    return card
 
-    # 检查并更新单张卡片的过期状态
-    if card and card.exp_date and card.status not in ['deleted', 'expired']:
-        from datetime import timezone, timedelta
-        now = datetime.now(timezone.utc)
 
-        # 如果 exp_date 是 naive datetime，应该是 UTC+8 时间，需要转换为 UTC
-        exp_date = card.exp_date
-        if exp_date.tzinfo is None:
-            # 先标记为 UTC+8 时区
-            utc8 = timezone(timedelta(hours=8))
-            exp_date = exp_date.replace(tzinfo=utc8)
-            # 然后转换为 UTC 时区
-            exp_date = exp_date.astimezone(timezone.utc)
+async def get_card_record(db: AsyncSession, card_id: str) -> Optional[schemas.CardResponse]:
+    """
+    获取卡片记录（只读快照，优先读取单卡记录缓存）
+    供公开的单卡查询接口使用；需要修改卡片时使用 get_card_by_id
+    """
+    record = card_record_cache.get(card_id)
+    if record is not None:
+        return record
+    version = card_record_cache.version
+    card = await get_card_by_id(db, card_id)
+    if card is None:
+        return None
+    record = schemas.CardResponse.model_validate(card)
+    card_record_cache.set(card_id, version, record)
+    return record
 
-        if now > exp_date:
-            card.status = 'expired'
-            db.commit()
-            db.refresh(card)
 
-    return card
+def _cards_written(card_ids=None) -> None:
+    """卡片写入提交后调用：列表缓存整体失效，单卡记录缓存按卡密失效（card_ids 为 None 时全部失效）"""
+    write_generation.bump()
+    card_record_cache.invalidate(card_ids)
 
 
-def get_card_by_pk(db: Session, pk: int) -> Optional[models.Card]:
+async def get_card_by_pk(db: AsyncSession, pk: int) -> Optional[models.Card]:
     """根据主键获取卡片"""
-    return db.query(models.Card).filter(models.Card.id == pk).first()
+    card = await db.get(models.Card, pk)
+    if card is not None:
+        await load_addresses(db, [card.address_id])
+    return card
 
 
-def get_cards(
-    db: Session,
-    skip: int = 0,
-    limit: int = 100,
+async def load_addresses(db: AsyncSession, address_ids=None) -> int:
+    """
+    加载地址字典到缓存
+    不指定 address_ids 时全量加载（启动预热），否则只查询缓存中缺失的地址（通常为空，不访问数据库）
+
+    返回:
+        int: 本次加载的地址数量
+    """
+    query = select(models.Address)
+    if address_ids is not None:
+        missing = address_cache.missing(address_ids)
+        if not missing:
+            return 0
+        query = query.where(models.Address.id.in_(missing))
+    result = await db.execute(query)
+    count = 0
+    for address in result.scalars():
+        address_cache.add(address.id, address.fingerprint, address.billing_address, address.legal_address)
+        count += 1
+    return count
+
+
+async def intern_address(
+    db: AsyncSession,
+    billing_address: Optional[str],
+    legal_address: Optional[dict]
+) -> Optional[int]:
+    """
+    获取地址在地址字典中的 id，不存在时插入（随调用方的事务提交）
+    缓存命中时不访问数据库；两个地址都为空时返回 None
+    """
+    legal_address_json = encode_legal_address(legal_address)
+    if not legal_address_json:
+        legal_address = None
+    if not billing_address and not legal_address:
+        return None
+
+    fingerprint = address_fingerprint(billing_address, legal_address)
+    address_id = address_cache.lookup(fingerprint)
+    if address_id is not None:
+        return address_id
+
+    await db.execute(
+        sqlite_insert(models.Address).values(
+            fingerprint=fingerprint,
+            billing_address=billing_address,
+            legal_address=legal_address_json
+        ).on_conflict_do_nothing(index_elements=["fingerprint"])
+    )
+    address = (await db.execute(
+        select(models.Address).where(models.Address.fingerprint == fingerprint)
+    )).scalar_one()
+    address_cache.add(address.id, address.fingerprint, address.billing_address, address.legal_address)
+    return address.id
+
+
+# cards 表的 FTS5 trigram 全文索引（见 migrations/versions/0003_cards_fts.py）
+cards_fts = table("cards_fts", column("rowid"), column("cards_fts"))
+
+# trigram 分词最短可匹配长度
+FTS_MIN_LENGTH = 3
+
+# 各数据库引擎是否存在全文索引表
+_fts_available: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+async def has_card_fts(db: AsyncSession) -> bool:
+    """当前数据库是否已建立 cards 全文索引"""
+    bind = db.get_bind()
+    if bind not in _fts_available:
+        result = await db.execute(
+            select(column("name")).select_from(table("sqlite_master")).where(
+                column("type") == "table", column("name") == "cards_fts"
+            )
+        )
+        _fts_available[bind] = bind.dialect.name == "sqlite" and result.first() is not None
+    return _fts_available[bind]
+
+
+def _fts_match(columns: str, keyword: str):
+    """构造 FTS 子串匹配子查询：返回匹配卡片的 id"""
+    phrase = '"' + keyword.replace('"', '""') + '"'
+    return select(cards_fts.c.rowid).where(
+        cards_fts.c.cards_fts.op("MATCH")(f"{{{columns}}} : {phrase}")
+    )
+
+
+def apply_card_filters(
+    query,
     status: Optional[str] = None,
     search: Optional[str] = None,
     card_limit: Optional[float] = None,
@@ -50,41 +155,32 @@ def get_cards(
     is_used: Optional[bool] = None,
     is_sold: Optional[bool] = None,
     card_header: Optional[str] = None,
-    exclude_deleted: bool = False
-) -> tuple[list[models.Card], int]:
-    """获取卡片列表（支持筛选和搜索）
-    
-    参数:
-        skip: 跳过的记录数
-        limit: 返回的最大记录数
-        status: 卡片状态筛选
-        search: 搜索关键词（卡密、昵称、卡号）
-        card_limit: 卡片额度筛选
-        refund_requested: 退款状态筛选
-        is_used: 使用状态筛选
-        is_sold: 售卖状态筛选
-        card_header: 卡头筛选
-        exclude_deleted: 是否排除已删除的卡片
-    
-    返回:
-        tuple: (卡片列表, 筛选后的总数量)
-    """
-    # 先更新所有过期的卡片状态
-    update_expired_cards(db)
+    exclude_deleted: bool = False,
+    use_fts: bool = False
+):
+    """为卡片查询（select 语句）应用筛选条件（列表、统计、导出等共用）
 
-    query = db.query(models.Card)
+    use_fts 为 True 时（见 has_card_fts），搜索和卡头筛选在关键词 >= 3 个字符时
+    走 FTS5 trigram 索引，否则回退为 LIKE '%关键词%'
+    """
+    def _fts(keyword: str) -> bool:
+        return use_fts and len(keyword) >= FTS_MIN_LENGTH
 
     # 状态筛选
     if status:
-        query = query.filter(models.Card.status == status)
+        query = query.where(models.Card.status == status)
     
     # 排除已删除的卡片（当没有指定status且exclude_deleted为True时）
     if exclude_deleted and not status:
-        query = query.filter(models.Card.status != 'deleted')
+        query = query.where(models.Card.status != 'deleted')
 
     # 搜索功能（卡密、昵称、卡号）
-    if search:
-        query = query.filter(
+    if search and _fts(search):
+        query = query.where(models.Card.id.in_(
+            _fts_match("card_id card_nickname card_number", search)
+        ))
+    elif search:
+        query = query.where(
             or_(
                 models.Card.card_id.contains(search),
                 models.Card.card_nickname.contains(search),
@@ -94,71 +190,327 @@ def get_cards(
     
     # 额度筛选
     if card_limit is not None:
-        query = query.filter(models.Card.card_limit == card_limit)
+        query = query.where(models.Card.card_limit == card_limit)
     
     # 退款状态筛选
     if refund_requested is not None:
-        query = query.filter(models.Card.refund_requested == refund_requested)
+        query = query.where(models.Card.refund_requested == refund_requested)
     
     # 使用状态筛选
     if is_used is not None:
-        query = query.filter(models.Card.is_used == is_used)
+        query = query.where(models.Card.is_used == is_used)
     
     # 售卖状态筛选
     if is_sold is not None:
-        query = query.filter(models.Card.is_sold == is_sold)
+        query = query.where(models.Card.is_sold == is_sold)
     
     # 卡头筛选
-    if card_header:
-        query = query.filter(models.Card.card_header.contains(card_header))
+    if card_header and _fts(card_header):
+        query = query.where(models.Card.id.in_(_fts_match("card_header", card_header)))
+    elif card_header:
+        query = query.where(models.Card.card_header.contains(card_header))
+
+    return query
+
+
+async def count_rows(db: AsyncSession, query) -> int:
+    """统计 select 语句的结果行数"""
+    result = await db.execute(select(func.count()).select_from(query.order_by(None).subquery()))
+    return result.scalar_one()
+
+
+# 通过 address_id 从地址字典读取的字段：字段名 -> 缓存读取函数
+ADDRESS_FIELDS = {
+    "billing_address": address_cache.billing_address,
+    "legal_address": address_cache.legal_address,
+}
+
+
+def _card_columns(columns: list[str]) -> list:
+    """卡片列表达式；地址字段查询 address_id 并以字段名作为标签"""
+    return [
+        models.Card.address_id.label(name) if name in ADDRESS_FIELDS else getattr(models.Card, name)
+        for name in columns
+    ]
+
+
+def _card_select(columns: Optional[list[str]] = None):
+    """卡片列表查询：默认查询完整 ORM 对象；指定列时只查询这些列（精简模式）"""
+    if columns is None:
+        return select(models.Card)
+    return select(*_card_columns(columns))
+
+
+async def _fetch_cards(db: AsyncSession, result, columns: Optional[list[str]] = None) -> list:
+    """读取卡片列表结果：ORM 对象，或精简模式下的 {列名: 值} 字典（地址字段已替换为地址内容）"""
+    if columns is None:
+        cards = list(result.scalars().all())
+        await load_addresses(db, [card.address_id for card in cards])
+        return cards
+
+    rows = [dict(row) for row in result.mappings()]
+    address_columns = [name for name in columns if name in ADDRESS_FIELDS]
+    if address_columns:
+        await load_addresses(db, [row[address_columns[0]] for row in rows])
+        for row in rows:
+            for name in address_columns:
+                row[name] = ADDRESS_FIELDS[name](row[name])
+    return rows
+
+
+async def get_cards(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    columns: Optional[list[str]] = None,
+    **filters
+) -> tuple[list, int]:
+    """获取卡片列表（支持筛选和搜索，偏移分页）
+    
+    参数:
+        skip: 跳过的记录数
+        limit: 返回的最大记录数
+        columns: 只查询指定列并返回字典（精简模式），为 None 时返回 ORM 对象
+        filters: 筛选条件，见 apply_card_filters
+            status: 卡片状态筛选
+            search: 搜索关键词（卡密、昵称、卡号）
+            card_limit: 卡片额度筛选
+            refund_requested: 退款状态筛选
+            is_used: 使用状态筛选
+            is_sold: 售卖状态筛选
+            card_header: 卡头筛选
+            exclude_deleted: 是否排除已删除的卡片
+    
+    返回:
+        tuple: (卡片列表, 筛选后的总数量)
+    """
+    query = apply_card_filters(_card_select(columns), use_fts=await has_card_fts(db), **filters)
 
     # 先计算筛选后的总数
-    total = query.count()
+    total = await count_rows(db, query)
     
-    # 再应用分页
-    cards = query.offset(skip).limit(limit).all()
+    # 再应用分页（按主键排序，保证多次请求顺序稳定）
+    result = await db.execute(query.order_by(models.Card.id).offset(skip).limit(limit))
+    cards = await _fetch_cards(db, result, columns)
     
     return cards, total
 
 
-def update_expired_cards(db: Session) -> int:
+async def get_cards_after(
+    db: AsyncSession,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    with_total: bool = False,
+    columns: Optional[list[str]] = None,
+    **filters
+) -> tuple[list, Optional[int], Optional[int]]:
+    """获取卡片列表（游标分页，按主键 id 递增）
+
+    使用 WHERE id > after_id ORDER BY id LIMIT n，响应时间不随翻页深度增长
+
+    参数:
+        after_id: 上一页最后一张卡片的 id，为 None 时从第一页开始
+        limit: 返回的最大记录数
+        with_total: 是否同时计算筛选后的总数（只建议首页计算）
+        columns: 只查询指定列并返回字典（精简模式，须包含 id），为 None 时返回 ORM 对象
+        filters: 筛选条件，见 apply_card_filters
+
+    返回:
+        tuple: (卡片列表, 筛选后的总数量或 None, 下一页起点 id 或 None)
     """
-    检查并更新所有过期的卡片
-    返回更新的卡片数量
+    query = apply_card_filters(_card_select(columns), use_fts=await has_card_fts(db), **filters)
+
+    total = await count_rows(db, query) if with_total else None
+
+    if after_id is not None:
+        query = query.where(models.Card.id > after_id)
+
+    # 多取一条用于判断是否还有下一页
+    result = await db.execute(query.order_by(models.Card.id).limit(limit + 1))
+    cards = await _fetch_cards(db, result, columns)
+    next_after_id = None
+    if len(cards) > limit:
+        cards = cards[:limit]
+        next_after_id = cards[-1].id if columns is None else cards[-1]["id"]
+
+    return cards, total, next_after_id
+
+
+async def get_card_stats(db: AsyncSession, **filters) -> dict:
+    """卡片统计（一次 GROUP BY 扫描得到各维度计数）
+
+    按 状态/激活/使用/售卖/退款/额度/卡头 分组计数，再在内存中汇总为各维度统计，
+    分组数量只与取值组合数有关，与卡片数量无关
+
+    参数:
+        filters: 筛选条件，见 apply_card_filters
+
+    返回:
+        dict: 各维度计数，summary 与 header_stock 为管理界面概览使用的口径
     """
-    from datetime import timezone, timedelta
-    now = datetime.now(timezone.utc)
+    Card = models.Card
+    query = select(
+        Card.status,
+        Card.is_activated,
+        Card.is_used,
+        Card.is_sold,
+        Card.refund_requested,
+        Card.card_limit,
+        Card.card_header,
+        func.count(),
+    ).group_by(
+        Card.status,
+        Card.is_activated,
+        Card.is_used,
+        Card.is_sold,
+        Card.refund_requested,
+        Card.card_limit,
+        Card.card_header,
+    )
+    query = apply_card_filters(query, use_fts=await has_card_fts(db), **filters)
+    rows = (await db.execute(query)).all()
 
-    # 查找所有未删除且有过期时间的卡片
-    cards = db.query(models.Card).filter(
-        models.Card.status != 'deleted',
-        models.Card.status != 'expired',
-        models.Card.exp_date.isnot(None)
-    ).all()
+    stats = {
+        "total": 0,
+        "total_limit": 0.0,
+        "by_status": {},
+        "activated": 0,
+        "used": 0,
+        "sold": 0,
+        "refund_requested": 0,
+        "by_limit": {},
+        "by_header": {},
+    }
+    # 管理界面概览口径：除 deleted 外均只统计未删除的卡片
+    summary = {"total": 0, "active": 0, "inactive": 0, "expired": 0, "deleted": 0, "sold": 0, "total_limit": 0.0}
+    # 卡头库存：未删除、未过期、未激活、未售卖
+    header_stock = {}
+
+    for status, is_activated, is_used, is_sold, refund_requested, card_limit, card_header, count in rows:
+        limit_value = card_limit or 0.0
+        stats["total"] += count
+        stats["total_limit"] += limit_value * count
+        stats["by_status"][status] = stats["by_status"].get(status, 0) + count
+        stats["activated"] += count if is_activated else 0
+        stats["used"] += count if is_used else 0
+        stats["sold"] += count if is_sold else 0
+        stats["refund_requested"] += count if refund_requested else 0
+        limit_key = str(limit_value)
+        stats["by_limit"][limit_key] = stats["by_limit"].get(limit_key, 0) + count
+        header_key = card_header.strip() if card_header and card_header.strip() else "未知"
+        stats["by_header"][header_key] = stats["by_header"].get(header_key, 0) + count
+
+        if status == "deleted":
+            summary["deleted"] += count
+            continue
+        summary["total"] += count
+        summary["total_limit"] += limit_value * count
+        summary["sold"] += count if is_sold else 0
+        if status == "expired":
+            summary["expired"] += count
+        elif is_activated:
+            summary["active"] += count
+        else:
+            summary["inactive"] += count
+            if not is_sold:
+                header_stock[header_key] = header_stock.get(header_key, 0) + count
+
+    stats["summary"] = summary
+    stats["header_stock"] = header_stock
+    return stats
 
-    # 更新状态为已过期
-    count = 0
-    for card in cards:
-        # 如果 exp_date 是 naive datetime，应该是 UTC+8 时间，需要转换为 UTC
-        exp_date = card.exp_date
-        if exp_date.tzinfo is None:
-            # 先标记为 UTC+8 时区
-            utc8 = timezone(timedelta(hours=8))
-            exp_date = exp_date.replace(tzinfo=utc8)
-            # 然后转换为 UTC 时区
-            exp_date = exp_date.astimezone(timezone.utc)
-
-        if now > exp_date:
-            card.status = 'expired'
-            count += 1
+
+async def get_card_counters(db: AsyncSession) -> dict:
+    """
+    管理界面概览计数（读取触发器维护的 card_counters 表，不扫描 cards）
+
+    返回:
+        dict: {"summary": {...}, "header_stock": {...}}，口径与 get_card_stats 一致
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        # 计数触发器仅在 SQLite 上建立，其它数据库回退为分组统计
+        stats = await get_card_stats(db)
+        return {"summary": stats["summary"], "header_stock": stats["header_stock"]}
+
+    Counter = models.CardCounter
+    result = await db.execute(
+        select(Counter.bucket, Counter.is_sold, Counter.card_header, Counter.card_count, Counter.limit_sum)
+    )
+    return summarize_counters(result.all())
+
+
+async def stream_card_rows(db: AsyncSession, columns: list[str], batch_size: int = 1000, **filters):
+    """
+    流式读取卡片指定列（按 id 键集分页，每次取 batch_size 行）
+
+    每批单独查询并在产出前结束读事务：调用方等待客户端下载时不持有 SQLite 读锁，不阻塞其它写入
+
+    参数:
+        columns: 列名列表
+        filters: 筛选条件，见 apply_card_filters
+
+    返回:
+        异步迭代器，每次产出一批行元组（地址字段为账单地址 / 详细地址 JSON 原文）
+    """
+    query = select(models.Card.id, *_card_columns(columns)).order_by(models.Card.id).limit(batch_size)
+    query = apply_card_filters(query, use_fts=await has_card_fts(db), **filters)
+    address_positions = [
+        (index, address_cache.billing_address if name == "billing_address" else address_cache.legal_address_json)
+        for index, name in enumerate(columns) if name in ADDRESS_FIELDS
+    ]
+    last_id = None
+    while True:
+        page = query if last_id is None else query.where(models.Card.id > last_id)
+        rows = (await db.execute(page)).all()
+        if not rows:
+            await db.commit()
+            return
+        last_id = rows[-1][0]
+        partition = [list(row[1:]) for row in rows]
+        if address_positions:
+            await load_addresses(db, [row[address_positions[0][0]] for row in partition])
+            for row in partition:
+                for index, resolve in address_positions:
+                    row[index] = resolve(row[index])
+        await db.commit()
+        yield partition
+        if len(rows) < batch_size:
+            return
+
+
+async def update_expired_cards(db: AsyncSession) -> int:
+    """
+    将所有已过期的卡片状态更新为 expired（单条 UPDATE，走 exp_epoch 索引）
+    由后台过期调度器调用
+    返回更新的卡片数量
+    """
+    now = int(time.time())
+
+    result = await db.execute(
+        update(models.Card).where(
+            models.Card.exp_epoch <= now,
+            models.Card.status != 'deleted',
+            models.Card.status != 'expired'
+        ).values(status='expired').returning(models.Card.card_id).execution_options(synchronize_session=False)
+    )
+    expired = list(result.scalars())
+    count = len(expired)
 
     if count > 0:
-        db.commit()
+        await db.commit()
+        _cards_written(expired)
 
     return count
 
 
-def create_card(db: Session, card: schemas.CardCreate, is_external: bool = False) -> models.Card:
+def set_card_exp_date(db_card: models.Card, exp_date: Optional[datetime]) -> None:
+    """设置卡片过期时间，同时写入归一化的 UTC 时间戳并登记到过期调度器"""
+    db_card.exp_date = exp_date
+    db_card.exp_epoch = exp_date_to_epoch(exp_date)
+    expiry_scheduler.schedule(db_card.card_id, db_card.exp_epoch)
+
+
+async def create_card(db: AsyncSession, card: schemas.CardCreate, is_external: bool = False) -> models.Card:
     """创建新卡片"""
     # 注意：过期时间(exp_date)应该从API的delete_date字段获取，而不是自己计算
     # 导入时先设为None，等查询/激活后再从API更新
@@ -173,14 +525,90 @@ def create_card(db: Session, card: schemas.CardCreate, is_external: bool = False
         is_external=is_external
     )
     db.add(db_card)
-    db.commit()
-    db.refresh(db_card)
+    await db.commit()
+    _cards_written([db_card.card_id])
+    await db.refresh(db_card)
     return db_card
 
 
-def update_card(db: Session, card_id: str, card_update: schemas.CardUpdate) -> Optional[models.Card]:
+# 批量 IN 查询的分块大小（远低于 SQLite 绑定参数上限）
+BULK_CHUNK_SIZE = 500
+
+
+async def get_existing_card_ids(db: AsyncSession, card_ids) -> set[str]:
+    """批量查询已存在的卡密（按块执行 IN 查询）"""
+    card_ids = list(card_ids)
+    existing = set()
+    for start in range(0, len(card_ids), BULK_CHUNK_SIZE):
+        result = await db.execute(
+            select(models.Card.card_id).where(
+                models.Card.card_id.in_(card_ids[start:start + BULK_CHUNK_SIZE])
+            )
+        )
+        existing.update(result.scalars())
+    return existing
+
+
+async def get_card_states(db: AsyncSession, card_ids) -> dict[str, bool]:
+    """批量查询本地卡片的激活状态（按块执行 IN 查询），返回 {卡密: 是否已激活}，不存在的卡密不在结果中"""
+    card_ids = list(card_ids)
+    states = {}
+    for start in range(0, len(card_ids), BULK_CHUNK_SIZE):
+        result = await db.execute(
+            select(models.Card.card_id, models.Card.is_activated).where(
+                models.Card.card_id.in_(card_ids[start:start + BULK_CHUNK_SIZE])
+            )
+        )
+        states.update((card_id, bool(is_activated)) for card_id, is_activated in result)
+    return states
+
+
+async def bulk_create_cards(db: AsyncSession, cards: list[schemas.CardCreate]) -> set[str]:
+    """
+    批量创建卡片（单个事务）
+
+    以 executemany 执行 INSERT ... ON CONFLICT(card_id) DO NOTHING RETURNING card_id，
+    卡密已存在（包括导入期间被其它请求写入）的行被跳过
+
+    返回:
+        set[str]: 实际插入的卡密
+    """
+    rows = [
+        {
+            "card_id": card.card_id,
+            "card_nickname": card.card_nickname,
+            "card_header": card.card_header,
+            "card_limit": card.card_limit,
+            "validity_hours": card.validity_hours,
+            "exp_date": None,  # 不自己计算，等API返回
+            "status": "inactive",
+            "is_activated": False,
+            "refund_requested": False,
+            "is_used": False,
+            "is_sold": False,
+            "is_external": False,
+        }
+        for card in cards
+    ]
+
+    if not rows:
+        return set()
+
+    # executemany：语句只编译一次，由 SQLAlchemy 按批拼成多行 VALUES 并收集 RETURNING 结果
+    stmt = sqlite_insert(models.Card.__table__).on_conflict_do_nothing(
+        index_elements=["card_id"]
+    ).returning(models.Card.card_id)
+    result = await db.execute(stmt, rows)
+    inserted = set(result.scalars())
+    await db.commit()
+    if inserted:
+        _cards_written(inserted)
+    return inserted
+
+
+async def update_card(db: AsyncSession, card_id: str, card_update: schemas.CardUpdate) -> Optional[models.Card]:
     """更新卡片信息"""
-    db_card = get_card_by_id(db, card_id)
+    db_card = await get_card_by_id(db, card_id)
     if not db_card:
         return None
 
@@ -188,24 +616,52 @@ def update_card(db: Session, card_id: str, card_update: schemas.CardUpdate) -> O
     for field, value in update_data.items():
         setattr(db_card, field, value)
 
-    db.commit()
-    db.refresh(db_card)
+    await db.commit()
+    _cards_written([card_id])
+    await db.refresh(db_card)
     return db_card
 
 
-def delete_card(db: Session, card_id: str) -> bool:
+async def delete_card(db: AsyncSession, card_id: str) -> bool:
     """删除卡片（硬删除 - 真正从数据库删除）"""
-    db_card = db.query(models.Card).filter(models.Card.card_id == card_id).first()
+    db_card = await get_card_by_id(db, card_id)
     if not db_card:
         return False
 
-    db.delete(db_card)
-    db.commit()
+    await db.delete(db_card)
+    await db.commit()
+    _cards_written([card_id])
     return True
 
 
-def activate_card_in_db(
-    db: Session,
+def _activation_upsert():
+    """
+    激活结果写入语句：INSERT ... ON CONFLICT(card_id) DO UPDATE
+    本地不存在的卡片创建为外部卡；已存在的卡片只更新激活相关字段，
+    上游未返回的地址、有效期小时数、过期时间保留原值
+    """
+    Card = models.Card
+    stmt = sqlite_insert(Card)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[Card.card_id],
+        set_={
+            "card_number": excluded.card_number,
+            "card_cvc": excluded.card_cvc,
+            "card_exp_date": excluded.card_exp_date,
+            "address_id": func.coalesce(excluded.address_id, Card.address_id),
+            "validity_hours": func.coalesce(excluded.validity_hours, Card.validity_hours),
+            "exp_date": func.coalesce(excluded.exp_date, Card.exp_date),
+            "exp_epoch": func.coalesce(excluded.exp_epoch, Card.exp_epoch),
+            "status": excluded.status,
+            "is_activated": excluded.is_activated,
+            "card_activation_time": excluded.card_activation_time,
+        }
+    )
+
+
+async def _activation_values(
+    db: AsyncSession,
     card_id: str,
     card_number: str,
     card_cvc: str,
@@ -213,63 +669,369 @@ def activate_card_in_db(
     billing_address: Optional[str] = None,
     validity_hours: Optional[int] = None,
     exp_date: Optional[datetime] = None,
-    legal_address: Optional[dict] = None
-) -> Optional[models.Card]:
-    """更新卡片激活信息"""
-    db_card = get_card_by_id(db, card_id)
-    if not db_card:
-        return None
-    
-    import json
+    legal_address: Optional[dict] = None,
+    card_limit: Optional[float] = None,
+    card_nickname: Optional[str] = None
+) -> dict:
+    """激活写入语句的参数（card_limit、card_nickname 只在新建外部卡时使用）"""
     from datetime import timezone
-    db_card.card_number = card_number
-    db_card.card_cvc = card_cvc
-    db_card.card_exp_date = card_exp_date
-    db_card.billing_address = billing_address
-    
-    if legal_address:
-        try:
-            db_card.legal_address = json.dumps(legal_address, ensure_ascii=False)
-        except:
-            db_card.legal_address = None
-            
-    db_card.is_activated = True
-    db_card.status = "active"
-    db_card.card_activation_time = datetime.now(timezone.utc)
-
-    # 更新有效期小时数和过期时间（从API的delete_date获取）
-    if validity_hours is not None:
-        db_card.validity_hours = validity_hours
-    if exp_date is not None:
-        db_card.exp_date = exp_date
-
-    db.commit()
-    db.refresh(db_card)
+    return {
+        "card_id": card_id,
+        "card_nickname": card_nickname,
+        "card_limit": float(card_limit or 0.0),
+        "card_number": card_number,
+        "card_cvc": card_cvc,
+        "card_exp_date": card_exp_date,
+        "address_id": await intern_address(db, billing_address, legal_address),
+        "validity_hours": validity_hours,
+        "exp_date": exp_date,
+        "exp_epoch": exp_date_to_epoch(exp_date),
+        "status": "active",
+        "is_activated": True,
+        "card_activation_time": datetime.now(timezone.utc),
+        "refund_requested": False,
+        "is_used": False,
+        "is_sold": False,
+        "is_external": True,
+    }
+
+
+async def upsert_card_activation(
+    db: AsyncSession,
+    card_id: str,
+    card_number: str,
+    card_cvc: str,
+    card_exp_date: str,
+    billing_address: Optional[str] = None,
+    validity_hours: Optional[int] = None,
+    exp_date: Optional[datetime] = None,
+    legal_address: Optional[dict] = None,
+    card_limit: Optional[float] = None,
+    card_nickname: Optional[str] = None
+) -> models.Card:
+    """
+    保存激活信息（单条 INSERT ... ON CONFLICT DO UPDATE ... RETURNING，一次提交）
+    本地不存在的卡片自动创建为外部卡，card_limit、card_nickname 只在新建时使用
+
+    返回:
+        models.Card: 写入后的卡片（直接来自 RETURNING，不再重新查询）
+    """
+    values = await _activation_values(
+        db, card_id, card_number, card_cvc, card_exp_date,
+        billing_address=billing_address,
+        validity_hours=validity_hours,
+        exp_date=exp_date,
+        legal_address=legal_address,
+        card_limit=card_limit,
+        card_nickname=card_nickname
+    )
+    result = await db.execute(
+        _activation_upsert().values(values).returning(models.Card),
+        execution_options={"populate_existing": True}
+    )
+    db_card = result.scalar_one()
+    await db.commit()
+    _cards_written([card_id])
+    expiry_scheduler.schedule(card_id, db_card.exp_epoch)
+    return db_card
+
+
+async def save_card_activations(db: AsyncSession, activations: list[dict]) -> list[str]:
+    """
+    批量保存激活结果（upsert 以 executemany 执行，一次提交）
+    本地不存在的卡片自动创建为外部卡
+
+    参数:
+        activations: 激活信息列表，每项为 upsert_card_activation 的关键字参数
+
+    返回:
+        list[str]: 保存的卡密
+    """
+    if not activations:
+        return []
+
+    rows = [await _activation_values(db, **item) for item in activations]
+    result = await db.execute(_activation_upsert().returning(models.Card.card_id, models.Card.exp_epoch), rows)
+    saved = result.all()
+    await db.commit()
+    card_ids = [card_id for card_id, _ in saved]
+    _cards_written(card_ids)
+    for card_id, exp_epoch in saved:
+        expiry_scheduler.schedule(card_id, exp_epoch)
+    return card_ids
+
+
+async def toggle_refund_requested(db: AsyncSession, db_card: models.Card) -> models.Card:
+    """切换卡片的退款申请状态"""
+    from datetime import timezone
+    db_card.refund_requested = not db_card.refund_requested
+    db_card.refund_requested_time = datetime.now(timezone.utc) if db_card.refund_requested else None
+
+    await db.commit()
+    _cards_written([db_card.card_id])
+    await db.refresh(db_card)
+    return db_card
+
+
+async def toggle_used(db: AsyncSession, db_card: models.Card) -> models.Card:
+    """切换卡片的使用状态"""
+    from datetime import timezone
+    db_card.is_used = not db_card.is_used
+    db_card.used_time = datetime.now(timezone.utc) if db_card.is_used else None
+
+    await db.commit()
+    _cards_written([db_card.card_id])
+    await db.refresh(db_card)
+    return db_card
+
+
+async def toggle_sold(db: AsyncSession, db_card: models.Card) -> models.Card:
+    """切换卡片的售卖状态"""
+    from datetime import timezone
+    db_card.is_sold = not db_card.is_sold
+    db_card.sold_time = datetime.now(timezone.utc) if db_card.is_sold else None
+
+    await db.commit()
+    _cards_written([db_card.card_id])
+    await db.refresh(db_card)
     return db_card
 
 
+# 批量操作：action -> (标记字段, 目标值, 时间字段)
+BULK_FLAG_ACTIONS = {
+    "mark_used": ("is_used", True, "used_time"),
+    "unmark_used": ("is_used", False, "used_time"),
+    "mark_sold": ("is_sold", True, "sold_time"),
+    "unmark_sold": ("is_sold", False, "sold_time"),
+    "request_refund": ("refund_requested", True, "refund_requested_time"),
+    "cancel_refund": ("refund_requested", False, "refund_requested_time"),
+}
+
+
+async def bulk_update_cards(
+    db: AsyncSession,
+    action: str,
+    card_ids: Optional[list[str]] = None,
+    filters: Optional[dict] = None
+) -> list[str]:
+    """
+    批量修改卡片状态 / 批量删除（单条 UPDATE / DELETE ... RETURNING，一次提交）
+
+    标记类操作只修改当前状态与目标不同的卡片，已处于目标状态的卡片不会被返回
+
+    参数:
+        action: BULK_FLAG_ACTIONS 中的操作或 delete
+        card_ids: 卡密列表（与 filters 二选一）
+        filters: 筛选条件，见 apply_card_filters
+
+    返回:
+        list[str]: 实际被修改 / 删除的卡密
+    """
+    from datetime import timezone
+    Card = models.Card
+
+    if action == "delete":
+        stmt = delete(Card)
+    else:
+        flag, value, time_field = BULK_FLAG_ACTIONS[action]
+        flag_column = getattr(Card, flag)
+        stmt = update(Card).where(
+            flag_column.is_(True) if not value else or_(flag_column.is_(False), flag_column.is_(None))
+        ).values({
+            flag: value,
+            time_field: datetime.now(timezone.utc) if value else None
+        })
+
+    if card_ids is not None:
+        stmt = stmt.where(Card.card_id.in_(card_ids))
+    else:
+        stmt = apply_card_filters(stmt, use_fts=await has_card_fts(db), **(filters or {}))
+
+    result = await db.execute(
+        stmt.returning(Card.card_id).execution_options(synchronize_session=False)
+    )
+    changed = list(result.scalars())
+    await db.commit()
+    if changed:
+        _cards_written(changed)
+    return changed
+
+
 def create_activation_log(
-    db: Session,
     card_id: str,
     status: str,
     error_message: Optional[str] = None,
     response_data: Optional[str] = None
-) -> models.ActivationLog:
-    """创建激活记录"""
-    log = models.ActivationLog(
-        card_id=card_id,
-        status=status,
-        error_message=error_message,
-        response_data=response_data
+) -> None:
+    """创建激活记录（放入缓冲队列，由后台写入器批量提交）"""
+    activation_log_writer.add(card_id, status, error_message=error_message, response_data=response_data)
+
+
+async def get_activation_logs(card_id: str) -> list:
+    """获取卡片的激活记录（先提交缓冲中的记录，保证能读到刚写入的记录）"""
+    await activation_log_writer.flush()
+    Log = models.ActivationLog
+    async with LogAsyncSessionLocal() as log_db:
+        # 只读取覆盖索引 ix_activation_logs_card_time 中的列，不回表
+        result = await log_db.execute(
+            select(Log.id, Log.status, Log.error_message, Log.activation_time).where(
+                Log.card_id == card_id
+            ).order_by(Log.activation_time.desc())
+        )
+        return list(result.all())
+
+
+# 批量激活任务的结束状态
+JOB_FINISHED_STATUSES = ("completed", "cancelled", "interrupted")
+
+
+async def create_activation_job(
+    db: AsyncSession,
+    card_ids: list[str],
+    concurrency: int,
+    max_retries: int,
+    token_hash: Optional[str] = None
+) -> models.ActivationJob:
+    """创建批量激活任务，每张卡片一条 pending 结果记录"""
+    job = models.ActivationJob(
+        id=uuid.uuid4().hex,
+        status="pending",
+        total=len(card_ids),
+        processed=0,
+        success_count=0,
+        failed_count=0,
+        concurrency=concurrency,
+        max_retries=max_retries,
+        token_hash=token_hash
     )
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log
+    db.add(job)
+    await db.flush()
+    if card_ids:
+        await db.execute(
+            insert(models.ActivationJobItem),
+            [{"job_id": job.id, "seq": seq, "card_id": card_id, "status": "pending"} for seq, card_id in enumerate(card_ids)]
+        )
+    await db.commit()
+    await db.refresh(job)
+    return job
+
 
+async def get_activation_job(db: AsyncSession, job_id: str) -> Optional[models.ActivationJob]:
+    """根据任务 ID 获取批量激活任务"""
+    return await db.get(models.ActivationJob, job_id, populate_existing=True)
+
+
+async def list_activation_jobs(db: AsyncSession, limit: int = 20) -> list[models.ActivationJob]:
+    """最近的批量激活任务（按创建时间倒序）"""
+    result = await db.execute(
+        select(models.ActivationJob).order_by(models.ActivationJob.created_at.desc()).limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def start_activation_job(db: AsyncSession, job_id: str) -> None:
+    """标记任务开始执行"""
+    from datetime import timezone
+    await db.execute(
+        update(models.ActivationJob).where(models.ActivationJob.id == job_id).values(
+            status="running", started_at=datetime.now(timezone.utc)
+        )
+    )
+    await db.commit()
+
+
+async def save_activation_job_results(
+    db: AsyncSession,
+    job_id: str,
+    items: list[tuple[int, dict]],
+    counts: dict
+) -> None:
+    """
+    保存一批卡片结果并更新进度计数（一次提交）
+
+    参数:
+        items: [(序号, 结果字典)]
+        counts: {processed, success_count, failed_count} 累计值
+    """
+    Item = models.ActivationJobItem.__table__
+    if items:
+        await db.execute(
+            update(Item).where(
+                Item.c.job_id == bindparam("b_job_id"),
+                Item.c.seq == bindparam("b_seq")
+            ).values(
+                status=bindparam("b_status"),
+                message=bindparam("b_message"),
+                result=bindparam("b_result")
+            ),
+            [
+                {
+                    "b_job_id": job_id,
+                    "b_seq": seq,
+                    "b_status": "success" if result["success"] else "failed",
+                    "b_message": result.get("message"),
+                    "b_result": json_codec.dumps_str(result),
+                }
+                for seq, result in items
+            ]
+        )
+    await db.execute(
+        update(models.ActivationJob).where(models.ActivationJob.id == job_id).values(**counts)
+    )
+    await db.commit()
+
+
+async def finish_activation_job(db: AsyncSession, job_id: str, status: str) -> None:
+    """结束任务：尚未得到结果的卡片记为同样的状态（cancelled / interrupted）"""
+    from datetime import timezone
+    await db.execute(
+        update(models.ActivationJobItem).where(
+            models.ActivationJobItem.job_id == job_id,
+            models.ActivationJobItem.status == "pending"
+        ).values(status=status)
+    )
+    await db.execute(
+        update(models.ActivationJob).where(models.ActivationJob.id == job_id).values(
+            status=status, finished_at=datetime.now(timezone.utc)
+        )
+    )
+    await db.commit()
+
+
+async def interrupt_stale_activation_jobs(db: AsyncSession) -> int:
+    """把上次运行遗留的未结束任务标记为 interrupted（启动时调用），返回任务数"""
+    result = await db.execute(
+        select(models.ActivationJob.id).where(models.ActivationJob.status.notin_(JOB_FINISHED_STATUSES))
+    )
+    job_ids = list(result.scalars())
+    for job_id in job_ids:
+        await finish_activation_job(db, job_id, "interrupted")
+    return len(job_ids)
+
+
+async def get_activation_job_items(
+    db: AsyncSession,
+    job_id: str,
+    offset: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None
+) -> tuple[list[dict], int]:
+    """
+    分页读取任务中每张卡片的结果（按提交顺序）
+
+    返回:
+        tuple: (结果列表, 符合条件的总数)；已有结果的卡片返回完整结果字典，其余只有 card_id；state 为该卡片在任务中的状态
+    """
+    Item = models.ActivationJobItem
+    query = select(Item.seq, Item.card_id, Item.status, Item.message, Item.result).where(Item.job_id == job_id)
+    if status:
+        query = query.where(Item.status == status)
+    total = await count_rows(db, query)
+    result = await db.execute(query.order_by(Item.seq).offset(offset).limit(limit))
+    items = []
+    for seq, card_id, item_status, message, detail in result:
+        item = json_codec.loads(detail) if detail else {"card_id": card_id, "success": False, "message": message}
+        item.update(seq=seq, state=item_status)
+        items.append(item)
+    return items, total
 
-def get_activation_logs(db: Session, card_id: str) -> list[models.ActivationLog]:
-    """获取卡片的激活记录"""
-    return db.query(models.ActivationLog).filter(
-        models.ActivationLog.card_id == card_id
-    ).order_by(models.ActivationLog.activation_time.desc()).all()
@@ -1,11 +1,14 @@
 """
 数据库配置和连接
 """
+import os
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from .config import DATABASE_URL
+from .config import DATABASE_URL, ACTIVATION_LOG_DATABASE_URL
 
 # SQLite 数据库文件路径
 SQLALCHEMY_DATABASE_URL = DATABASE_URL
@@ -16,9 +19,39 @@ engine = create_engine(
     connect_args={"check_same_thread": False}  # SQLite 特定配置
 )
 
-# 创建会话工厂
+# 创建会话工厂（同步：迁移、脚本使用）
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def to_async_url(url: str) -> str:
+    """将同步数据库地址转换为异步驱动地址（sqlite -> sqlite+aiosqlite）"""
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+# 异步数据库引擎（API 处理函数使用，数据库 I/O 不阻塞事件循环）
+async_engine = create_async_engine(
+    to_async_url(SQLALCHEMY_DATABASE_URL),
+    connect_args={"timeout": 30}  # 等待 SQLite 写锁的秒数
+)
+
+# 异步会话工厂
+# expire_on_commit=False：提交后对象属性仍可直接读取，避免在异步上下文中隐式懒加载
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# 激活记录数据库引擎（未单独配置时与主库共用同一引擎）
+if ACTIVATION_LOG_DATABASE_URL:
+    log_async_engine = create_async_engine(
+        to_async_url(ACTIVATION_LOG_DATABASE_URL),
+        connect_args={"timeout": 30}
+    )
+else:
+    log_async_engine = async_engine
+
+# 激活记录会话工厂
+LogAsyncSessionLocal = async_sessionmaker(log_async_engine, autoflush=False, expire_on_commit=False)
+
 # 创建基类
 Base = declarative_base()
 
@@ -34,3 +67,27 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# 依赖项：获取异步数据库会话
+async def get_async_db():
+    """
+    获取异步数据库会话的依赖项
+    使用 async with 确保请求结束后关闭会话
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def run_migrations(revision: str = "head"):
+    """
+    执行 Alembic 数据库迁移（升级到指定版本）
+    表结构统一由 migrations/versions 中的版本脚本管理
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    alembic_cfg = Config(os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini"))
+    alembic_cfg.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL.replace("%", "%%"))
+    alembic_cfg.attributes["configure_logger"] = False
+    command.upgrade(alembic_cfg, revision)
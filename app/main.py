@@ -3,14 +3,20 @@ FastAPI 主应用程序
 MisaCard 管理系统 - Python 重构版
 """
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import os
 
-from .database import engine
-from . import models
+from .database import run_migrations, AsyncSessionLocal
+from . import crud
 from .api import cards, imports, auth
+from .utils.expiry import expiry_scheduler
+from .utils.activation_log import activation_log_writer
+from .utils.log_archive import activation_log_archiver
+from .utils.activation_jobs import activation_job_manager
 import logging
 
 # 配置日志
@@ -21,21 +27,46 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="MisaCard 管理系统",
     description="卡片管理系统 - 支持卡片查询、激活、批量导入",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse  # orjson 序列化响应
 )
 
 
 @app.on_event("startup")
 async def startup_event():
-    """应用启动时初始化数据库"""
+    """应用启动时初始化数据库（执行 Alembic 迁移）"""
     try:
         logger.info("正在初始化数据库...")
-        models.Base.metadata.create_all(bind=engine)
+        await asyncio.to_thread(run_migrations)
         logger.info("✅ 数据库初始化成功")
     except Exception as e:
         logger.error(f"❌ 数据库初始化失败: {e}")
         raise
 
+    # 预热地址字典缓存
+    async with AsyncSessionLocal() as db:
+        address_count = await crud.load_addresses(db)
+    logger.info(f"📮 地址字典已加载 {address_count} 条")
+
+    # 启动后台过期调度器
+    await expiry_scheduler.start()
+
+    # 启动激活记录写入器和归档任务
+    await activation_log_writer.start()
+    await activation_log_archiver.start()
+
+    # 标记上次运行遗留的批量激活任务
+    await activation_job_manager.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时停止后台任务，并写完缓冲中的激活记录"""
+    await activation_job_manager.stop()
+    await expiry_scheduler.stop()
+    await activation_log_archiver.stop()
+    await activation_log_writer.stop()
+
 # CORS 配置
 app.add_middleware(
     CORSMiddleware,
@@ -1,14 +1,30 @@
 """
 数据库模型定义
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Index, Text, text
 from sqlalchemy.sql import func
 from .database import Base
+from .utils.addresses import address_cache
+
+
+# 部分索引条件（与 migrations/versions 中的定义保持一致）
+_NOT_DELETED = text("status != 'deleted'")
+_PENDING_EXPIRY = text("status != 'deleted' AND status != 'expired'")
 
 
 class Card(Base):
     """卡片信息表"""
     __tablename__ = "cards"
+    __table_args__ = (
+        # 指定状态 + 售卖/使用筛选
+        Index("ix_cards_status_sold_used", "status", "is_sold", "is_used"),
+        # 排除已删除（列表默认）+ 售卖/使用、退款、额度筛选
+        Index("ix_cards_live_sold_used", "is_sold", "is_used", sqlite_where=_NOT_DELETED),
+        Index("ix_cards_live_refund", "refund_requested", sqlite_where=_NOT_DELETED),
+        Index("ix_cards_live_limit", "card_limit", sqlite_where=_NOT_DELETED),
+        # 过期调度：exp_epoch <= now AND 未删除未过期
+        Index("ix_cards_pending_expiry", "exp_epoch", sqlite_where=_PENDING_EXPIRY),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     # 卡密（唯一标识）
@@ -23,10 +39,8 @@ class Card(Base):
     card_cvc = Column(String, nullable=True)
     # 信用卡有效期（激活后才有，格式：MM/YY，如"11/31"）
     card_exp_date = Column(String, nullable=True)
-    # 账单地址
-    billing_address = Column(String, nullable=True)
-    # 法律地址/详细地址信息 (JSON str)
-    legal_address = Column(String, nullable=True)
+    # 地址（引用 addresses 地址字典，账单地址/详细地址通过下方属性从缓存读取）
+    address_id = Column(Integer, nullable=True)
     # 额度
     card_limit = Column(Float, default=0.0)
     # 有效期小时数（对应API的exp_date字段，是整数如1表示1小时）
@@ -41,6 +55,8 @@ class Card(Base):
     card_activation_time = Column(DateTime(timezone=True), nullable=True)
     # 卡片系统过期时间（对应API的delete_date字段，这才是判断卡片是否过期的时间戳）
     exp_date = Column(DateTime(timezone=True), nullable=True)
+    # 过期时间的 UTC 时间戳（秒），由 exp_date 归一化而来，用于在 SQL 中直接判断是否过期
+    exp_epoch = Column(Integer, nullable=True)
     # 软删除时间（用户删除卡片的时间，不是卡片过期时间）
     delete_date = Column(DateTime(timezone=True), nullable=True)
     # 是否已申请退款
@@ -58,13 +74,104 @@ class Card(Base):
     # 是否为外部卡（第三方卡密），即激活时本地数据库不存在的卡
     is_external = Column(Boolean, default=False)
 
+    @property
+    def billing_address(self):
+        """账单地址"""
+        return address_cache.billing_address(self.address_id)
+
+    @property
+    def legal_address(self):
+        """法律地址/详细地址信息（已解析的 dict）"""
+        return address_cache.legal_address(self.address_id)
+
+
+class Address(Base):
+    """
+    地址字典表：账单地址 + 详细地址去重存储，cards 通过 address_id 引用
+    地址只增不改，进程内缓存见 app/utils/addresses.py
+    """
+    __tablename__ = "addresses"
+
+    id = Column(Integer, primary_key=True)
+    # 内容指纹（sha1），用于去重
+    fingerprint = Column(String, unique=True, nullable=False)
+    # 账单地址
+    billing_address = Column(String, nullable=True)
+    # 法律地址/详细地址信息 (JSON str)
+    legal_address = Column(String, nullable=True)
+
+
+class CardCounter(Base):
+    """
+    卡片状态计数表（由 cards 表上的 SQLite 触发器增量维护，见 app/utils/counters.py）
+    按 状态分桶 + 是否售卖 + 卡头 分组，管理界面概览直接读取本表，无需扫描 cards
+    """
+    __tablename__ = "card_counters"
+
+    # 状态分桶：active, inactive, expired, deleted
+    bucket = Column(String, primary_key=True)
+    # 是否已售卖（0/1）
+    is_sold = Column(Integer, primary_key=True)
+    # 卡头（去除首尾空格，空值记为"未知"）
+    card_header = Column(String, primary_key=True)
+    # 卡片数量
+    card_count = Column(Integer, nullable=False, default=0)
+    # 额度合计
+    limit_sum = Column(Float, nullable=False, default=0.0)
+
+
+class ActivationJob(Base):
+    """批量激活后台任务表"""
+    __tablename__ = "activation_jobs"
+
+    # 任务 ID（uuid hex）
+    id = Column(String, primary_key=True)
+    # 状态：pending, running, completed, cancelled, interrupted
+    status = Column(String, nullable=False, default="pending")
+    # 卡片总数
+    total = Column(Integer, nullable=False, default=0)
+    # 已得到结果的卡片数
+    processed = Column(Integer, nullable=False, default=0)
+    # 成功数
+    success_count = Column(Integer, nullable=False, default=0)
+    # 失败数
+    failed_count = Column(Integer, nullable=False, default=0)
+    # 并发数
+    concurrency = Column(Integer, nullable=False, default=5)
+    # 最大重试次数
+    max_retries = Column(Integer, nullable=False, default=3)
+    # 创建时间
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 开始执行时间
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    # 结束时间（完成、取消或中断）
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # 访问令牌的 SHA-256 摘要（令牌只在提交时返回给提交者）
+    token_hash = Column(String, nullable=True)
+
+
+class ActivationJobItem(Base):
+    """批量激活任务中每张卡片的结果"""
+    __tablename__ = "activation_job_items"
+
+    job_id = Column(String, primary_key=True)
+    # 卡片在提交列表中的序号（从 0 开始）
+    seq = Column(Integer, primary_key=True)
+    card_id = Column(String, nullable=False)
+    # 状态：pending, success, failed, cancelled, interrupted
+    status = Column(String, nullable=False, default="pending")
+    # 结果说明
+    message = Column(String, nullable=True)
+    # 结果详情（JSON，与同步批量激活接口的结果项字段一致）
+    result = Column(Text, nullable=True)
+
 
 class ActivationLog(Base):
     """激活记录表"""
     __tablename__ = "activation_logs"
 
     id = Column(Integer, primary_key=True, index=True)
-    card_id = Column(String, index=True, nullable=False)
+    card_id = Column(String, nullable=False)
     # 激活状态：success, failed
     status = Column(String, nullable=False)
     # 错误信息（如果失败）
@@ -73,3 +180,13 @@ class ActivationLog(Base):
     activation_time = Column(DateTime(timezone=True), server_default=func.now())
     # 响应数据（JSON格式）
     response_data = Column(String, nullable=True)
+
+
+# 单卡历史记录：按 card_id 过滤、按时间倒序，覆盖历史接口读取的列（id 为 rowid）
+Index(
+    "ix_activation_logs_card_time",
+    ActivationLog.card_id,
+    ActivationLog.activation_time.desc(),
+    ActivationLog.status,
+    ActivationLog.error_message,
+)
@@ -2,10 +2,12 @@
 Pydantic 数据验证模型
 """
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 import json
 
+from .config import ACTIVATION_MAX_RETRIES
+
 
 class CardBase(BaseModel):
     """卡片基础模型"""
@@ -97,7 +99,52 @@ class BatchActivateRequest(BaseModel):
     """批量激活请求模型"""
     card_ids: list[str] = Field(..., description="卡密列表")
     concurrency: int = Field(default=5, ge=1, le=20, description="并发数（1-20）")
-    max_retries: int = Field(default=3, ge=0, le=10, description="最大重试次数（0-10）")
+    max_retries: Optional[int] = Field(
+        default=None, ge=0, le=ACTIVATION_MAX_RETRIES,
+        description=f"最大重试次数（0-{ACTIVATION_MAX_RETRIES}，默认 ACTIVATION_MAX_RETRIES）"
+    )
+
+
+class ActivationJobResponse(BaseModel):
+    """批量激活任务进度"""
+    id: str
+    status: str
+    total: int
+    processed: int
+    success_count: int
+    failed_count: int
+    concurrency: int
+    max_retries: int
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class CardFilter(BaseModel):
+    """卡片筛选条件（与卡片列表接口的筛选参数一致）"""
+    status: Optional[str] = None
+    search: Optional[str] = None
+    card_limit: Optional[float] = None
+    refund_requested: Optional[bool] = None
+    is_used: Optional[bool] = None
+    is_sold: Optional[bool] = None
+    card_header: Optional[str] = None
+    exclude_deleted: bool = False
+
+
+class CardBatchUpdateRequest(BaseModel):
+    """批量修改卡片状态请求模型（card_ids 与 filters 二选一）"""
+    action: Literal[
+        "mark_used", "unmark_used",
+        "mark_sold", "unmark_sold",
+        "request_refund", "cancel_refund",
+        "delete"
+    ] = Field(..., description="操作类型")
+    card_ids: Optional[list[str]] = Field(None, max_length=10000, description="卡密列表")
+    filters: Optional[CardFilter] = Field(None, description="筛选条件（按条件批量修改）")
 
 
 class ActivationResponse(BaseModel):
@@ -117,9 +164,10 @@ class APIResponse(BaseModel):
 class CardListResponse(BaseModel):
     """卡片列表响应模型（带分页信息）"""
     items: list[CardResponse]
-    total: int
+    total: Optional[int] = Field(None, description="筛选后的总数量（游标分页仅首页返回）")
     skip: int
     limit: int
+    next_cursor: Optional[str] = Field(None, description="下一页游标（游标分页模式，无下一页时为空）")
 
 
 class VocardVerifyRequest(BaseModel):
@@ -4,7 +4,6 @@
 """
 import httpx
 from typing import Optional, Dict, Tuple
-import json
 import asyncio
 import re
 
@@ -19,6 +18,7 @@ from .lcard import redeem_lcard_key
 from .nodecard import redeem_nodecard_key, is_nodecard_key, get_nodecard_transactions
 from .ncetcard import redeem_ncetcard_key, is_ncetcard_key
 from .efuncard import redeem_efuncard_key, get_efuncard_transactions, is_efuncard_key
+from .activation_errors import UPSTREAM, exception_error_code, provider_error, tag_response
 
 # ... (omitted) ...
 
@@ -155,7 +155,11 @@ async def activate_card_via_api(card_id: str, max_retries: int = None, retry_del
             print(f"[激活卡片] 使用默认 Mercury API")
             response_data = await redeem_key(card_id)
         
-        print(f"[激活卡片] 响应内容: {json.dumps(response_data, ensure_ascii=False, indent=2)}")
+        # 只打印结果摘要：完整响应包含卡号/CVV，且逐次格式化输出在批量激活时开销明显
+        if isinstance(response_data, dict):
+            print(f"[激活卡片] 响应结果: success={response_data.get('success')}, error={response_data.get('error')}")
+        else:
+            print(f"[激活卡片] 响应结果: {type(response_data).__name__}")
         print(f"{'='*60}\n")
         
         # 解析响应
@@ -164,7 +168,8 @@ async def activate_card_via_api(card_id: str, max_retries: int = None, retry_del
             if response_data.get("success") is True:
                 return True, response_data, None
             
-            # 检查是否有显式错误
+            # 检查是否有显式错误（渠道未标注错误类别时按错误信息归类）
+            tag_response(response_data)
             if response_data.get("error"):
                 return False, response_data, response_data.get("error")
                 
@@ -172,11 +177,11 @@ async def activate_card_via_api(card_id: str, max_retries: int = None, retry_del
             # 按照用户给的示例，success: true 是必须的
             return False, response_data, "激活失败: API返回 success != true"
             
-        return False, None, "响应格式无法解析"
+        return False, provider_error("响应格式无法解析", UPSTREAM), "响应格式无法解析"
 
     except Exception as e:
         print(f"[激活卡片] 异常: {str(e)}")
-        return False, None, f"激活失败: {str(e)}"
+        return False, provider_error(f"激活失败: {str(e)}", exception_error_code(e)), f"激活失败: {str(e)}"
 
 
 def is_card_activated(card_data: Dict) -> bool:
@@ -0,0 +1,101 @@
+"""
+激活错误分类与重试策略
+- 各渠道模块激活失败时在返回中带上 error_code（见 provider_error / tag_response），批量激活按错误类别决定是否重试
+- 可重试的错误按类别做指数退避 + 随机抖动，基数为 ACTIVATION_RETRY_DELAY
+"""
+import random
+from typing import Any, NamedTuple, Optional
+
+import httpx
+
+from ..config import ACTIVATION_RETRY_DELAY
+
+# 错误类别
+INVALID = "invalid"            # 卡密无效/不存在/已失效
+ALREADY_USED = "already_used"  # 卡密已被使用（且渠道无法返回卡片信息）
+RATE_LIMITED = "rate_limited"  # 上游限流
+NETWORK = "network"            # 网络异常、超时
+UPSTREAM = "upstream"          # 上游 5xx 或响应无法解析
+UNKNOWN = "unknown"            # 其他失败
+
+# 上游只返回文字错误时，按关键字归类（先匹配的优先）
+_MESSAGE_KEYWORDS = (
+    (ALREADY_USED, ("已使用", "already used", "already in use", "已激活", "already activated", "已兑换", "redeemed")),
+    (INVALID, ("已失效", "无效", "invalid", "not found", "不存在", "expired")),
+    (RATE_LIMITED, ("too many", "rate limit", "频繁")),
+    (NETWORK, ("network error", "请求异常", "timeout", "timed out", "超时")),
+)
+
+
+class RetryPolicy(NamedTuple):
+    """重试策略：第 n 次重试等待 min(base * 2^(n-1), max_delay) 秒（再加抖动）"""
+    base: float
+    max_delay: float
+
+
+# 不在表中的类别不重试
+RETRY_POLICIES = {
+    RATE_LIMITED: RetryPolicy(base=ACTIVATION_RETRY_DELAY * 4, max_delay=120),
+    UPSTREAM: RetryPolicy(base=ACTIVATION_RETRY_DELAY * 2, max_delay=60),
+    NETWORK: RetryPolicy(base=ACTIVATION_RETRY_DELAY, max_delay=30),
+    UNKNOWN: RetryPolicy(base=ACTIVATION_RETRY_DELAY, max_delay=30),
+}
+
+
+def classify_error(message: Optional[str], status_code: Optional[int] = None) -> str:
+    """按 HTTP 状态码和错误信息判断错误类别"""
+    if status_code == 429:
+        return RATE_LIMITED
+    if status_code is not None and status_code >= 500:
+        return UPSTREAM
+    text = str(message or "").lower()
+    for code, keywords in _MESSAGE_KEYWORDS:
+        if any(kw in text for kw in keywords):
+            return code
+    return UNKNOWN
+
+
+def exception_error_code(e: BaseException) -> str:
+    """请求过程中抛出的异常的错误类别"""
+    if isinstance(e, httpx.HTTPError):
+        return NETWORK
+    if isinstance(e, ValueError):
+        # 响应体不是合法 JSON（orjson.JSONDecodeError 是 ValueError 的子类）
+        return UPSTREAM
+    return UNKNOWN
+
+
+def provider_error(message: str, error_code: Optional[str] = None, status_code: Optional[int] = None, **extra: Any) -> dict:
+    """渠道模块的失败返回；未指定 error_code 时按状态码和错误信息归类"""
+    return {
+        "success": False,
+        "error": message,
+        "error_code": error_code or classify_error(message, status_code),
+        **extra
+    }
+
+
+def tag_response(data: Any, status_code: Optional[int] = None) -> Any:
+    """直接透传上游响应的渠道：失败且没有 error_code 时补上"""
+    if isinstance(data, dict) and data.get("success") is not True and not data.get("error_code"):
+        message = data.get("error") or data.get("message") or data.get("msg")
+        data["error_code"] = classify_error(message, status_code)
+    return data
+
+
+def error_code_of(data: Optional[dict], message: Optional[str] = None) -> str:
+    """取激活结果的错误类别（渠道未标注时按错误信息归类）"""
+    if isinstance(data, dict) and data.get("error_code"):
+        return data["error_code"]
+    return classify_error(message)
+
+
+def is_retryable(code: str) -> bool:
+    return code in RETRY_POLICIES
+
+
+def retry_delay(code: str, attempt: int) -> float:
+    """第 attempt 次（从 1 开始）重试前的等待秒数：指数退避，在 [delay/2, delay] 之间随机抖动"""
+    policy = RETRY_POLICIES.get(code, RETRY_POLICIES[UNKNOWN])
+    delay = min(policy.base * 2 ** (attempt - 1), policy.max_delay)
+    return random.uniform(delay / 2, delay)
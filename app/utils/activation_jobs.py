@@ -0,0 +1,153 @@
+"""
+批量激活后台任务
+提交后立即返回任务 ID，激活在后台执行；每张卡片的结果按时间间隔分批写入数据库，
+页面刷新后可以按任务 ID 重新查看进度、分页读取结果，也可以取消任务。
+服务重启时未结束的任务标记为 interrupted
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import secrets
+from collections import defaultdict, deque
+from typing import Optional
+
+from .. import crud, models
+from ..database import AsyncSessionLocal
+from .batch_activation import resolve_max_retries, run_batch_activation
+
+logger = logging.getLogger(__name__)
+
+# 结果写入数据库的间隔（秒）
+JOB_FLUSH_INTERVAL = 1.0
+
+
+def hash_job_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def new_job_token() -> tuple[str, str]:
+    """生成任务访问令牌，返回 (令牌, 摘要)；数据库只保存摘要"""
+    token = secrets.token_urlsafe(24)
+    return token, hash_job_token(token)
+
+
+def check_job_token(job: models.ActivationJob, token: Optional[str]) -> bool:
+    """校验任务访问令牌（没有令牌摘要的任务只能登录后访问）"""
+    if not job.token_hash or not token:
+        return False
+    return hmac.compare_digest(hash_job_token(token), job.token_hash)
+
+
+class ActivationJobManager:
+    """批量激活任务管理器：每个任务一个 asyncio 任务，状态和结果保存在 activation_jobs / activation_job_items"""
+
+    def __init__(self, flush_interval: float = JOB_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._cancelled: set[str] = set()
+
+    async def start(self) -> None:
+        """启动时把上次运行遗留的未结束任务标记为 interrupted"""
+        async with AsyncSessionLocal() as db:
+            count = await crud.interrupt_stale_activation_jobs(db)
+        if count:
+            logger.info(f"🧾 {count} 个未结束的批量激活任务已标记为中断")
+
+    async def stop(self) -> None:
+        """停止所有运行中的任务（已得到的结果写入后标记为 interrupted）"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def running_count(self) -> int:
+        """运行中的任务数"""
+        return len(self._tasks)
+
+    async def submit(self, card_ids: list[str], concurrency: int, max_retries: Optional[int],
+                     token_hash: Optional[str] = None) -> models.ActivationJob:
+        """创建任务并在后台开始执行（max_retries 为 None 时使用 ACTIVATION_MAX_RETRIES）"""
+        max_retries = resolve_max_retries(max_retries)
+        async with AsyncSessionLocal() as db:
+            job = await crud.create_activation_job(db, card_ids, concurrency, max_retries, token_hash)
+        self._tasks[job.id] = asyncio.create_task(self._run(job.id, card_ids, concurrency, max_retries))
+        return job
+
+    async def cancel(self, job_id: str) -> bool:
+        """取消运行中的任务，任务不在运行时返回 False"""
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        self._cancelled.add(job_id)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return True
+
+    async def _run(self, job_id: str, card_ids: list[str], concurrency: int, max_retries: int) -> None:
+        # 卡密 -> 尚未得到结果的序号（同一卡密出现多次时按顺序对应）
+        pending_seqs: dict[str, deque] = defaultdict(deque)
+        for seq, card_id in enumerate(card_ids):
+            pending_seqs[card_id].append(seq)
+        buffer: list[tuple[int, dict]] = []
+        counts = {"processed": 0, "success_count": 0, "failed_count": 0}
+
+        def on_result(result: dict) -> None:
+            buffer.append((pending_seqs[result["card_id"]].popleft(), result))
+            counts["processed"] += 1
+            counts["success_count" if result["success"] else "failed_count"] += 1
+
+        async def flush() -> None:
+            items = buffer[:]
+            del buffer[:]
+            try:
+                async with AsyncSessionLocal() as db:
+                    await crud.save_activation_job_results(db, job_id, items, dict(counts))
+            except BaseException:
+                # 写入失败或被取消时结果放回缓冲，下一次 flush 重新写入
+                buffer[:0] = items
+                raise
+
+        async def flush_loop() -> None:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await flush()
+                except Exception as e:
+                    logger.error(f"❌ 批量激活任务 {job_id} 结果写入失败: {e}")
+
+        status = "completed"
+        flusher: Optional[asyncio.Task] = None
+        try:
+            async with AsyncSessionLocal() as db:
+                await crud.start_activation_job(db, job_id)
+            flusher = asyncio.create_task(flush_loop())
+            logger.info(f"🧾 批量激活任务 {job_id} 开始执行，共 {len(card_ids)} 张")
+            await run_batch_activation(
+                card_ids, concurrency=concurrency, max_retries=max_retries, on_result=on_result, collect=False
+            )
+        except asyncio.CancelledError:
+            status = "cancelled" if job_id in self._cancelled else "interrupted"
+        except Exception as e:
+            logger.error(f"❌ 批量激活任务 {job_id} 异常: {e}")
+            status = "interrupted"
+        finally:
+            if flusher:
+                flusher.cancel()
+                await asyncio.gather(flusher, return_exceptions=True)
+            try:
+                await flush()
+                async with AsyncSessionLocal() as db:
+                    await crud.finish_activation_job(db, job_id, status)
+            except Exception as e:
+                logger.error(f"❌ 批量激活任务 {job_id} 结束状态写入失败: {e}")
+            self._tasks.pop(job_id, None)
+            self._cancelled.discard(job_id)
+            logger.info(
+                f"🧾 批量激活任务 {job_id} 结束（{status}）："
+                f"成功 {counts['success_count']}，失败 {counts['failed_count']}，共 {len(card_ids)}"
+            )
+
+
+# 全局实例
+activation_job_manager = ActivationJobManager()
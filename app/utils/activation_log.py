@@ -0,0 +1,130 @@
+"""
+激活记录缓冲写入器
+激活接口只把记录放入内存队列，后台任务按时间间隔或缓冲条数批量提交，
+批量激活时不再为每次尝试单独提交一次事务；关闭时保证写完剩余记录
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import insert
+
+from ..config import ACTIVATION_LOG_FLUSH_INTERVAL, ACTIVATION_LOG_BATCH_SIZE, ACTIVATION_LOG_DATABASE_URL
+from ..database import Base, LogAsyncSessionLocal, log_async_engine
+from .. import models
+
+logger = logging.getLogger(__name__)
+
+
+class ActivationLogWriter:
+    """
+    激活记录写入器
+
+    - add() 非阻塞入队，记录时间取入队时刻（UTC，与原 server_default 一致）
+    - 每隔 flush_interval 秒，或缓冲达到 batch_size 条时，一次 executemany 批量插入
+    - 写入失败的记录放回队首，下一轮重试
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = ACTIVATION_LOG_FLUSH_INTERVAL,
+        batch_size: int = ACTIVATION_LOG_BATCH_SIZE
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._buffer: list[dict] = []
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(
+        self,
+        card_id: str,
+        status: str,
+        error_message: Optional[str] = None,
+        response_data: Optional[str] = None
+    ) -> None:
+        """记录入队"""
+        self._buffer.append({
+            "card_id": card_id,
+            "status": status,
+            "error_message": error_message,
+            "response_data": response_data,
+            "activation_time": datetime.now(timezone.utc).replace(tzinfo=None),
+        })
+        if len(self._buffer) >= self.batch_size and self._wakeup:
+            self._wakeup.set()
+
+    def pending_count(self) -> int:
+        """缓冲中尚未提交的记录数"""
+        return len(self._buffer)
+
+    async def start(self) -> None:
+        """启动后台写入任务"""
+        if self._task:
+            return
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        if ACTIVATION_LOG_DATABASE_URL:
+            # 独立日志库只有激活记录一张表，按模型建表并补齐新增的索引
+            async with log_async_engine.begin() as conn:
+                await conn.run_sync(self._create_log_table)
+        self._task = asyncio.create_task(self._run())
+        logger.info("📝 激活记录写入器已启动")
+
+    @staticmethod
+    def _create_log_table(conn) -> None:
+        table = models.ActivationLog.__table__
+        Base.metadata.create_all(conn, tables=[table])
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+    async def stop(self) -> None:
+        """停止后台写入任务，并提交缓冲中剩余的记录"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """立即提交缓冲中的全部记录，返回写入条数"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            rows, self._buffer = self._buffer, []
+            try:
+                async with LogAsyncSessionLocal() as db:
+                    await db.execute(insert(models.ActivationLog), rows)
+                    await db.commit()
+            except BaseException:
+                # 包括任务被取消的情况，记录放回队首，由下一轮或关闭时的 flush 重新写入
+                self._buffer[:0] = rows
+                raise
+            return len(rows)
+
+    async def _run(self) -> None:
+        """写入循环"""
+        while True:
+            try:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ 激活记录写入失败: {e}")
+                await asyncio.sleep(self.flush_interval)
+
+
+# 全局写入器实例
+activation_log_writer = ActivationLogWriter()
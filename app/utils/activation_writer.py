@@ -0,0 +1,95 @@
+"""
+批量激活结果写入器
+并发的激活任务不各自开会话提交，而是把结果交给同一个写入器：
+写入器用独立会话逐组保存（一次查询 + 一次提交），提交期间到达的结果合并到下一组
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from .. import crud
+from ..database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# 每组最多保存的激活结果数
+ACTIVATION_WRITE_BATCH_SIZE = 50
+
+
+class CardActivationWriter:
+    """
+    激活结果组提交写入器（每次批量激活一个实例）
+
+    用法：
+        async with CardActivationWriter() as writer:
+            await writer.save(activation)  # 所在的组提交后返回，保存失败时抛出异常
+    """
+
+    def __init__(self, batch_size: int = ACTIVATION_WRITE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.commit_count = 0
+        self.saved_count = 0
+
+    async def __aenter__(self) -> "CardActivationWriter":
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def save(self, activation: dict) -> None:
+        """提交一条激活结果，等待其所在的组写入完成"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((activation, future))
+        self._wakeup.set()
+        await future
+
+    async def close(self) -> None:
+        """写完剩余结果后停止"""
+        if not self._task:
+            return
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await self._task
+        except Exception as e:
+            logger.error(f"❌ 激活结果写入器异常退出: {e}")
+        self._task = None
+        # 写入任务异常退出时，让仍在等待的调用方得到结果
+        for _, future in self._pending:
+            if not future.done():
+                future.set_exception(RuntimeError("激活结果写入器已停止"))
+        self._pending = []
+
+    async def _write(self, group: list[tuple[dict, asyncio.Future]]) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await crud.save_card_activations(db, [activation for activation, _ in group])
+        except Exception as e:
+            logger.error(f"❌ 激活结果保存失败（{len(group)} 张）: {e}")
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.commit_count += 1
+        self.saved_count += len(group)
+        for _, future in group:
+            if not future.done():
+                future.set_result(None)
+
+    async def _run(self) -> None:
+        """写入循环：有结果时逐组保存，关闭时写完剩余结果后退出"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                group = self._pending[:self.batch_size]
+                self._pending = self._pending[self.batch_size:]
+                await self._write(group)
+            if self._closing:
+                return
@@ -0,0 +1,97 @@
+"""
+地址字典
+- cards 表只保存 address_id，账单地址和详细地址 JSON 去重后存放在 addresses 表
+- 进程内缓存全部地址（数量很少，启动时预热），每个不同的地址只解析一次 JSON
+"""
+import hashlib
+import json
+import threading
+from typing import Iterable, NamedTuple, Optional
+
+
+class AddressEntry(NamedTuple):
+    """缓存中的地址：账单地址、详细地址 JSON 原文、解析后的详细地址"""
+    billing_address: Optional[str]
+    legal_address_json: Optional[str]
+    legal_address: Optional[dict]
+
+
+def encode_legal_address(legal_address: Optional[dict]) -> Optional[str]:
+    """详细地址序列化为 JSON（与原 cards.legal_address 的存储格式一致）"""
+    if not legal_address:
+        return None
+    try:
+        return json.dumps(legal_address, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+
+
+def decode_legal_address(legal_address_json: Optional[str]) -> Optional[dict]:
+    """解析详细地址 JSON，无法解析时返回 None"""
+    if not legal_address_json:
+        return None
+    try:
+        value = json.loads(legal_address_json)
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def address_fingerprint(billing_address: Optional[str], legal_address: Optional[dict]) -> str:
+    """地址内容指纹（字段顺序无关），用于去重"""
+    canonical = json.dumps([billing_address, legal_address], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class AddressCache:
+    """地址字典缓存：address_id -> AddressEntry，以及 指纹 -> address_id"""
+
+    def __init__(self):
+        self._by_id: dict[int, AddressEntry] = {}
+        self._by_fingerprint: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, address_id: int, fingerprint: str, billing_address: Optional[str], legal_address_json: Optional[str]) -> AddressEntry:
+        """登记一个地址（JSON 在这里解析一次）"""
+        entry = AddressEntry(billing_address, legal_address_json, decode_legal_address(legal_address_json))
+        with self._lock:
+            self._by_id[address_id] = entry
+            self._by_fingerprint[fingerprint] = address_id
+        return entry
+
+    def get(self, address_id: Optional[int]) -> Optional[AddressEntry]:
+        if address_id is None:
+            return None
+        return self._by_id.get(address_id)
+
+    def lookup(self, fingerprint: str) -> Optional[int]:
+        """按指纹查找已登记的 address_id"""
+        return self._by_fingerprint.get(fingerprint)
+
+    def missing(self, address_ids: Iterable[Optional[int]]) -> set[int]:
+        """返回不在缓存中的 address_id"""
+        return {address_id for address_id in address_ids if address_id is not None and address_id not in self._by_id}
+
+    def billing_address(self, address_id: Optional[int]) -> Optional[str]:
+        entry = self.get(address_id)
+        return entry.billing_address if entry else None
+
+    def legal_address(self, address_id: Optional[int]) -> Optional[dict]:
+        entry = self.get(address_id)
+        return entry.legal_address if entry else None
+
+    def legal_address_json(self, address_id: Optional[int]) -> Optional[str]:
+        entry = self.get(address_id)
+        return entry.legal_address_json if entry else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_id.clear()
+            self._by_fingerprint.clear()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+# 全局实例
+address_cache = AddressCache()
@@ -0,0 +1,244 @@
+"""
+批量激活执行器
+同步批量激活接口、后台批量激活任务共用：
+- 一次查询预加载本地状态，本地已激活的卡片直接记为成功，不请求上游
+- 并发激活，失败按错误类别（见 activation_errors.py）决定是否重试：重试以队列任务的形式退避后重新执行，
+  不递归、等待期间不占用并发名额；激活任务不持有数据库会话，成功结果由写入器分组提交
+- 每张卡片得到最终结果时调用 on_result，调用方可以边执行边保存/推送结果；
+  边执行边处理的调用方传 collect=False，返回值只有计数，不在内存里积累完整结果列表
+"""
+import asyncio
+from datetime import datetime
+from typing import Callable, Optional
+
+from .. import crud
+from ..config import ACTIVATION_MAX_RETRIES
+from ..database import AsyncSessionLocal
+from .activation import auto_activate_if_needed, extract_card_info, is_card_activated
+from .activation_errors import UNKNOWN, error_code_of, exception_error_code, is_retryable, retry_delay
+from .activation_writer import CardActivationWriter
+
+
+def resolve_max_retries(max_retries: Optional[int]) -> int:
+    """未指定时使用 ACTIVATION_MAX_RETRIES，且不超过该值"""
+    return ACTIVATION_MAX_RETRIES if max_retries is None else min(max_retries, ACTIVATION_MAX_RETRIES)
+
+
+async def run_batch_activation(
+    card_ids: list[str],
+    concurrency: int = 5,
+    max_retries: Optional[int] = None,
+    on_result: Optional[Callable[[dict], None]] = None,
+    collect: bool = True
+) -> dict:
+    """
+    批量激活卡片
+
+    参数:
+        card_ids: 卡密列表
+        concurrency: 并发数
+        max_retries: 最大重试次数（默认且不超过 ACTIVATION_MAX_RETRIES）
+        on_result: 每张卡片得到最终结果时调用（同步函数），参数为结果字典
+        collect: 是否在返回值中保存每张卡片的结果（False 时 success/failed 为空列表）
+
+    返回:
+        dict: {success, failed, total, success_count, failed_count}
+    """
+    max_retries = resolve_max_retries(max_retries)
+
+    # 存储激活结果
+    results = {
+        "success": [],
+        "failed": [],
+        "total": len(card_ids),
+        "success_count": 0,
+        "failed_count": 0
+    }
+
+    def record(result: dict) -> None:
+        """记录一张卡片的最终结果"""
+        key = "success" if result["success"] else "failed"
+        if collect:
+            results[key].append(result)
+        results[f"{key}_count"] += 1
+        if on_result:
+            on_result(result)
+
+    # 一次查询预加载本地卡片状态 {卡密: 是否已激活}，本地不存在的卡密不在其中
+    async with AsyncSessionLocal() as db:
+        local_states = await crud.get_card_states(db, set(card_ids))
+
+    # 本地已激活的卡片直接记为成功，不再进入激活流程
+    pending_ids = []
+    for card_id in card_ids:
+        if local_states.get(card_id):
+            record({
+                "card_id": card_id,
+                "success": True,
+                "message": "卡片已激活 (从本地读取)",
+                "retry_count": 0,
+                "status": "已激活"
+            })
+        else:
+            pending_ids.append(card_id)
+    if results["success_count"]:
+        print(f"[批量激活] ✓ 本地已激活 {results['success_count']} 张，跳过API请求")
+
+    # 待激活的卡片放入工作队列，由 concurrency 个工作协程处理；
+    # 可重试的失败按错误类别退避后重新入队，等待期间不占用并发名额
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    for card_id in pending_ids:
+        queue.put_nowait((card_id, 0))
+    remaining = len(pending_ids)
+    all_done = asyncio.Event()
+    if not remaining:
+        all_done.set()
+    retry_timers: set[asyncio.TimerHandle] = set()
+
+    def finish(result: dict) -> None:
+        """卡片得到最终结果"""
+        nonlocal remaining
+        record(result)
+        remaining -= 1
+        if remaining == 0:
+            all_done.set()
+
+    def fail(card_id: str, retry_count: int, error_code: str, message: str) -> None:
+        """激活失败：可重试时退避后重新入队，否则记为最终失败"""
+        if is_retryable(error_code) and retry_count < max_retries:
+            delay = retry_delay(error_code, retry_count + 1)
+            print(f"[批量激活] ⚠️  失败({error_code})，{delay:.1f} 秒后重试: {card_id} - {message}")
+
+            def requeue() -> None:
+                retry_timers.discard(handle)
+                queue.put_nowait((card_id, retry_count + 1))
+
+            handle = loop.call_later(delay, requeue)
+            retry_timers.add(handle)
+            return
+
+        if is_retryable(error_code):
+            print(f"[批量激活] ✗ 最终失败: {card_id} - {message}")
+        else:
+            print(f"[批量激活] 🛑 致命错误(不重试, {error_code}): {card_id} - {message}")
+        finish({
+            "card_id": card_id,
+            "success": False,
+            "message": message,
+            "retry_count": retry_count,
+            "error_code": error_code
+        })
+
+    async def activate_once(card_id: str, retry_count: int, writer: CardActivationWriter) -> None:
+        """对一张卡片执行一次激活，激活结果交给写入器组提交，任务本身不持有数据库会话"""
+        retry_text = f" (重试 {retry_count}/{max_retries})" if retry_count > 0 else ""
+        print(f"[批量激活] 正在处理: {card_id}{retry_text}")
+
+        try:
+            # 自动激活流程
+            success, card_data, message = await auto_activate_if_needed(card_id)
+
+            if not success:
+                # 激活失败，尝试记录日志（如果卡片存在）
+                if card_id in local_states:
+                    crud.create_activation_log(card_id, "failed", error_message=message)
+                fail(card_id, retry_count, error_code_of(card_data, message), message)
+                return
+
+            # 验证卡片是否真正激活（status == "已激活"/或者有数据）
+            if not is_card_activated(card_data):
+                status = card_data.get("status") if card_data else "未知"
+                error_msg = f"激活未完成: 卡片状态为 {status}"
+                if card_id in local_states:
+                    crud.create_activation_log(card_id, "failed", error_message=error_msg)
+                fail(card_id, retry_count, UNKNOWN, error_msg)
+                return
+
+            # 提取卡片信息并验证
+            card_info = extract_card_info(card_data)
+
+            # 如果没有卡号但激活成功，尽量接受（取决于业务需求，这里先暂时要求必须有卡号）
+            if not card_info.get("card_number"):
+                # 尝试宽容处理，如果没有卡号，可能是还在处理中?
+                # 但为了保证一致性，如果真的“已激活”应该有卡号。
+                pass
+
+            # 更新或创建数据库记录
+            exp_date = None
+            if card_info.get("exp_date"):
+                try:
+                    exp_date = datetime.fromisoformat(card_info["exp_date"].replace('Z', '+00:00'))
+                except:
+                    pass
+
+            # 交给写入器组提交（本地不存在的卡片自动创建为外部卡）
+            print(f"[批量激活-存入数据库] CardID: {card_id}, exp_date: {exp_date}")
+            try:
+                await writer.save({
+                    "card_id": card_id,
+                    "card_number": str(card_info.get("card_number") or ""),
+                    "card_cvc": str(card_info.get("card_cvc") or ""),
+                    "card_exp_date": str(card_info.get("card_exp_date") or ""),
+                    "billing_address": card_info.get("billing_address"),
+                    "validity_hours": card_info.get("validity_hours"),
+                    "exp_date": exp_date,
+                    "legal_address": card_info.get("legal_address"),
+                    "card_limit": card_info.get("card_limit"),
+                    "card_nickname": f"Auto-Import {card_info.get('card_limit') or ''}"
+                })
+            except Exception as e:
+                # 上游已激活成功，重试激活没有意义，直接记为失败
+                finish({
+                    "card_id": card_id,
+                    "success": False,
+                    "message": f"激活成功但保存失败: {str(e)}",
+                    "retry_count": retry_count
+                })
+                print(f"[批量激活] ✗ 保存失败: {card_id} - {e}")
+                return
+
+            try:
+                crud.create_activation_log(card_id, "success")
+            except Exception:
+                # 忽略日志创建失败（例如并发导致的主键冲突等，虽然不太可能）
+                pass
+
+            finish({
+                "card_id": card_id,
+                "success": True,
+                "message": message,
+                "retry_count": retry_count,
+                "status": "已激活",
+                "billing_address": card_info.get("billing_address"),
+                "card_number": card_info.get("card_number"),
+                "card_cvc": card_info.get("card_cvc"),
+                "card_exp_date": card_info.get("card_exp_date"),
+                "exp_date": card_info.get("exp_date"),
+                "card_limit": card_info.get("card_limit")
+            })
+            print(f"[批量激活] ✓ 成功: {card_id} (状态: 已激活)")
+
+        except Exception as e:
+            fail(card_id, retry_count, exception_error_code(e), f"处理异常: {str(e)}")
+
+    async def worker(writer: CardActivationWriter) -> None:
+        while True:
+            card_id, retry_count = await queue.get()
+            await activate_once(card_id, retry_count, writer)
+
+    # 所有卡片得到最终结果后停止工作协程，成功结果由同一个写入器分组提交
+    async with CardActivationWriter() as writer:
+        workers = [asyncio.create_task(worker(writer)) for _ in range(min(concurrency, len(pending_ids)))]
+        try:
+            await all_done.wait()
+        finally:
+            for handle in retry_timers:
+                handle.cancel()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    if writer.saved_count:
+        print(f"[批量激活] 保存 {writer.saved_count} 张，共提交 {writer.commit_count} 次")
+
+    return results
@@ -0,0 +1,171 @@
+"""
+进程内缓存
+- 全局写入代数（write generation）：每次卡片数据写入后递增，缓存条目代数不一致即视为失效
+- 卡片列表缓存：按完整筛选条件缓存列表结果和总数
+- 卡片统计缓存：按筛选条件缓存统计接口的分组计数
+- 单卡记录缓存：按卡密缓存公开单卡接口读取的卡片记录，写入时按卡密失效
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+from ..config import CARD_LIST_CACHE_SIZE, CARD_RECORD_CACHE_SIZE, CARD_RECORD_CACHE_TTL, CARD_STATS_CACHE_SIZE
+
+
+class WriteGeneration:
+    """全局写入代数计数器，crud 中所有写卡片的路径在提交后调用 bump()"""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class GenerationCache:
+    """
+    按写入代数失效的 LRU 缓存（卡片列表、卡片统计）
+
+    键为完整的筛选/分页参数元组，条目为 (写入代数, 值)；
+    读取时写入代数已变化的条目视为未命中
+    """
+
+    def __init__(self, generation: WriteGeneration, maxsize: int):
+        self.generation = generation
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, tuple[int, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取缓存，未命中返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self.generation.value:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, generation: int, value: Any) -> None:
+        """写入缓存，generation 为查询开始前读取的写入代数"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "generation": self.generation.value,
+            }
+
+
+class CardRecordCache:
+    """
+    单卡记录缓存（LRU + TTL）
+
+    键为卡密，值为 (过期时刻, 卡片记录)；crud 写卡片时按卡密失效（批量写入无卡密时全部失效），
+    TTL 兜底其它进程（如 init_db.py）的写入。
+    每次失效递增失效版本，查询开始前读取的版本已变化时不写入，避免把查询期间被修改的旧记录放进缓存
+    """
+
+    def __init__(self, maxsize: int = CARD_RECORD_CACHE_SIZE, ttl: float = CARD_RECORD_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, card_id: str) -> Optional[Any]:
+        """读取卡片记录，未命中或已过期返回 None"""
+        with self._lock:
+            entry = self._entries.get(card_id)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[card_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(card_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, card_id: str, version: int, record: Any) -> None:
+        """写入缓存，version 为查询开始前读取的失效版本"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[card_id] = (time.monotonic() + self.ttl, record)
+            self._entries.move_to_end(card_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, card_ids: Optional[Iterable[str]] = None) -> None:
+        """使指定卡密的记录失效，card_ids 为 None 时全部失效"""
+        with self._lock:
+            self._version += 1
+            self.invalidations += 1
+            if card_ids is None:
+                self._entries.clear()
+                return
+            for card_id in card_ids:
+                self._entries.pop(card_id, None)
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    def stats(self) -> dict:
+        """命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+
+# 全局实例
+write_generation = WriteGeneration()
+card_list_cache = GenerationCache(write_generation, CARD_LIST_CACHE_SIZE)  # 值为 (列表项, 总数, 下一页游标)
+card_stats_cache = GenerationCache(write_generation, CARD_STATS_CACHE_SIZE)  # 值为统计结果
+card_record_cache = CardRecordCache()
@@ -0,0 +1,139 @@
+"""
+卡片状态计数
+card_counters 表由 cards 上的触发器增量维护（迁移 0004），这里定义分组表达式、
+触发器 SQL 以及从 cards 全量重算并对账的方法
+"""
+from sqlalchemy import text
+
+
+def bucket_sql(row: str) -> str:
+    """状态分桶表达式，row 为行别名（new / old / cards）"""
+    return (
+        f"CASE WHEN {row}.status = 'deleted' THEN 'deleted' "
+        f"WHEN {row}.status = 'expired' THEN 'expired' "
+        f"WHEN {row}.is_activated THEN 'active' ELSE 'inactive' END"
+    )
+
+
+def is_sold_sql(row: str) -> str:
+    return f"CASE WHEN {row}.is_sold THEN 1 ELSE 0 END"
+
+
+def header_sql(row: str) -> str:
+    return f"COALESCE(NULLIF(TRIM({row}.card_header), ''), '未知')"
+
+
+def limit_sql(row: str) -> str:
+    return f"COALESCE({row}.card_limit, 0)"
+
+
+# 影响计数分组或额度合计的列，只有这些列变化时才触发更新
+COUNTED_COLUMNS = "status, is_activated, is_sold, card_header, card_limit"
+
+
+def _add_row_sql(row: str) -> str:
+    return f"""
+        INSERT INTO card_counters (bucket, is_sold, card_header, card_count, limit_sum)
+        VALUES ({bucket_sql(row)}, {is_sold_sql(row)}, {header_sql(row)}, 1, {limit_sql(row)})
+        ON CONFLICT (bucket, is_sold, card_header) DO UPDATE SET
+            card_count = card_count + 1,
+            limit_sum = limit_sum + excluded.limit_sum;
+    """
+
+
+def _remove_row_sql(row: str) -> str:
+    return f"""
+        UPDATE card_counters SET
+            card_count = card_count - 1,
+            limit_sum = limit_sum - {limit_sql(row)}
+        WHERE bucket = {bucket_sql(row)}
+          AND is_sold = {is_sold_sql(row)}
+          AND card_header = {header_sql(row)};
+    """
+
+
+TRIGGERS = {
+    "card_counters_ai": f"AFTER INSERT ON cards BEGIN {_add_row_sql('new')} END",
+    "card_counters_ad": f"AFTER DELETE ON cards BEGIN {_remove_row_sql('old')} END",
+    "card_counters_au": (
+        f"AFTER UPDATE OF {COUNTED_COLUMNS} ON cards BEGIN "
+        f"{_remove_row_sql('old')} {_add_row_sql('new')} END"
+    ),
+}
+
+RECOUNT_SQL = f"""
+    SELECT {bucket_sql('cards')} AS bucket, {is_sold_sql('cards')} AS is_sold,
+           {header_sql('cards')} AS card_header, COUNT(*) AS card_count,
+           SUM({limit_sql('cards')}) AS limit_sum
+    FROM cards
+    GROUP BY 1, 2, 3
+"""
+
+
+def summarize_counters(rows) -> dict:
+    """
+    将计数行 (bucket, is_sold, card_header, card_count, limit_sum) 汇总为管理界面概览，
+    口径与 crud.get_card_stats 返回的 summary / header_stock 一致
+    """
+    summary = {"total": 0, "active": 0, "inactive": 0, "expired": 0, "deleted": 0, "sold": 0, "total_limit": 0.0}
+    header_stock = {}
+    for bucket, is_sold, card_header, card_count, limit_sum in rows:
+        if not card_count:
+            continue
+        summary[bucket] += card_count
+        if bucket == "deleted":
+            continue
+        summary["total"] += card_count
+        summary["total_limit"] += limit_sum or 0.0
+        summary["sold"] += card_count if is_sold else 0
+        if bucket == "inactive" and not is_sold:
+            header_stock[card_header] = header_stock.get(card_header, 0) + card_count
+    summary["total_limit"] = round(summary["total_limit"], 2)
+    return {"summary": summary, "header_stock": header_stock}
+
+
+def reconcile_card_counters(conn, fix: bool = True, tolerance: float = 0.01) -> list[dict]:
+    """
+    从 cards 全量重算计数并与 card_counters 对账（同步连接，供 init_db.py 调用）
+
+    参数:
+        conn: 同步 Connection（在事务中调用）
+        fix: 是否用重算结果覆盖计数表
+        tolerance: 额度合计允许的浮点误差
+
+    返回:
+        list[dict]: 存在偏差的分组，包含 期望值 与 计数表中的实际值
+    """
+    expected = {
+        (row.bucket, row.is_sold, row.card_header): (row.card_count, row.limit_sum or 0.0)
+        for row in conn.execute(text(RECOUNT_SQL))
+    }
+    actual = {
+        (row.bucket, row.is_sold, row.card_header): (row.card_count, row.limit_sum or 0.0)
+        for row in conn.execute(text(
+            "SELECT bucket, is_sold, card_header, card_count, limit_sum FROM card_counters"
+        ))
+        if row.card_count
+    }
+
+    drift = []
+    for key in sorted(expected.keys() | actual.keys()):
+        want = expected.get(key, (0, 0.0))
+        got = actual.get(key, (0, 0.0))
+        if want[0] != got[0] or abs(want[1] - got[1]) > tolerance:
+            drift.append({
+                "bucket": key[0],
+                "is_sold": key[1],
+                "card_header": key[2],
+                "expected_count": want[0],
+                "actual_count": got[0],
+                "expected_limit": want[1],
+                "actual_limit": got[1],
+            })
+
+    if fix:
+        conn.execute(text("DELETE FROM card_counters"))
+        conn.execute(text(
+            "INSERT INTO card_counters (bucket, is_sold, card_header, card_count, limit_sum) " + RECOUNT_SQL
+        ))
+    return drift
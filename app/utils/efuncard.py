@@ -1,8 +1,10 @@
 
-import httpx
 import re
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta, timezone
+from .json_codec import response_json
+from .activation_errors import UPSTREAM, exception_error_code, provider_error
+from .provider_limits import EFUNCARD, limited_client
 
 EFUNCARD_API_URL = "https://card.efuncard.com/api"
 EFUNCARD_BILLING_ADDRESS = {
@@ -65,7 +67,7 @@ async def redeem_efuncard_key(coupon: str) -> Dict[str, Any]:
     }
 
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
+        async with limited_client(EFUNCARD, follow_redirects=True, timeout=30.0) as client:
             # 1. 访问首页获取 CSRF Token (Cookies)
             print("[Efuncard] 正在获取 CSRF Token...")
             try:
@@ -84,13 +86,13 @@ async def redeem_efuncard_key(coupon: str) -> Dict[str, Any]:
             print(f"[Efuncard] API响应 ({response.status_code}): {response.text}")
 
             try:
-                resp_json = response.json()
+                resp_json = response_json(response)
             except Exception:
-                return {
-                    "success": False, 
-                    "error": f"API响应解析失败 (Status {response.status_code}): {response.text[:100]}",
-                    "raw_response": response.text
-                }
+                return provider_error(
+                    f"API响应解析失败 (Status {response.status_code}): {response.text[:100]}",
+                    UPSTREAM,
+                    raw_response=response.text
+                )
             
             # 3. 逻辑判断与降级查询
             is_success = resp_json.get("success") is True
@@ -104,7 +106,7 @@ async def redeem_efuncard_key(coupon: str) -> Dict[str, Any]:
                     try:
                         query_resp = await client.get(query_url, headers=headers)
                         print(f"[Efuncard] 查询响应 ({query_resp.status_code}): {query_resp.text}")
-                        query_json = query_resp.json()
+                        query_json = response_json(query_resp)
                         if query_json.get("success") is True:
                             print("[Efuncard] 查询成功，使用查询结果")
                             resp_json = query_json
@@ -151,17 +153,14 @@ async def redeem_efuncard_key(coupon: str) -> Dict[str, Any]:
                     "efuncard_original": data
                 }
             else:
-                 return {
-                    "success": False,
-                    "error": resp_json.get("message") or resp_json.get("error", "激活失败"),
-                    "code": resp_json.get("code")
-                }
+                return provider_error(
+                    resp_json.get("message") or resp_json.get("error", "激活失败"),
+                    status_code=response.status_code,
+                    code=resp_json.get("code")
+                )
 
     except Exception as e:
-        return {
-            "success": False,
-            "error": f"请求异常: {str(e)}"
-        }
+        return provider_error(f"请求异常: {str(e)}", exception_error_code(e))
 
 def _parse_efuncard_address(text: str) -> Optional[Dict[str, str]]:
     """
@@ -259,7 +258,7 @@ async def verify_3ds_code(last_four: str) -> Dict[str, Any]:
     print(f"[Efuncard] Checking 3DS code for last 4: {last_four}")
     
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
+        async with limited_client(EFUNCARD, follow_redirects=True, timeout=10.0) as client:
             # First ensure we have a session/CSRF token if needed, 
             # effectively just making the request might work if API is public or handles it.
             # But based on user log, it has csrf_token.
@@ -286,7 +285,7 @@ async def verify_3ds_code(last_four: str) -> Dict[str, Any]:
                     "error": f"HTTP {status}"
                 }
                 
-            return response.json()
+            return response_json(response)
             
     except Exception as e:
         print(f"[Efuncard] 3DS Verify Error: {e}")
@@ -312,7 +311,7 @@ async def get_efuncard_transactions(card_id_or_token: str) -> Dict[str, Any]:
     print(f"[Efuncard] Querying transactions for: {card_id_or_token}")
     
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=15.0) as client:
+        async with limited_client(EFUNCARD, follow_redirects=True, timeout=15.0) as client:
             # Try to get CSRF first
             try:
                 await client.get("https://card.efuncard.com/", headers=headers)
@@ -331,7 +330,7 @@ async def get_efuncard_transactions(card_id_or_token: str) -> Dict[str, Any]:
                     "error": f"HTTP {response.status_code}"
                 }
                 
-            resp_json = response.json()
+            resp_json = response_json(response)
             if not resp_json.get("success"):
                 return {
                     "success": False,
@@ -0,0 +1,177 @@
+"""
+卡片过期调度器
+后台维护一个按过期时间排序的最小堆，到期时批量将卡片状态更新为 expired，
+读接口不再需要在每次请求时全表扫描并写库
+"""
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from ..config import EXPIRY_RESYNC_INTERVAL, EXPIRY_WINDOW_SIZE
+from sqlalchemy import select
+
+from ..database import AsyncSessionLocal
+from .. import models
+
+logger = logging.getLogger(__name__)
+
+# 数据库中 naive 时间按 UTC+8 存储
+UTC8 = timezone(timedelta(hours=8))
+
+
+def exp_date_to_epoch(exp_date: Optional[datetime]) -> Optional[int]:
+    """将卡片过期时间转换为 UTC 时间戳（秒），naive 时间视为 UTC+8"""
+    if exp_date is None:
+        return None
+    if exp_date.tzinfo is None:
+        exp_date = exp_date.replace(tzinfo=UTC8)
+    return int(exp_date.timestamp())
+
+
+class ExpiryScheduler:
+    """
+    过期调度器
+
+    - 启动时按 exp_epoch 索引加载最早过期的 window_size 张卡片
+    - 写路径（激活/查询）通过 schedule() 登记新的过期时间
+    - 每隔 EXPIRY_RESYNC_INTERVAL 秒（或窗口耗尽时）重建一次堆，兜底其它途径写入的过期时间
+    - 到期时执行一条 UPDATE ... WHERE exp_epoch < now，堆只决定何时唤醒
+    """
+
+    def __init__(
+        self,
+        resync_interval: int = EXPIRY_RESYNC_INTERVAL,
+        window_size: int = EXPIRY_WINDOW_SIZE
+    ):
+        self.resync_interval = resync_interval
+        self.window_size = window_size
+        self._heap: list[tuple[int, str]] = []
+        # 窗口被截断时，窗口内最晚的过期时间；到达后需要重新加载
+        self._window_end: Optional[int] = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self, card_id: str, exp_epoch: Optional[int]) -> None:
+        """登记卡片的过期时间（UTC 时间戳）"""
+        if exp_epoch is None:
+            return
+        deadline = exp_epoch
+        with self._lock:
+            is_earliest = not self._heap or deadline < self._heap[0][0]
+            heapq.heappush(self._heap, (deadline, card_id))
+        # 新的过期时间早于当前等待的时间点时，唤醒调度循环重新计算等待时长
+        if is_earliest and self._loop and self._wakeup:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pending_count(self) -> int:
+        """堆中待处理的过期条目数"""
+        with self._lock:
+            return len(self._heap)
+
+    async def start(self) -> None:
+        """启动后台调度任务"""
+        if self._task:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await self._resync()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"⏰ 过期调度器已启动，待跟踪卡片 {self.pending_count()} 张")
+
+    async def stop(self) -> None:
+        """停止后台调度任务"""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _resync(self) -> None:
+        """从数据库重建过期堆（只加载最早过期的一个窗口）"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.Card.exp_epoch, models.Card.card_id).where(
+                    models.Card.exp_epoch.isnot(None),
+                    models.Card.status != 'deleted',
+                    models.Card.status != 'expired'
+                ).order_by(models.Card.exp_epoch).limit(self.window_size)
+            )
+            rows = result.all()
+
+        heap = [tuple(row) for row in rows]  # 已按 exp_epoch 排序，天然满足堆性质
+        with self._lock:
+            self._heap = heap
+            self._window_end = heap[-1][0] if len(heap) >= self.window_size else None
+
+    def _pop_due(self, now: float) -> bool:
+        """弹出所有已到期的条目，返回是否有条目到期"""
+        has_due = False
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                heapq.heappop(self._heap)
+                has_due = True
+        return has_due
+
+    def _next_resync_at(self, next_resync: float) -> float:
+        """下一次重建时间：定时重建，或窗口被截断时在窗口末尾重建"""
+        with self._lock:
+            window_end = self._window_end
+        if window_end is not None:
+            return min(next_resync, window_end)
+        return next_resync
+
+    def _next_timeout(self, now: float, next_resync: float) -> float:
+        """计算距离下一个到期点（或下一次重建）的等待时长"""
+        with self._lock:
+            next_deadline = self._heap[0][0] if self._heap else next_resync
+        return max(0.0, min(next_deadline, next_resync) - now)
+
+    async def _sweep(self) -> int:
+        """批量将到期卡片标记为 expired"""
+        from .. import crud
+
+        async with AsyncSessionLocal() as db:
+            return await crud.update_expired_cards(db)
+
+    async def _run(self) -> None:
+        """调度循环"""
+        next_resync = time.time() + self.resync_interval
+        while True:
+            try:
+                now = time.time()
+                if now >= self._next_resync_at(next_resync):
+                    await self._resync()
+                    next_resync = now + self.resync_interval
+
+                if self._pop_due(now):
+                    count = await self._sweep()
+                    if count:
+                        logger.info(f"⏰ 已将 {count} 张卡片标记为过期")
+                    continue
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(),
+                        timeout=self._next_timeout(time.time(), self._next_resync_at(next_resync))
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ 过期调度异常: {e}")
+                await asyncio.sleep(5)
+
+
+# 全局调度器实例
+expiry_scheduler = ExpiryScheduler()
@@ -1,5 +1,7 @@
-import httpx
 from typing import Dict, Any
+from .json_codec import response_json
+from .activation_errors import exception_error_code, provider_error, tag_response
+from .provider_limits import HOLY, limited_client
 
 HOLY_ACTIVATE_URL = "http://holymastercard.com/api/license/activate"
 
@@ -32,11 +34,11 @@ async def redeem_holy_key(license_key: str) -> Dict[str, Any]:
 
     payload = {"licenseKey": real_key}
 
-    async with httpx.AsyncClient() as client:
+    async with limited_client(HOLY) as client:
         try:
             print(f"[Holy] Activating key: {real_key}")
             response = await client.post(HOLY_ACTIVATE_URL, json=payload, headers=headers, timeout=30.0)
-            data = response.json()
+            data = response_json(response)
             
             # 为 -4866 卡密注入特定账单地址
             if is_4866 and isinstance(data, dict):
@@ -58,7 +60,7 @@ async def redeem_holy_key(license_key: str) -> Dict[str, Any]:
                     "country": "UK"
                 }
                 
-            return data
+            return tag_response(data, response.status_code)
         except Exception as e:
             print(f"[Holy] Error activating key: {e}")
-            return {"success": False, "error": f"Network Error: {str(e)}"}
+            return provider_error(f"Network Error: {str(e)}", exception_error_code(e))
@@ -0,0 +1,28 @@
+"""
+JSON 编解码（基于 orjson）
+应用默认响应类使用 ORJSONResponse；各渠道模块解析上游响应统一使用 response_json()
+"""
+from typing import Any
+
+import httpx
+import orjson
+
+
+def loads(data: str | bytes) -> Any:
+    """解析 JSON（解析失败抛出 orjson.JSONDecodeError，是 ValueError 的子类）"""
+    return orjson.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """序列化为紧凑 JSON（UTF-8 字节，时间按 ISO 格式输出）"""
+    return orjson.dumps(obj)
+
+
+def dumps_str(obj: Any) -> str:
+    """序列化为紧凑 JSON 字符串"""
+    return orjson.dumps(obj).decode()
+
+
+def response_json(response: httpx.Response) -> Any:
+    """解析上游 HTTP 响应体，代替 response.json()"""
+    return orjson.loads(response.content)
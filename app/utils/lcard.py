@@ -1,7 +1,9 @@
-import httpx
 import re
 from typing import Dict, Any
 from datetime import datetime, timedelta, timezone
+from .json_codec import response_json
+from .activation_errors import INVALID, UPSTREAM, exception_error_code, provider_error
+from .provider_limits import LCARD, limited_client
 
 LCARD_API_URL = "https://vc7777.cn/api.php"
 
@@ -15,7 +17,7 @@ async def redeem_lcard_key(card_key: str) -> Dict[str, Any]:
 
     print(f"[LCard] Querying key: {real_key}")
 
-    async with httpx.AsyncClient() as client:
+    async with limited_client(LCARD) as client:
         try:
             print(f"[LCard] Request URL: {LCARD_API_URL} (POST)")
             
@@ -32,12 +34,12 @@ async def redeem_lcard_key(card_key: str) -> Dict[str, Any]:
 
             # 解析 JSON
             try:
-                data = response.json()
+                data = response_json(response)
                 print(f"[LCard] Parsed JSON: {data}")
             except Exception:
                 # 某些 PHP error 可能会返回 text/html
                 print(f"[LCard] Invalid JSON Response: {response.text[:200]}")
-                return {"success": False, "error": f"Invalid JSON response: {response.text[:100]}"}
+                return provider_error(f"Invalid JSON response: {response.text[:100]}", UPSTREAM)
             
             # 确定目标结果对象
             target_result = None
@@ -192,8 +194,8 @@ async def redeem_lcard_key(card_key: str) -> Dict[str, Any]:
                 return normalized_data
             
             # 未找到有效数据
-            return {"success": False, "error": "No matching card data found", "raw": data}
+            return provider_error("No matching card data found", INVALID, raw=data)
             
         except Exception as e:
             print(f"[LCard] Error: {e}")
-            return {"success": False, "error": f"Network Error: {str(e)}"}
+            return provider_error(f"Network Error: {str(e)}", exception_error_code(e))
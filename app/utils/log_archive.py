@@ -0,0 +1,207 @@
+"""
+激活记录归档
+后台定期把超过保留天数的激活记录按天追加到 gzip 压缩的 NDJSON 文件
+（activation_logs-YYYY-MM-DD.jsonl.gz，日期为 UTC），写入文件后再从数据库删除；
+需要时可按卡密、日期范围检索归档文件
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import select, delete
+
+from ..config import (
+    ACTIVATION_LOG_RETENTION_DAYS,
+    ACTIVATION_LOG_ARCHIVE_DIR,
+    ACTIVATION_LOG_ARCHIVE_INTERVAL,
+)
+from ..database import LogAsyncSessionLocal
+from .. import models
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PREFIX = "activation_logs-"
+ARCHIVE_SUFFIX = ".jsonl.gz"
+
+
+class ActivationLogArchiver:
+    """
+    激活记录归档器
+
+    - 按 id 顺序（即写入顺序）分批读取超期记录，遇到未超期的记录即停止，无需按时间扫描全表
+    - 先追加写入归档文件，再删除数据库中的记录；两步之间中断时下次会重复归档，检索时按 id 去重
+    - gzip 追加写入会生成多个成员，读取时按一个连续流解压
+    """
+
+    def __init__(
+        self,
+        retention_days: int = ACTIVATION_LOG_RETENTION_DAYS,
+        archive_dir: str = ACTIVATION_LOG_ARCHIVE_DIR,
+        interval: int = ACTIVATION_LOG_ARCHIVE_INTERVAL,
+        batch_size: int = 5000
+    ):
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """启动后台归档任务（保留天数为 0 时不启动）"""
+        if self._task or self.retention_days <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"🗄️ 激活记录归档已启动，保留 {self.retention_days} 天")
+
+    async def stop(self) -> None:
+        """停止后台归档任务"""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _archive_path(self, day: date) -> str:
+        return os.path.join(self.archive_dir, f"{ARCHIVE_PREFIX}{day.isoformat()}{ARCHIVE_SUFFIX}")
+
+    def _write_archive(self, rows: list[dict]) -> None:
+        """按天追加写入归档文件"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        by_day: dict[date, list[dict]] = {}
+        for row in rows:
+            by_day.setdefault(row["activation_time"].date(), []).append(row)
+
+        for day, day_rows in by_day.items():
+            with gzip.open(self._archive_path(day), "at", encoding="utf-8") as f:
+                for row in day_rows:
+                    f.write(json.dumps(
+                        {**row, "activation_time": row["activation_time"].isoformat()},
+                        ensure_ascii=False
+                    ) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    async def archive_once(self) -> int:
+        """归档一次所有超期记录，返回归档条数"""
+        # activation_time 以 naive UTC 存储
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=self.retention_days)
+        Log = models.ActivationLog
+        archived = 0
+        last_id = 0
+
+        while True:
+            async with LogAsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(Log.id, Log.card_id, Log.status, Log.error_message, Log.activation_time, Log.response_data)
+                    .where(Log.id > last_id)
+                    .order_by(Log.id)
+                    .limit(self.batch_size)
+                )
+                batch = [dict(row._mapping) for row in result]
+                expired = []
+                for row in batch:
+                    if row["activation_time"] is not None and row["activation_time"] >= cutoff:
+                        break
+                    expired.append(row)
+                if not expired:
+                    return archived
+
+                # 没有时间的历史记录归入 1970-01-01
+                for row in expired:
+                    if row["activation_time"] is None:
+                        row["activation_time"] = datetime(1970, 1, 1)
+                await asyncio.to_thread(self._write_archive, expired)
+
+                await db.execute(delete(Log).where(Log.id.in_([row["id"] for row in expired])))
+                await db.commit()
+
+            archived += len(expired)
+            last_id = expired[-1]["id"]
+            if len(expired) < len(batch) or len(batch) < self.batch_size:
+                return archived
+
+    def archived_days(self) -> list[date]:
+        """已有归档文件的日期（升序）"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        days = []
+        for name in os.listdir(self.archive_dir):
+            if name.startswith(ARCHIVE_PREFIX) and name.endswith(ARCHIVE_SUFFIX):
+                try:
+                    days.append(date.fromisoformat(name[len(ARCHIVE_PREFIX):-len(ARCHIVE_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(days)
+
+    def search(
+        self,
+        card_id: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        status: Optional[str] = None,
+        limit: int = 500
+    ) -> list[dict]:
+        """
+        检索归档记录（同步，按日期倒序读取文件，只打开日期范围内的文件）
+
+        参数:
+            card_id: 卡密
+            start_date / end_date: 日期范围（UTC，包含两端）
+            status: 激活状态 success / failed
+            limit: 最多返回条数
+
+        返回:
+            list[dict]: 按时间倒序的归档记录
+        """
+        results = []
+        seen_ids = set()
+        for day in reversed(self.archived_days()):
+            if start_date and day < start_date:
+                break
+            if end_date and day > end_date:
+                continue
+
+            day_rows = []
+            with gzip.open(self._archive_path(day), "rt", encoding="utf-8") as f:
+                for line in f:
+                    if card_id and f'"card_id": {json.dumps(card_id, ensure_ascii=False)}' not in line:
+                        continue
+                    row = json.loads(line)
+                    if card_id and row["card_id"] != card_id:
+                        continue
+                    if status and row["status"] != status:
+                        continue
+                    if row["id"] in seen_ids:
+                        continue
+                    seen_ids.add(row["id"])
+                    day_rows.append(row)
+
+            day_rows.sort(key=lambda row: row["activation_time"], reverse=True)
+            results.extend(day_rows)
+            if len(results) >= limit:
+                return results[:limit]
+        return results
+
+    async def _run(self) -> None:
+        """归档循环"""
+        while True:
+            try:
+                count = await self.archive_once()
+                if count:
+                    logger.info(f"🗄️ 已归档 {count} 条激活记录")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ 激活记录归档失败: {e}")
+            await asyncio.sleep(self.interval)
+
+
+# 全局归档器实例
+activation_log_archiver = ActivationLogArchiver()
@@ -1,6 +1,9 @@
-import httpx
 from typing import Dict, Any, Optional
 
+from .json_codec import response_json
+from .activation_errors import exception_error_code, provider_error, tag_response
+from .provider_limits import ACTCARD, limited_client
+
 MERCURY_REDEEM_URL = "https://actcard.xyz/api/keys/redeem"
 MERCURY_QUERY_URL = "https://actcard.xyz/api/keys/query"
 MERCURY_TRANSACTIONS_URL = "https://actcard.xyz/api/keys/transactions"
@@ -75,14 +78,14 @@ async def redeem_key(key_id: str) -> Dict[str, Any]:
                 "redeem_mode": f"{suffix}-gpt-plus-team"
             }
 
-    async with httpx.AsyncClient() as client:
+    async with limited_client(ACTCARD) as client:
         # Step 1: 先查询卡密状态（仅用于判断是否已激活，失败不阻塞 redeem）
         try:
             query_response = await client.post(MERCURY_QUERY_URL, json=payload, headers=headers)
             
             # 只有 HTTP 200 时才解析并判断
             if query_response.status_code == 200:
-                query_data = query_response.json()
+                query_data = response_json(query_response)
                 
                 # 卡密已激活，直接返回
                 if query_data.get("success") is True:
@@ -103,8 +106,12 @@ async def redeem_key(key_id: str) -> Dict[str, Any]:
             print(f"[Mercury] Query 异常（不影响 redeem）: {e}")
 
         # Step 2: Redeem if unused
-        response = await client.post(MERCURY_REDEEM_URL, json=payload, headers=headers)
-        return response.json()
+        try:
+            response = await client.post(MERCURY_REDEEM_URL, json=payload, headers=headers)
+            return tag_response(response_json(response), response.status_code)
+        except Exception as e:
+            print(f"[Mercury] Redeem 请求失败: {e}")
+            return provider_error(f"Network Error: {str(e)}", exception_error_code(e))
 
 
 async def redeem_airwallex_key(key_id: str) -> Dict[str, Any]:
@@ -125,14 +132,14 @@ async def redeem_airwallex_key(key_id: str) -> Dict[str, Any]:
     code = key_id.rsplit("-", 1)[0]
     payload = {"code": code}
 
-    async with httpx.AsyncClient() as client:
+    async with limited_client(ACTCARD) as client:
         try:
             print(f"[Airwallex] POST {AIRWALLEX_REDEEM_URL} payload: {payload}")
             response = await client.post(AIRWALLEX_REDEEM_URL, json=payload, headers=headers)
-            return response.json()
+            return tag_response(response_json(response), response.status_code)
         except Exception as e:
             print(f"[Airwallex] 请求失败: {e}")
-            return {"success": False, "error": f"Network Error: {str(e)}"}
+            return provider_error(f"Network Error: {str(e)}", exception_error_code(e))
 
 
 async def get_key_transactions(key_id: str) -> Dict[str, Any]:
@@ -154,10 +161,10 @@ async def get_key_transactions(key_id: str) -> Dict[str, Any]:
         
     payload = {"key_id": key_id}
 
-    async with httpx.AsyncClient() as client:
+    async with limited_client(ACTCARD) as client:
         try:
             response = await client.post(MERCURY_TRANSACTIONS_URL, json=payload, headers=headers)
-            data = response.json()
+            data = response_json(response)
             
             # 如果请求失败或success为false, 直接返回
             if not data.get("success"):
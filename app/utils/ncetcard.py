@@ -1,10 +1,11 @@
 """
 ncetCard 卡密激活模块
 """
-import httpx
 import asyncio
-import json
 from typing import Dict, Any
+from .json_codec import response_json, loads
+from .activation_errors import INVALID, UPSTREAM, exception_error_code, provider_error
+from .provider_limits import NCETCARD, limited_client
 
 NCETCARD_BASE_URL = "https://sd.ncet.top"
 
@@ -40,12 +41,12 @@ async def redeem_ncetcard_key(card_key: str) -> Dict[str, Any]:
         "Referer": f"{NCETCARD_BASE_URL}/redeem",
     }
 
-    async with httpx.AsyncClient() as client:
+    async with limited_client(NCETCARD) as client:
         try:
             print(f"[ncetCard] 1. 验证卡密: {code}")
             validate_url = f"{NCETCARD_BASE_URL}/shop/shop/redeem/validate?code={code}"
             val_resp = await client.get(validate_url, headers=headers, timeout=15.0)
-            val_data = val_resp.json()
+            val_data = response_json(val_resp)
             print(f"[ncetCard] 验证响应: {val_data}")
 
             val_res_data = val_data.get("data", {})
@@ -55,11 +56,13 @@ async def redeem_ncetcard_key(card_key: str) -> Dict[str, Any]:
                 return _parse_ncetcard_data(val_res_data.get("cards")[0], val_data)
 
             if val_data.get("code") != 200 or not val_res_data.get("valid"):
-                return {
-                    "success": False,
-                    "error": f"卡密验证失败: {val_data.get('message', '未知错误')}",
-                    "original_response": val_data
-                }
+                # 验证接口正常返回但卡密不可用，视为无效卡密
+                return provider_error(
+                    f"卡密验证失败: {val_data.get('message', '未知错误')}",
+                    INVALID if val_data.get("code") == 200 else None,
+                    status_code=val_resp.status_code,
+                    original_response=val_data
+                )
 
             print(f"[ncetCard] 2. 提交兑换请求: {code}")
             redeem_url = f"{NCETCARD_BASE_URL}/shop/shop/redeem"
@@ -69,23 +72,19 @@ async def redeem_ncetcard_key(card_key: str) -> Dict[str, Any]:
                 "quantity": 1
             }
             redeem_resp = await client.post(redeem_url, json=payload, headers=headers, timeout=15.0)
-            redeem_data = redeem_resp.json()
+            redeem_data = response_json(redeem_resp)
             print(f"[ncetCard] 兑换响应: {redeem_data}")
 
             if redeem_data.get("code") != 200:
-                return {
-                    "success": False,
-                    "error": f"兑换失败: {redeem_data.get('message', '未知错误')}",
-                    "original_response": redeem_data
-                }
+                return provider_error(
+                    f"兑换失败: {redeem_data.get('message', '未知错误')}",
+                    status_code=redeem_resp.status_code,
+                    original_response=redeem_data
+                )
 
             order_no = redeem_data.get("data", {}).get("orderNo")
             if not order_no:
-                return {
-                    "success": False,
-                    "error": "兑换成功但未返回订单号",
-                    "original_response": redeem_data
-                }
+                return provider_error("兑换成功但未返回订单号", UPSTREAM, original_response=redeem_data)
 
             print(f"[ncetCard] 3. 开始轮询订单状态, OrderNo: {order_no}")
             status_url = f"{NCETCARD_BASE_URL}/shop/shop/redeem/order-status/{order_no}"
@@ -96,7 +95,7 @@ async def redeem_ncetcard_key(card_key: str) -> Dict[str, Any]:
             for i in range(max_retries):
                 await asyncio.sleep(2)
                 status_resp = await client.get(status_url, headers=headers, timeout=10.0)
-                status_data = status_resp.json()
+                status_data = response_json(status_resp)
                 print(f"[ncetCard] 轮询 {i+1}/{max_retries} 次响应: {status_data}")
 
                 if status_data.get("code") == 200:
@@ -107,18 +106,15 @@ async def redeem_ncetcard_key(card_key: str) -> Dict[str, Any]:
                         break
                 
             if not card_info:
-                return {
-                    "success": False,
-                    "error": "轮询超时，未获取到卡片信息",
-                    "original_response": redeem_data
-                }
+                # 已兑换成功，重试时验证接口会直接返回已生成的卡片
+                return provider_error("轮询超时，未获取到卡片信息", UPSTREAM, original_response=redeem_data)
 
             print(f"[ncetCard] 获取到卡片信息: {card_info}")
             return _parse_ncetcard_data(card_info, status_data)
 
         except Exception as e:
             print(f"[ncetCard] 请求异常: {e}")
-            return {"success": False, "error": f"Network Error: {str(e)}"}
+            return provider_error(f"Network Error: {str(e)}", exception_error_code(e))
 
 def _format_time_with_tz(time_str: str) -> str:
     """如果日期没有时区信息，默认添加中国时区 (+08:00)"""
@@ -134,7 +130,7 @@ def _parse_ncetcard_data(card_info: dict, original_response: dict) -> dict:
     """
     card_data_str = card_info.get("cardData", "{}")
     try:
-        card_data_json = json.loads(card_data_str)
+        card_data_json = loads(card_data_str)
     except Exception as e:
         print(f"[ncetCard] 解析 cardData 失败: {e}")
         card_data_json = {}
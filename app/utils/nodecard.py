@@ -2,8 +2,10 @@
 NodeCard 卡密激活模块
 API: https://api.node-card.com/api/card/issue
 """
-import httpx
 from typing import Dict, Any
+from .json_codec import response_json
+from .activation_errors import exception_error_code, provider_error
+from .provider_limits import NODECARD, limited_client
 
 NODECARD_API_URL = "https://api.node-card.com/api/open/card/redeem"
 
@@ -63,7 +65,7 @@ async def redeem_nodecard_key(card_key: str) -> Dict[str, Any]:
             )
 
             print(f"[NodeCard] {attempt_label} 响应状态码: {response.status_code}")
-            data = response.json()
+            data = response_json(response)
             print(f"[NodeCard] {attempt_label} 响应数据: {data}")
 
             # NodeCard 的成功标志是 code == 1
@@ -110,17 +112,13 @@ async def redeem_nodecard_key(card_key: str) -> Dict[str, Any]:
             # 失败情况
             error_msg = data.get("msg", "Unknown error")
             print(f"[NodeCard] {attempt_label} 激活失败: {error_msg}")
-            return {
-                "success": False,
-                "error": f"{error_msg}",
-                "original_response": data
-            }
+            return provider_error(f"{error_msg}", status_code=response.status_code, original_response=data)
 
         except Exception as e:
             print(f"[NodeCard] {attempt_label} 请求异常: {e}")
-            return {"success": False, "error": f"Network Error: {str(e)}"}
+            return provider_error(f"Network Error: {str(e)}", exception_error_code(e))
 
-    async with httpx.AsyncClient() as client:
+    async with limited_client(NODECARD) as client:
         # 第一次尝试：使用原始参数激活
         result = await _do_redeem(client, payload, "第1次尝试")
 
@@ -181,7 +179,7 @@ async def get_nodecard_transactions(card_key: str) -> Dict[str, Any]:
 
     payload = {"card_key": real_key}
 
-    async with httpx.AsyncClient() as client:
+    async with limited_client(NODECARD) as client:
         try:
             print(f"[NodeCard] 查询交易记录: {real_key}")
             response = await client.post(
@@ -192,7 +190,7 @@ async def get_nodecard_transactions(card_key: str) -> Dict[str, Any]:
             )
 
             print(f"[NodeCard] 交易记录响应状态码: {response.status_code}")
-            data = response.json()
+            data = response_json(response)
             print(f"[NodeCard] 交易记录响应: {data}")
 
             if data.get("code") == 1 and isinstance(data.get("data"), dict):
@@ -0,0 +1,192 @@
+"""
+上游渠道限流
+- 按渠道限制同时进行的请求数（并发上限）和每秒发起的请求数（令牌桶），进程内所有激活/查询路径共用
+- 渠道模块通过 limited_client() 创建 HTTP 客户端，每个上游 HTTP 请求（含轮询中的每次查询）单独占用名额，
+  请求之间的等待（如轮询间隔）不占用
+- 多个批量激活任务、流式接口、公开页面的单卡激活同时访问同一渠道时，总请求量不超过该渠道的限制
+- 排队中的请求数、进行中的请求数等统计见 stats()
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+
+from ..config import PROVIDER_LIMITS, PROVIDER_MAX_IN_FLIGHT, PROVIDER_RATE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+# 渠道名称（Mercury 与 Airwallex 同在 actcard.xyz，共用一个限额）
+ACTCARD = "actcard"
+VOCARD = "vocard"
+EFUNCARD = "efuncard"
+HOLY = "holy"
+LCARD = "lcard"
+NODECARD = "nodecard"
+NCETCARD = "ncetcard"
+PROVIDERS = (ACTCARD, VOCARD, EFUNCARD, HOLY, LCARD, NODECARD, NCETCARD)
+
+
+class TokenBucket:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多积攒 1 秒的量（至少 1 个）
+
+    令牌不足时预支（令牌数可为负），按预支后的欠额计算等待时间，先到的请求先放行
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        self._refill()
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return
+        try:
+            await asyncio.sleep(-self._tokens / self.rate)
+        except asyncio.CancelledError:
+            # 取消等待时归还预支的令牌
+            self._tokens += 1
+            raise
+
+
+class ProviderLimiter:
+    """单个渠道的并发上限 + 令牌桶"""
+
+    def __init__(self, name: str, max_in_flight: int, rate: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.bucket = TokenBucket(rate)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.max_waiting = 0
+        self.requests = 0
+        self.wait_seconds = 0.0
+
+    def _get_semaphore(self) -> Optional[asyncio.Semaphore]:
+        """信号量绑定事件循环，事件循环变化时（如测试中多次启动应用）重新创建"""
+        if self.max_in_flight <= 0:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """占用一个请求名额：先等并发名额，再等令牌"""
+        semaphore = self._get_semaphore()
+        started = time.monotonic()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+            try:
+                await self.bucket.acquire()
+            except BaseException:
+                if semaphore is not None:
+                    semaphore.release()
+                raise
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.requests += 1
+        self.wait_seconds += time.monotonic() - started
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "rate_limit": self.bucket.rate,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "requests": self.requests,
+            "avg_wait_seconds": round(self.wait_seconds / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+def parse_overrides(text: str) -> Dict[str, Tuple[int, float]]:
+    """解析 PROVIDER_LIMITS："vocard=5:2,holy=3:1" -> {"vocard": (5, 2.0), "holy": (3, 1.0)}"""
+    overrides = {}
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            name, value = item.split("=", 1)
+            in_flight, rate = value.split(":", 1)
+            overrides[name.strip().lower()] = (int(in_flight), float(rate))
+        except ValueError:
+            logger.warning("忽略无法解析的渠道限流配置: %s", item)
+    return overrides
+
+
+class ProviderLimits:
+    """按渠道名称管理限流器，未配置覆盖的渠道使用默认限额"""
+
+    def __init__(self, max_in_flight: int = PROVIDER_MAX_IN_FLIGHT, rate: float = PROVIDER_RATE_LIMIT,
+                 overrides: str = PROVIDER_LIMITS):
+        self.default_max_in_flight = max_in_flight
+        self.default_rate = rate
+        self.overrides = parse_overrides(overrides)
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        for name in PROVIDERS:
+            self.get(name)
+
+    def get(self, name: str) -> ProviderLimiter:
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            max_in_flight, rate = self.overrides.get(name, (self.default_max_in_flight, self.default_rate))
+            limiter = self._limiters[name] = ProviderLimiter(name, max_in_flight, rate)
+        return limiter
+
+    def slot(self, name: str):
+        """async with provider_limits.slot(name): ... 内发起对该渠道的请求"""
+        return self.get(name).slot()
+
+    def stats(self) -> dict:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+
+# 全局实例
+provider_limits = ProviderLimits()
+
+
+class LimitedClient(httpx.AsyncClient):
+    """经过渠道限流的 httpx 异步客户端：每次发送请求（含跟随重定向、读取响应体）占用一次名额"""
+
+    def __init__(self, provider: str, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.provider = provider
+
+    async def send(self, request: httpx.Request, **kwargs: Any) -> httpx.Response:
+        async with provider_limits.slot(self.provider):
+            return await super().send(request, **kwargs)
+
+
+def limited_client(provider: str, **kwargs: Any) -> LimitedClient:
+    """创建经过指定渠道限流的客户端，参数同 httpx.AsyncClient"""
+    return LimitedClient(provider, **kwargs)
@@ -1,8 +1,10 @@
 
-import httpx
 import re
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta, timezone
+from .json_codec import response_json
+from .activation_errors import UPSTREAM, exception_error_code, provider_error
+from .provider_limits import VOCARD, limited_client
 
 VOCARD_API_URL = "https://vocard.store/user/api/order/trade"
 VOCARD_BILLING_ADDRESS = {
@@ -76,20 +78,20 @@ async def redeem_vocard_key(coupon: str) -> Dict[str, Any]:
     }
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with limited_client(VOCARD) as client:
             response = await client.post(VOCARD_API_URL, data=data, headers=headers, timeout=30.0)
             
             # 记录原始响应以便调试
             print(f"[Vocard] API响应: {response.text}")
             
             try:
-                resp_json = response.json()
+                resp_json = response_json(response)
             except Exception:
-                return {
-                    "success": False,
-                    "error": f"API响应解析失败: {response.text[:100]}",
-                    "raw_response": response.text
-                }
+                return provider_error(
+                    f"API响应解析失败: {response.text[:100]}",
+                    UPSTREAM,
+                    raw_response=response.text
+                )
 
             if resp_json.get("code") == 200:
                 # 解析成功
@@ -101,11 +103,7 @@ async def redeem_vocard_key(coupon: str) -> Dict[str, Any]:
                 parsed_card = _parse_vocard_secret(secret)
                 
                 if not parsed_card:
-                    return {
-                        "success": False,
-                        "error": f"无法解析卡密信息: {secret}",
-                        "raw_data": api_data
-                    }
+                    return provider_error(f"无法解析卡密信息: {secret}", UPSTREAM, raw_data=api_data)
 
                 # 构建符合系统标准的返回结构
                 return {
@@ -128,17 +126,14 @@ async def redeem_vocard_key(coupon: str) -> Dict[str, Any]:
                     "vocard_original": api_data
                 }
             else:
-                return {
-                    "success": False, 
-                    "error": resp_json.get("msg", "未知错误"),
-                    "code": resp_json.get("code")
-                }
+                return provider_error(
+                    resp_json.get("msg", "未知错误"),
+                    status_code=response.status_code,
+                    code=resp_json.get("code")
+                )
 
     except Exception as e:
-        return {
-            "success": False,
-            "error": f"请求异常: {str(e)}"
-        }
+        return provider_error(f"请求异常: {str(e)}", exception_error_code(e))
 
 def _parse_vocard_secret(secret: str) -> Optional[Dict[str, str]]:
     """
@@ -212,7 +207,7 @@ async def _redeem_vocard_new(coupon: str) -> Dict[str, Any]:
     }
 
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
+        async with limited_client(VOCARD, follow_redirects=True, timeout=30.0) as client:
             # 1. 访问首页获取 CSRF Token (Cookies)
             print("[Vocard] 正在获取 CSRF Token...")
             try:
@@ -231,13 +226,13 @@ async def _redeem_vocard_new(coupon: str) -> Dict[str, Any]:
             print(f"[Vocard] API响应 ({response.status_code}): {response.text}")
 
             try:
-                resp_json = response.json()
+                resp_json = response_json(response)
             except Exception:
-                return {
-                    "success": False, 
-                    "error": f"API响应解析失败 (Status {response.status_code}): {response.text[:100]}",
-                    "raw_response": response.text
-                }
+                return provider_error(
+                    f"API响应解析失败 (Status {response.status_code}): {response.text[:100]}",
+                    UPSTREAM,
+                    raw_response=response.text
+                )
             
             # 3. 逻辑判断与降级查询
             is_success = resp_json.get("success") is True
@@ -251,7 +246,7 @@ async def _redeem_vocard_new(coupon: str) -> Dict[str, Any]:
                     try:
                         query_resp = await client.get(query_url, headers=headers)
                         print(f"[Vocard] 查询响应 ({query_resp.status_code}): {query_resp.text}")
-                        query_json = query_resp.json()
+                        query_json = response_json(query_resp)
                         if query_json.get("success") is True:
                             print("[Vocard] 查询成功，使用查询结果")
                             resp_json = query_json
@@ -295,17 +290,14 @@ async def _redeem_vocard_new(coupon: str) -> Dict[str, Any]:
                     "vocard_original": data
                 }
             else:
-                 return {
-                    "success": False,
-                    "error": resp_json.get("message") or resp_json.get("error", "激活失败"),
-                    "code": resp_json.get("code")
-                }
+                return provider_error(
+                    resp_json.get("message") or resp_json.get("error", "激活失败"),
+                    status_code=response.status_code,
+                    code=resp_json.get("code")
+                )
 
     except Exception as e:
-        return {
-            "success": False,
-            "error": f"请求异常: {str(e)}"
-        }
+        return provider_error(f"请求异常: {str(e)}", exception_error_code(e))
 
 def _parse_cdk_address(text: str) -> Optional[Dict[str, str]]:
     """
@@ -373,7 +365,7 @@ async def verify_3ds_code(last_four: str) -> Dict[str, Any]:
     print(f"[Vocard] Checking 3DS code for last 4: {last_four}")
     
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
+        async with limited_client(VOCARD, follow_redirects=True, timeout=10.0) as client:
             # First ensure we have a session/CSRF token if needed, 
             # effectively just making the request might work if API is public or handles it.
             # But based on user log, it has csrf_token.
@@ -400,7 +392,7 @@ async def verify_3ds_code(last_four: str) -> Dict[str, Any]:
                     "error": f"HTTP {status}"
                 }
                 
-            return response.json()
+            return response_json(response)
             
     except Exception as e:
         print(f"[Vocard] 3DS Verify Error: {e}")
@@ -426,7 +418,7 @@ async def get_vocard_transactions(card_id_or_token: str) -> Dict[str, Any]:
     print(f"[Vocard] Querying transactions for: {card_id_or_token}")
     
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=15.0) as client:
+        async with limited_client(VOCARD, follow_redirects=True, timeout=15.0) as client:
             # Try to get CSRF first
             try:
                 await client.get("https://vocard.store/", headers=headers)
@@ -445,7 +437,7 @@ async def get_vocard_transactions(card_id_or_token: str) -> Dict[str, Any]:
                     "error": f"HTTP {response.status_code}"
                 }
                 
-            resp_json = response.json()
+            resp_json = response_json(response)
             if not resp_json.get("success"):
                 return {
                     "success": False,
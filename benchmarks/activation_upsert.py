@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+激活写入往返次数检查 + 吞吐基准
+
+检查 crud.upsert_card_activation 对已有卡片和本地不存在的卡片都只执行一条 SQL（地址字典命中缓存时），
+并对比单条 upsert 与 save_card_activations 批量写入的吞吐
+
+用法：
+    python benchmarks/activation_upsert.py --cards 2000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from common import (
+    alembic_upgrade, capture_sql, make_async_session_factory, make_session_factory,
+    remove_database, seed_cards, temp_database_url
+)
+
+from sqlalchemy import select
+
+from app import crud, models, schemas
+
+ADDRESS = ("41 Glenn Rd C23, East Hartford, CT 06118", {
+    "address1": "41 Glenn Rd C23", "city": "East Hartford", "region": "CT",
+    "postal_code": "06118", "country": "US",
+})
+
+
+def activation(card_id: str, i: int) -> dict:
+    return {
+        "card_id": card_id,
+        "card_number": f"5236{i:012d}",
+        "card_cvc": "123",
+        "card_exp_date": "11/31",
+        "billing_address": ADDRESS[0],
+        "legal_address": ADDRESS[1],
+        "validity_hours": 1,
+        "exp_date": datetime(2030, 1, 1, tzinfo=timezone.utc),
+        "card_limit": 5.0,
+        "card_nickname": "Auto-Import 5.0",
+    }
+
+
+async def run(url: str, count: int):
+    engine, Session = make_async_session_factory(url)
+    async with Session() as db:
+        existing = [card_id for (card_id,) in (await db.execute(
+            select(models.Card.card_id).where(models.Card.is_activated.is_(False)).limit(count)
+        )).all()]
+
+        # 地址第一次写入地址字典，之后命中缓存
+        await crud.upsert_card_activation(db, **activation(existing[0], 0))
+
+        checks = {}
+        for name, card_id in (("已有卡片", existing[1]), ("本地不存在", "ext-roundtrip")):
+            with capture_sql(engine) as statements:
+                card = await crud.upsert_card_activation(db, **activation(card_id, 1))
+            response = schemas.CardResponse.model_validate(card)
+            assert response.is_activated and response.legal_address == ADDRESS[1]
+            checks[name] = len(statements)
+            assert len(statements) == 1, statements
+
+        start = time.perf_counter()
+        for i, card_id in enumerate(existing[2:count // 2]):
+            await crud.upsert_card_activation(db, **activation(card_id, i))
+        single = (count // 2 - 2) / (time.perf_counter() - start)
+
+        batch = [activation(card_id, i) for i, card_id in enumerate(existing[count // 2:])]
+        batch += [activation(f"ext-{i}", i) for i in range(count // 2)]
+        start = time.perf_counter()
+        for offset in range(0, len(batch), 50):
+            await crud.save_card_activations(db, batch[offset:offset + 50])
+        grouped = len(batch) / (time.perf_counter() - start)
+    await engine.dispose()
+    return checks, single, grouped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="激活写入往返次数检查和吞吐对比")
+    parser.add_argument("--cards", type=int, default=2000, help="激活写入的卡片数量")
+    args = parser.parse_args()
+
+    url = temp_database_url()
+    try:
+        alembic_upgrade(url)
+        engine, _ = make_session_factory(url)
+        seed_cards(engine, args.cards * 3)
+        engine.dispose()
+        checks, single, grouped = asyncio.run(run(url, args.cards))
+    finally:
+        remove_database(url)
+
+    for name, statements in checks.items():
+        print(f"{name}: {statements} 条 SQL（upsert ... RETURNING）+ 提交")
+    print(f"单条 upsert：{single:.0f} 张/秒")
+    print(f"分组写入（每组 50 张）：{grouped:.0f} 张/秒")
+
+
+if __name__ == "__main__":
+    main()
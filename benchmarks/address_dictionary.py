@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+地址字典基准：cards 表逐行保存地址字符串 + JSON（0005）与 address_id 引用地址字典（0006）对比
+
+在 0005 版本写入测试卡片并为已激活的卡填入默认地址，测量后迁移到 0006 再测量：
+- cards 表占用的页数（VACUUM 后）
+- 全表读取并解析地址的耗时（原来每行 json.loads，现在按 address_id 查缓存）
+
+用法：
+    python benchmarks/address_dictionary.py --cards 50000
+"""
+import argparse
+import json
+import random
+
+from sqlalchemy import bindparam, text
+
+from common import alembic_upgrade, make_session_factory, remove_database, seed_cards, temp_database_url, timed
+
+from app.utils.addresses import AddressCache, decode_legal_address
+
+# 渠道模块中硬编码的默认地址
+DEFAULT_ADDRESSES = [
+    ("120 Avenida Martínez Campos, Alcantarilla, MC, 30820, Spain", {
+        "address1": "120 Avenida Martínez Campos", "city": "Alcantarilla", "state": "MC",
+        "postal_code": "30820", "country": "Spain",
+    }),
+    ("41 Glenn Rd C23, East Hartford, CT 06118", {
+        "address1": "41 Glenn Rd C23", "city": "East Hartford", "state": "CT",
+        "postal_code": "06118", "country": "US",
+    }),
+    ("2 Chome-1-1 Nishishinjuku, Shinjuku City, Tokyo 163-0890", {
+        "address1": "2 Chome-1-1 Nishishinjuku", "city": "Shinjuku City", "state": "Tokyo",
+        "postal_code": "163-0890", "country": "JP",
+        "full": "2 Chome-1-1 Nishishinjuku, Shinjuku City, Tokyo 163-0890",
+    }),
+]
+
+
+def cards_pages(engine) -> int:
+    """cards 表（含索引）占用的页数"""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+        try:
+            return conn.exec_driver_sql(
+                "SELECT COUNT(*) FROM dbstat WHERE name = 'cards'"
+            ).scalar_one()
+        except Exception:
+            return conn.exec_driver_sql("PRAGMA page_count").scalar_one()
+
+
+def fill_addresses(engine) -> int:
+    """为已激活的卡片填入默认地址（0005 的逐行存储格式）"""
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        ids = conn.exec_driver_sql("SELECT id FROM cards WHERE is_activated = 1").scalars().all()
+        rows = []
+        for pk in ids:
+            billing, legal = rng.choice(DEFAULT_ADDRESSES)
+            rows.append({"pk": pk, "b": billing, "l": json.dumps(legal, ensure_ascii=False)})
+        conn.execute(
+            text("UPDATE cards SET billing_address = :b, legal_address = :l WHERE id = :pk").bindparams(
+                bindparam("pk"), bindparam("b"), bindparam("l")
+            ),
+            rows
+        )
+    return len(ids)
+
+
+def read_inline(engine) -> None:
+    with engine.connect() as conn:
+        for row in conn.exec_driver_sql("SELECT * FROM cards").mappings():
+            row["billing_address"]
+            decode_legal_address(row["legal_address"])
+
+
+def read_dictionary(engine) -> None:
+    cache = AddressCache()
+    with engine.connect() as conn:
+        for row in conn.exec_driver_sql("SELECT id, fingerprint, billing_address, legal_address FROM addresses"):
+            cache.add(*row)
+        for row in conn.exec_driver_sql("SELECT * FROM cards").mappings():
+            cache.billing_address(row["address_id"])
+            cache.legal_address(row["address_id"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐行地址与地址字典的存储和读取对比")
+    parser.add_argument("--cards", type=int, default=50000, help="测试卡片数量")
+    args = parser.parse_args()
+
+    url = temp_database_url()
+    try:
+        alembic_upgrade(url, "0005")
+        engine, _ = make_session_factory(url)
+        print(f"正在写入 {args.cards} 张测试卡片...")
+        seed_cards(engine, args.cards)
+        with_address = fill_addresses(engine)
+        before_pages = cards_pages(engine)
+        before_ms = timed(lambda: read_inline(engine))
+        engine.dispose()
+
+        alembic_upgrade(url, "0006")
+        engine, _ = make_session_factory(url)
+        with engine.connect() as conn:
+            address_count = conn.exec_driver_sql("SELECT COUNT(*) FROM addresses").scalar_one()
+        after_pages = cards_pages(engine)
+        after_ms = timed(lambda: read_dictionary(engine))
+        engine.dispose()
+    finally:
+        remove_database(url)
+
+    print(f"带地址的卡片 {with_address} 张，迁移后地址字典 {address_count} 条")
+    print(f"{'':<16}{'cards 页数':>12}{'全表读取(ms)':>16}")
+    print(f"{'逐行存储(0005)':<16}{before_pages:>12}{before_ms:>16.1f}")
+    print(f"{'地址字典(0006)':<16}{after_pages:>12}{after_ms:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+基准脚本公共工具：临时数据库、造数、计时
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import to_async_url
+from app.utils.expiry import exp_date_to_epoch
+
+STATUSES = ["inactive"] * 5 + ["active"] * 3 + ["expired"] * 6 + ["deleted"] * 1
+HEADERS = ["5236", "4462", "4866", "5524", "4034", None]
+LIMITS = [0.0, 1.0, 5.0, 10.0, 20.0]
+
+
+def temp_database_url() -> str:
+    """创建临时 SQLite 数据库文件，返回连接地址"""
+    fd, path = tempfile.mkstemp(prefix="misacard-bench-", suffix=".db")
+    os.close(fd)
+    return f"sqlite:///{path}"
+
+
+def remove_database(url: str) -> None:
+    path = url.replace("sqlite:///", "", 1)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def make_session_factory(url: str):
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def make_async_session_factory(url: str):
+    """与应用相同配置的异步引擎和会话工厂"""
+    engine = create_async_engine(to_async_url(url))
+    return engine, async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+
+def alembic_upgrade(url: str, revision: str = "head") -> None:
+    """将临时数据库迁移到指定版本"""
+    from alembic import command
+    from alembic.config import Config
+
+    cfg = Config(str(ROOT / "alembic.ini"))
+    cfg.set_main_option("sqlalchemy.url", url)
+    cfg.attributes["configure_logger"] = False
+    command.upgrade(cfg, revision)
+
+
+def drop_schema_objects(engine, names: list[str]) -> list[str]:
+    """
+    删除指定名称的索引/表/触发器，返回建立它们的 SQL（按参数顺序），供 restore_schema_objects 重建
+
+    ORM 模型始终对应最新表结构，基准脚本迁移到 head 后删除要对比的对象来模拟旧版本
+    """
+    kinds = {"index": "INDEX", "table": "TABLE", "trigger": "TRIGGER"}
+    statements = []
+    with engine.begin() as conn:
+        for name in names:
+            kind, sql = conn.execute(
+                text("SELECT type, sql FROM sqlite_master WHERE name = :name"), {"name": name}
+            ).one()
+            statements.append(sql)
+            conn.execute(text(f"DROP {kinds[kind]} {name}"))
+    return statements
+
+
+def restore_schema_objects(engine, statements: list[str]) -> None:
+    with engine.begin() as conn:
+        for sql in statements:
+            conn.execute(text(sql))
+
+
+def fake_card_row(i: int, rng: random.Random) -> dict:
+    """生成一条接近真实分布的卡片数据"""
+    status = rng.choice(STATUSES)
+    activated = status in ("active", "expired") or (status == "deleted" and rng.random() < 0.5)
+    exp_date = None
+    if activated:
+        exp_date = datetime(2026, 1, 1) + timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+    header = rng.choice(HEADERS)
+    return {
+        "card_id": f"mio-{uuid.UUID(int=rng.getrandbits(128))}",
+        "card_nickname": f"Card {i:06d}",
+        "card_header": header,
+        "card_number": f"{header or '5236'}{rng.randint(0, 10**12 - 1):012d}" if activated else None,
+        "card_cvc": f"{rng.randint(0, 999):03d}" if activated else None,
+        "card_exp_date": "12/31" if activated else None,
+        "card_limit": rng.choice(LIMITS),
+        "validity_hours": 1,
+        "status": status,
+        "is_activated": activated,
+        "exp_date": exp_date,
+        "exp_epoch": exp_date_to_epoch(exp_date),
+        "refund_requested": activated and rng.random() < 0.2,
+        "is_used": activated and rng.random() < 0.6,
+        "is_sold": rng.random() < 0.4,
+        "is_external": False,
+    }
+
+
+def seed_cards(engine, count: int, seed: int = 42, batch_size: int = 5000) -> None:
+    """批量写入 count 张测试卡片"""
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        for start in range(0, count, batch_size):
+            rows = [fake_card_row(i, rng) for i in range(start, min(start + batch_size, count))]
+            conn.execute(insert(models.Card.__table__), rows)
+
+
+@contextmanager
+def capture_sql(engine):
+    """捕获执行过的 SQL 语句及参数（engine 可为同步或异步引擎）"""
+    engine = getattr(engine, "sync_engine", engine)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def timed(func, repeat: int = 5) -> float:
+    """执行 repeat 次，返回最快一次的耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def timed_async(func, repeat: int = 5) -> float:
+    """异步版本的 timed，func 为返回协程的函数"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+JSON 编解码基准：标准库 json 与 orjson（app/utils/json_codec.py）对比
+
+- 列表响应：10000 张卡片的 CardListResponse，FastAPI 先转换为 JSON 兼容对象，再由响应类 render
+- 精简列表：fields= 模式的字典列表直接序列化
+- 上游响应解析：渠道模块解析兑换接口响应（response.json() 与 response_json()）
+- 激活日志：原来每次激活都执行的 json.dumps(indent=2) 格式化输出
+
+用法：
+    python benchmarks/json_codec.py --cards 10000
+"""
+import argparse
+import json
+import random
+from datetime import datetime
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from common import fake_card_row, timed
+
+from app import schemas
+from app.utils import json_codec
+
+# 典型的兑换接口响应（Mercury 格式）
+PROVIDER_PAYLOAD = {
+    "success": True,
+    "message": "Key redeemed successfully",
+    "card": {
+        "id": "c0a8f3b2-1d2e-4f5a-9b8c-7d6e5f4a3b2c",
+        "pan": "5236001234567890",
+        "cvv": "123",
+        "exp_month": "11",
+        "exp_year": "2031",
+        "status": "active",
+        "limit": 10.0,
+        "expire_time": "2026-10-17T06:50:13.418303+00:00",
+        "billing_address": {
+            "line1": "1234 Market Street", "city": "San Francisco", "state": "CA",
+            "postal_code": "94103", "country": "US",
+        },
+        "holder": {"first_name": "John", "last_name": "Doe"},
+        "transactions": [
+            {"id": i, "amount": 1.5 * i, "merchant": f"Merchant {i}", "time": "2026-10-16T10:00:00Z"}
+            for i in range(5)
+        ],
+    },
+}
+
+
+def make_page(count: int) -> list[dict]:
+    rng = random.Random(1)
+    rows = []
+    for i in range(count):
+        row = fake_card_row(i, rng)
+        row.update(id=i + 1, create_time=datetime(2026, 10, 16, 12, 0, 0))
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标准库 json 与 orjson 编解码耗时对比")
+    parser.add_argument("--cards", type=int, default=10000, help="列表响应的卡片数量")
+    parser.add_argument("--payloads", type=int, default=10000, help="解析的上游响应数量")
+    args = parser.parse_args()
+
+    rows = make_page(args.cards)
+    items = [schemas.CardResponse.model_validate(row) for row in rows]
+    page = schemas.CardListResponse(items=items, total=len(items), skip=0, limit=len(items))
+    content = jsonable_encoder(page)
+    lean_rows = [{key: row[key] for key in ("id", "card_id", "card_number", "status", "card_limit", "exp_date")} for row in rows]
+
+    body = json.dumps(PROVIDER_PAYLOAD).encode()
+    responses = [httpx.Response(200, content=body) for _ in range(args.payloads)]
+
+    cases = [
+        (
+            f"列表响应 render（{args.cards} 张）",
+            lambda: JSONResponse(content).body,
+            lambda: ORJSONResponse(content).body,
+        ),
+        (
+            f"精简列表序列化（{args.cards} 张）",
+            lambda: json.dumps(lean_rows, default=lambda v: v.isoformat(), ensure_ascii=False, separators=(",", ":")),
+            lambda: json_codec.dumps(lean_rows),
+        ),
+        (
+            f"上游响应解析（{args.payloads} 次）",
+            lambda: [response.json() for response in responses],
+            lambda: [json_codec.response_json(response) for response in responses],
+        ),
+        (
+            f"激活响应格式化（{args.payloads} 次）",
+            lambda: [json.dumps(PROVIDER_PAYLOAD, ensure_ascii=False, indent=2) for _ in range(args.payloads)],
+            lambda: [json_codec.dumps(PROVIDER_PAYLOAD) for _ in range(args.payloads)],
+        ),
+    ]
+
+    # 两种编码的结果等价
+    assert json.loads(JSONResponse(content).body) == json_codec.loads(ORJSONResponse(content).body)
+
+    print(f"{'场景':<28}{'json(ms)':>12}{'orjson(ms)':>12}{'加速':>8}")
+    for name, baseline, fast in cases:
+        baseline_ms = timed(baseline)
+        fast_ms = timed(fast)
+        print(f"{name:<28}{baseline_ms:>12.2f}{fast_ms:>12.2f}{baseline_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
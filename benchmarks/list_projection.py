@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+列表基准：对比完整模式（ORM 对象 + CardResponse 逐行校验）与精简模式（fields=，Core 查询指定列直接返回字典）
+经由 ASGI 调用 GET /api/cards/，包含查询、构造和 JSON 序列化的完整耗时；基准期间关闭列表缓存
+
+用法：
+    python benchmarks/list_projection.py --cards 50000 --limit 10000
+"""
+import argparse
+import asyncio
+
+import httpx
+
+from common import (
+    alembic_upgrade, make_async_session_factory, make_session_factory,
+    remove_database, seed_cards, temp_database_url, timed_async
+)
+
+from app.main import app
+from app.database import get_async_db
+from app.utils.auth import get_current_user
+from app.utils.cache import card_list_cache
+
+MODES = {
+    "完整模式": None,
+    "精简：列表常用列": "card_id,card_number,card_header,card_limit,status,is_activated,is_sold,is_used,exp_date",
+    "精简：全部字段": ",".join([
+        "card_id", "card_nickname", "card_header", "card_number", "card_cvc", "card_exp_date",
+        "billing_address", "legal_address", "card_limit", "validity_hours", "status", "is_activated",
+        "create_time", "card_activation_time", "exp_date", "delete_date", "refund_requested",
+        "refund_requested_time", "is_used", "used_time", "is_sold", "sold_time", "is_external",
+    ]),
+}
+
+
+async def run(url: str, limit: int, repeat: int):
+    engine, Session = make_async_session_factory(url)
+
+    async def get_db():
+        async with Session() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = get_db
+    app.dependency_overrides[get_current_user] = lambda: {"username": "bench"}
+    card_list_cache.maxsize = 0
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, fields in MODES.items():
+            params = {"limit": limit, "exclude_deleted": "true"}
+            if fields:
+                params["fields"] = fields
+            response = await client.get("/api/cards/", params=params)
+            response.raise_for_status()
+            ms = await timed_async(lambda: client.get("/api/cards/", params=params), repeat=repeat)
+            results[name] = (ms, len(response.content), len(response.json()["items"]))
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="完整模式与精简模式的列表接口耗时对比")
+    parser.add_argument("--cards", type=int, default=50000, help="测试卡片数量")
+    parser.add_argument("--limit", type=int, default=10000, help="每页条数")
+    parser.add_argument("--repeat", type=int, default=5, help="每种模式的重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    url = temp_database_url()
+    try:
+        alembic_upgrade(url)
+        engine, _ = make_session_factory(url)
+        print(f"正在写入 {args.cards} 张测试卡片...")
+        seed_cards(engine, args.cards)
+        engine.dispose()
+        results = asyncio.run(run(url, args.limit, args.repeat))
+    finally:
+        remove_database(url)
+
+    baseline = results["完整模式"][0]
+    print(f"\n{'模式':<20}{'耗时(ms)':>12}{'响应(KB)':>12}{'条数':>8}{'加速':>8}")
+    for name, (ms, size, count) in results.items():
+        print(f"{name:<20}{ms:>12.1f}{size / 1024:>12.0f}{count:>8}{baseline / ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+cards 表索引基准：对比迁移 0002（筛选索引）前后的查询计划与耗时
+（数据库迁移到最新版本，删除/重建 0002 的索引做对比）
+
+用法：
+    python benchmarks/query_plans.py --cards 100000
+"""
+import argparse
+import asyncio
+
+from common import (
+    alembic_upgrade, capture_sql, drop_schema_objects, make_async_session_factory, make_session_factory,
+    remove_database, restore_schema_objects, seed_cards, temp_database_url, timed_async
+)
+
+from sqlalchemy import text
+
+from app import crud, models
+
+# 管理界面实际发送的筛选组合（见 templates/index.html 中 loadCards / loadDashboard）
+LIST_FILTERS = {
+    "默认列表（排除已删除）": dict(exclude_deleted=True),
+    "未售卖": dict(exclude_deleted=True, is_sold=False),
+    "未售卖 + 未使用": dict(exclude_deleted=True, is_sold=False, is_used=False),
+    "已申请退款": dict(exclude_deleted=True, refund_requested=True),
+    "额度 = 10": dict(exclude_deleted=True, card_limit=10.0),
+    "状态 = expired + 已使用": dict(status="expired", is_used=True),
+    "状态 = active + 未售卖": dict(status="active", is_sold=False),
+}
+
+
+# 迁移 0002 建立的索引（0001 只有 exp_epoch 全量索引）
+FILTER_INDEXES = [
+    "ix_cards_status_sold_used", "ix_cards_live_sold_used", "ix_cards_live_refund",
+    "ix_cards_live_limit", "ix_cards_pending_expiry",
+]
+
+
+async def explain(db, statement, params) -> str:
+    conn = await db.connection()
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params)
+    return " / ".join(row[-1] for row in result.all())
+
+
+async def run_list_queries(url: str):
+    """执行所有列表查询，返回 {名称: (耗时, [查询计划])}"""
+    engine, Session = make_async_session_factory(url)
+    results = {}
+    async with Session() as db:
+        for name, filters in LIST_FILTERS.items():
+            with capture_sql(engine) as statements:
+                await crud.get_cards(db, skip=0, limit=100, **filters)
+            ms = await timed_async(lambda: crud.get_cards(db, skip=0, limit=100, **filters))
+            plans = [
+                await explain(db, statement, params)
+                for statement, params in statements
+                if "sqlite_master" not in statement
+            ]
+            results[name] = (ms, plans)
+
+        with capture_sql(engine) as statements:
+            await crud.update_expired_cards(db)
+        plan = await explain(db, *statements[0])
+        ms = await timed_async(lambda: crud.update_expired_cards(db))
+        results["过期扫描 UPDATE"] = (ms, [plan])
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cards 表索引前后查询计划对比")
+    parser.add_argument("--cards", type=int, default=100000, help="测试卡片数量")
+    args = parser.parse_args()
+
+    url = temp_database_url()
+    try:
+        # 迁移到最新版本后删除 0002 的索引、恢复 0001 的 exp_epoch 索引，模拟建索引之前
+        alembic_upgrade(url)
+        engine, Session = make_session_factory(url)
+        index_sql = drop_schema_objects(engine, FILTER_INDEXES)
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM sqlite_stat1"))
+            conn.execute(text("CREATE INDEX ix_cards_exp_epoch ON cards (exp_epoch)"))
+        print(f"正在写入 {args.cards} 张测试卡片...")
+        seed_cards(engine, args.cards)
+
+        before = asyncio.run(run_list_queries(url))
+
+        drop_schema_objects(engine, ["ix_cards_exp_epoch"])
+        restore_schema_objects(engine, index_sql + ["ANALYZE cards"])
+        engine.dispose()
+        after = asyncio.run(run_list_queries(url))
+    finally:
+        remove_database(url)
+
+    for name in before:
+        before_ms, before_plans = before[name]
+        after_ms, after_plans = after[name]
+        print(f"\n=== {name} ===")
+        print(f"  索引前: {before_ms:8.2f} ms")
+        for plan in before_plans:
+            print(f"      {plan}")
+        print(f"  索引后: {after_ms:8.2f} ms")
+        for plan in after_plans:
+            print(f"      {plan}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+搜索基准：对比 LIKE '%x%' 全表扫描与 FTS5 trigram 索引（迁移 0003）的搜索耗时
+（数据库迁移到最新版本，删除/重建全文索引做对比）
+
+用法：
+    python benchmarks/search_fts.py --cards 100000
+"""
+import argparse
+import asyncio
+
+from common import (
+    alembic_upgrade, drop_schema_objects, make_async_session_factory, make_session_factory,
+    remove_database, restore_schema_objects, seed_cards, temp_database_url, timed_async
+)
+
+from sqlalchemy import text
+
+from app import crud
+
+# 运营人员常用的搜索：卡号片段、卡密片段、昵称、批次卡头
+SEARCHES = {
+    "卡号片段 search=123456": dict(search="123456"),
+    "卡号后四位 search=8842": dict(search="8842"),
+    "卡密片段 search=3f2a": dict(search="3f2a"),
+    "昵称 search=Card 0420": dict(search="Card 0420"),
+    "卡头 card_header=4462": dict(card_header="4462", exclude_deleted=True),
+    "卡头 + 搜索": dict(card_header="5236", search="0001"),
+}
+
+
+# 迁移 0003 建立的全文索引表和同步触发器
+FTS_OBJECTS = ["cards_fts_ai", "cards_fts_ad", "cards_fts_au", "cards_fts"]
+
+
+async def run_searches(url: str):
+    """执行所有搜索，返回 ({名称: (耗时, 总数, 首页 id)}, 是否使用了全文索引)"""
+    engine, Session = make_async_session_factory(url)
+    results = {}
+    async with Session() as db:
+        fts = await crud.has_card_fts(db)
+        for name, filters in SEARCHES.items():
+            cards, total = await crud.get_cards(db, skip=0, limit=100, **filters)
+            ms = await timed_async(lambda: crud.get_cards(db, skip=0, limit=100, **filters))
+            results[name] = (ms, total, [card.id for card in cards])
+    await engine.dispose()
+    return results, fts
+
+
+def has_fts_table(engine) -> bool:
+    """迁移 0003 在不支持 FTS5 trigram 的 SQLite 上不建全文索引"""
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'cards_fts'")).first() is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LIKE 与 FTS5 trigram 搜索耗时对比")
+    parser.add_argument("--cards", type=int, default=100000, help="测试卡片数量")
+    args = parser.parse_args()
+
+    url = temp_database_url()
+    try:
+        # 迁移到最新版本后删除全文索引，先测 LIKE，再重建全文索引
+        alembic_upgrade(url)
+        engine, Session = make_session_factory(url)
+        fts_sql = drop_schema_objects(engine, FTS_OBJECTS) if has_fts_table(engine) else []
+        print(f"正在写入 {args.cards} 张测试卡片...")
+        seed_cards(engine, args.cards)
+        like_results, _ = asyncio.run(run_searches(url))
+
+        # 表在前、触发器在后重建，并从 cards 表重新填充索引
+        restore_schema_objects(engine, fts_sql[::-1] + (["INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')"] if fts_sql else []))
+        engine.dispose()
+        fts_results, fts = asyncio.run(run_searches(url))
+        if not fts:
+            print("⚠️  当前 SQLite 不支持 FTS5 trigram 分词，无法对比")
+            return
+    finally:
+        remove_database(url)
+
+    print(f"\n{'搜索':<28}{'LIKE(ms)':>12}{'FTS5(ms)':>12}{'加速':>10}{'结果一致':>10}")
+    for name, (like_ms, like_total, like_ids) in like_results.items():
+        fts_ms, fts_total, fts_ids = fts_results[name]
+        same = like_total == fts_total and like_ids == fts_ids
+        print(f"{name:<28}{like_ms:>12.2f}{fts_ms:>12.2f}{like_ms / fts_ms:>9.1f}x{'✓' if same else '✗':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,18 +9,18 @@ from pathlib import Path
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app.database import engine, Base
-from app.models import Card, ActivationLog
+from app.database import engine, Base, run_migrations
+import app.models  # noqa: F401  导入模型以注册到 Base.metadata（建表列表、drop_all 使用）
 
 
 def init_database():
-    """初始化数据库，创建所有表"""
+    """初始化数据库，执行 Alembic 迁移创建/升级所有表"""
     print("正在初始化数据库...")
     print(f"数据库引擎: {engine.url}")
 
     try:
-        # 创建所有表
-        Base.metadata.create_all(bind=engine)
+        # 执行迁移到最新版本
+        run_migrations()
         print("✅ 数据库初始化成功！")
         print(f"✅ 已创建表: {', '.join(Base.metadata.tables.keys())}")
         return True
@@ -63,6 +63,10 @@ def drop_all_tables():
     if confirm.lower() == 'yes':
         try:
             Base.metadata.drop_all(bind=engine)
+            with engine.begin() as conn:
+                # 迁移脚本直接维护、不在模型中声明的表
+                conn.exec_driver_sql("DROP TABLE IF EXISTS cards_fts")
+                conn.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
             print("✅ 已删除所有表")
             return True
         except Exception as e:
@@ -73,13 +77,38 @@ def drop_all_tables():
         return False
 
 
+def reconcile_counters():
+    """从 cards 全量重算 card_counters，报告并修复计数偏差"""
+    print("\n正在对账卡片计数...")
+    try:
+        from app.utils.counters import reconcile_card_counters
+        with engine.begin() as conn:
+            drift = reconcile_card_counters(conn)
+
+        if not drift:
+            print("✅ 计数与实际数据一致")
+            return True
+
+        print(f"⚠️  发现 {len(drift)} 个分组存在偏差（已按实际数据修正）:")
+        for item in drift:
+            print(
+                f"  - {item['bucket']} / 售卖={item['is_sold']} / 卡头={item['card_header']}: "
+                f"数量 {item['actual_count']} -> {item['expected_count']}, "
+                f"额度 {item['actual_limit']:.2f} -> {item['expected_limit']:.2f}"
+            )
+        return True
+    except Exception as e:
+        print(f"❌ 对账失败: {e}")
+        return False
+
+
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description='MisaCard 数据库管理工具')
     parser.add_argument('action',
-                       choices=['init', 'check', 'reset'],
-                       help='操作: init(初始化), check(检查), reset(重置)')
+                       choices=['init', 'check', 'reset', 'reconcile'],
+                       help='操作: init(初始化), check(检查), reset(重置), reconcile(计数对账)')
 
     args = parser.parse_args()
 
@@ -92,5 +121,7 @@ if __name__ == "__main__":
         if drop_all_tables():
             init_database()
             check_database()
+    elif args.action == 'reconcile':
+        reconcile_counters()
 
     print("\n完成！")
@@ -0,0 +1,125 @@
+"""基线：cards / activation_logs 表结构
+
+兼容已有数据库：表不存在则创建；表已存在则补齐历史版本中缺失的字段
+（is_sold、is_external、exp_epoch 等，取代原来的 migrate_add_*.py 脚本）
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.expiry import exp_date_to_epoch
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _card_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("card_id", sa.String(), nullable=False),
+        sa.Column("card_nickname", sa.String(), nullable=True),
+        sa.Column("card_header", sa.String(), nullable=True),
+        sa.Column("card_number", sa.String(), nullable=True),
+        sa.Column("card_cvc", sa.String(), nullable=True),
+        sa.Column("card_exp_date", sa.String(), nullable=True),
+        sa.Column("billing_address", sa.String(), nullable=True),
+        sa.Column("legal_address", sa.String(), nullable=True),
+        sa.Column("card_limit", sa.Float(), nullable=True),
+        sa.Column("validity_hours", sa.Integer(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("is_activated", sa.Boolean(), nullable=True),
+        sa.Column("create_time", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("card_activation_time", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("exp_date", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("delete_date", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("refund_requested", sa.Boolean(), nullable=True),
+        sa.Column("refund_requested_time", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_used", sa.Boolean(), nullable=True),
+        sa.Column("used_time", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_sold", sa.Boolean(), nullable=True),
+        sa.Column("sold_time", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_external", sa.Boolean(), nullable=True),
+        sa.Column("exp_epoch", sa.Integer(), nullable=True),
+    ]
+
+
+# 历史版本中后加的布尔字段，补列时需要回填默认值
+_BOOLEAN_DEFAULTS = {"refund_requested", "is_used", "is_sold", "is_external"}
+
+
+def _add_missing_card_columns(bind) -> None:
+    existing = {col["name"] for col in sa.inspect(bind).get_columns("cards")}
+    for column in _card_columns():
+        if column.name in existing:
+            continue
+        # server_default 为 now() 的列无法通过 ALTER TABLE 添加，这里只补可空列
+        column.server_default = None
+        op.add_column("cards", column)
+        if column.name in _BOOLEAN_DEFAULTS:
+            op.execute(f"UPDATE cards SET {column.name} = 0 WHERE {column.name} IS NULL")
+
+
+def _backfill_exp_epoch(bind) -> None:
+    cards = sa.table(
+        "cards",
+        sa.column("id", sa.Integer()),
+        sa.column("exp_date", sa.DateTime(timezone=True)),
+        sa.column("exp_epoch", sa.Integer()),
+    )
+    rows = bind.execute(
+        sa.select(cards.c.id, cards.c.exp_date).where(
+            cards.c.exp_date.isnot(None),
+            cards.c.exp_epoch.is_(None)
+        )
+    ).all()
+    if rows:
+        bind.execute(
+            sa.update(cards).where(cards.c.id == sa.bindparam("pk")),
+            [{"pk": pk, "exp_epoch": exp_date_to_epoch(exp_date)} for pk, exp_date in rows]
+        )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    tables = set(sa.inspect(bind).get_table_names())
+
+    if "cards" not in tables:
+        op.create_table("cards", *_card_columns())
+    else:
+        _add_missing_card_columns(bind)
+        _backfill_exp_epoch(bind)
+
+    existing_indexes = {ix["name"] for ix in sa.inspect(bind).get_indexes("cards")}
+    for name, columns, unique in (
+        ("ix_cards_id", ["id"], False),
+        ("ix_cards_card_id", ["card_id"], True),
+        ("ix_cards_exp_epoch", ["exp_epoch"], False),
+    ):
+        if name not in existing_indexes:
+            op.create_index(name, "cards", columns, unique=unique)
+
+    if "activation_logs" not in tables:
+        op.create_table(
+            "activation_logs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("card_id", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("error_message", sa.String(), nullable=True),
+            sa.Column("activation_time", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("response_data", sa.String(), nullable=True),
+        )
+        op.create_index("ix_activation_logs_id", "activation_logs", ["id"])
+        op.create_index("ix_activation_logs_card_id", "activation_logs", ["card_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("activation_logs")
+    op.drop_table("cards")
@@ -0,0 +1,61 @@
+"""cards 表筛选索引
+
+按管理界面实际发送的筛选组合建立复合索引 / 部分索引：
+- 列表默认带 exclude_deleted（status != 'deleted'），再叠加 售卖/使用/退款/额度 筛选
+- 指定 status 时叠加 售卖/使用 筛选
+- 按额度查询卡密（card_limit = ? AND status != 'deleted'）
+- 过期调度（exp_epoch <= ? AND status 未删除未过期），替换原来的 exp_epoch 全量索引
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+NOT_DELETED = sa.text("status != 'deleted'")
+PENDING_EXPIRY = sa.text("status != 'deleted' AND status != 'expired'")
+
+
+def upgrade() -> None:
+    op.drop_index("ix_cards_exp_epoch", table_name="cards")
+
+    op.create_index("ix_cards_status_sold_used", "cards", ["status", "is_sold", "is_used"])
+    op.create_index(
+        "ix_cards_live_sold_used", "cards", ["is_sold", "is_used"],
+        sqlite_where=NOT_DELETED, postgresql_where=NOT_DELETED
+    )
+    op.create_index(
+        "ix_cards_live_refund", "cards", ["refund_requested"],
+        sqlite_where=NOT_DELETED, postgresql_where=NOT_DELETED
+    )
+    op.create_index(
+        "ix_cards_live_limit", "cards", ["card_limit"],
+        sqlite_where=NOT_DELETED, postgresql_where=NOT_DELETED
+    )
+    op.create_index(
+        "ix_cards_pending_expiry", "cards", ["exp_epoch"],
+        sqlite_where=PENDING_EXPIRY, postgresql_where=PENDING_EXPIRY
+    )
+
+    # 收集统计信息，供查询规划器在多个索引间选择
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("ANALYZE cards")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cards_pending_expiry", table_name="cards")
+    op.drop_index("ix_cards_live_limit", table_name="cards")
+    op.drop_index("ix_cards_live_refund", table_name="cards")
+    op.drop_index("ix_cards_live_sold_used", table_name="cards")
+    op.drop_index("ix_cards_status_sold_used", table_name="cards")
+    op.create_index("ix_cards_exp_epoch", "cards", ["exp_epoch"])
@@ -0,0 +1,74 @@
+"""cards 全文索引（FTS5 trigram）
+
+为 card_id / card_nickname / card_number / card_header 建立外部内容 FTS5 表，
+trigram 分词支持任意位置的子串匹配（>= 3 个字符），通过触发器与 cards 表保持同步。
+SQLite 版本不支持 trigram 分词时跳过，查询自动回退为 LIKE。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+FTS_COLUMNS = "card_id, card_nickname, card_number, card_header"
+OLD_VALUES = "old.card_id, old.card_nickname, old.card_number, old.card_header"
+NEW_VALUES = "new.card_id, new.card_nickname, new.card_number, new.card_header"
+
+
+def _trigram_supported(bind) -> bool:
+    try:
+        bind.exec_driver_sql("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize='trigram')")
+        bind.exec_driver_sql("DROP TABLE temp.fts_probe")
+        return True
+    except sa.exc.OperationalError:
+        return False
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite" or not _trigram_supported(bind):
+        return
+
+    op.execute(f"""
+        CREATE VIRTUAL TABLE cards_fts USING fts5(
+            {FTS_COLUMNS},
+            content='cards', content_rowid='id', tokenize='trigram'
+        )
+    """)
+    op.execute(f"""
+        CREATE TRIGGER cards_fts_ai AFTER INSERT ON cards BEGIN
+            INSERT INTO cards_fts(rowid, {FTS_COLUMNS}) VALUES (new.id, {NEW_VALUES});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER cards_fts_ad AFTER DELETE ON cards BEGIN
+            INSERT INTO cards_fts(cards_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES});
+        END
+    """)
+    # 只在被索引的列变化时更新，状态/标记切换不触发全文索引写入
+    op.execute(f"""
+        CREATE TRIGGER cards_fts_au AFTER UPDATE OF {FTS_COLUMNS} ON cards BEGIN
+            INSERT INTO cards_fts(cards_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES});
+            INSERT INTO cards_fts(rowid, {FTS_COLUMNS}) VALUES (new.id, {NEW_VALUES});
+        END
+    """)
+    op.execute("INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute("DROP TRIGGER IF EXISTS cards_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS cards_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS cards_fts_ai")
+    op.execute("DROP TABLE IF EXISTS cards_fts")
@@ -0,0 +1,48 @@
+"""卡片状态计数表
+
+card_counters 按 状态分桶 + 是否售卖 + 卡头 记录卡片数量和额度合计，
+由 cards 上的触发器增量维护，管理界面概览读取计数表而不必扫描 cards。
+建表后从 cards 全量回填；计数偏差可通过 `python init_db.py reconcile` 对账修复。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.counters import TRIGGERS, RECOUNT_SQL
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "card_counters",
+        sa.Column("bucket", sa.String(), primary_key=True),
+        sa.Column("is_sold", sa.Integer(), primary_key=True),
+        sa.Column("card_header", sa.String(), primary_key=True),
+        sa.Column("card_count", sa.Integer(), nullable=False),
+        sa.Column("limit_sum", sa.Float(), nullable=False),
+    )
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    for name, body in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER {name} {body}")
+    op.execute(
+        "INSERT INTO card_counters (bucket, is_sold, card_header, card_count, limit_sum) " + RECOUNT_SQL
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        for name in TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_table("card_counters")
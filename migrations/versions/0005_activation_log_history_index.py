@@ -0,0 +1,33 @@
+"""activation_logs 单卡历史覆盖索引
+
+单卡历史按 card_id 过滤、按 activation_time 倒序，原 card_id 单列索引需要回表再排序；
+新索引 (card_id, activation_time DESC, status, error_message) 覆盖历史接口读取的全部列，
+并取代 card_id 单列索引（前缀相同）。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_activation_logs_card_time", "activation_logs",
+        ["card_id", sa.text("activation_time DESC"), "status", "error_message"]
+    )
+    op.drop_index("ix_activation_logs_card_id", table_name="activation_logs")
+
+
+def downgrade() -> None:
+    op.create_index("ix_activation_logs_card_id", "activation_logs", ["card_id"])
+    op.drop_index("ix_activation_logs_card_time", table_name="activation_logs")
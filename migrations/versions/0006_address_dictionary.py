@@ -0,0 +1,101 @@
+"""地址字典表
+
+cards.billing_address / cards.legal_address 几乎都是少数几个默认地址，每行重复保存完整字符串和 JSON；
+改为去重存放在 addresses 表，cards 只保存 address_id，列表查询扫描的页数更少，
+地址 JSON 每个不同地址只解析一次（进程内缓存，见 app/utils/addresses.py）。
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.addresses import address_fingerprint, decode_legal_address
+
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+cards = sa.table(
+    "cards",
+    sa.column("address_id", sa.Integer()),
+    sa.column("billing_address", sa.String()),
+    sa.column("legal_address", sa.String()),
+)
+addresses = sa.table(
+    "addresses",
+    sa.column("id", sa.Integer()),
+    sa.column("fingerprint", sa.String()),
+    sa.column("billing_address", sa.String()),
+    sa.column("legal_address", sa.String()),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    op.create_table(
+        "addresses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fingerprint", sa.String(), nullable=False),
+        sa.Column("billing_address", sa.String(), nullable=True),
+        sa.Column("legal_address", sa.String(), nullable=True),
+        sa.UniqueConstraint("fingerprint"),
+    )
+    op.add_column("cards", sa.Column("address_id", sa.Integer(), nullable=True))
+
+    # 按不同的 (账单地址, 地址 JSON) 组合建立字典，内容相同但 JSON 字段顺序不同的地址合并为一条
+    pairs = bind.execute(
+        sa.select(cards.c.billing_address, cards.c.legal_address).distinct().where(
+            sa.or_(cards.c.billing_address.isnot(None), cards.c.legal_address.isnot(None))
+        )
+    ).all()
+    address_ids: dict[str, int] = {}
+    updates = []
+    for billing_address, legal_address_json in pairs:
+        legal_address = decode_legal_address(legal_address_json)
+        fingerprint = address_fingerprint(billing_address, legal_address)
+        if fingerprint not in address_ids:
+            address_ids[fingerprint] = bind.execute(
+                sa.insert(addresses).values(
+                    fingerprint=fingerprint,
+                    billing_address=billing_address,
+                    legal_address=legal_address_json if legal_address else None,
+                ).returning(addresses.c.id)
+            ).scalar_one()
+        updates.append({
+            "aid": address_ids[fingerprint],
+            "old_billing": billing_address,
+            "old_legal": legal_address_json,
+        })
+    if updates:
+        bind.execute(
+            sa.update(cards).where(
+                cards.c.billing_address.is_not_distinct_from(sa.bindparam("old_billing")),
+                cards.c.legal_address.is_not_distinct_from(sa.bindparam("old_legal")),
+            ).values(address_id=sa.bindparam("aid")),
+            updates
+        )
+
+    # SQLite >= 3.35 原生支持 DROP COLUMN（会重写表数据，行变小），不影响 cards 上的触发器
+    op.drop_column("cards", "legal_address")
+    op.drop_column("cards", "billing_address")
+
+
+def downgrade() -> None:
+    op.add_column("cards", sa.Column("billing_address", sa.String(), nullable=True))
+    op.add_column("cards", sa.Column("legal_address", sa.String(), nullable=True))
+    for name in ("billing_address", "legal_address"):
+        op.execute(
+            sa.update(cards).where(cards.c.address_id.isnot(None)).values({
+                name: sa.select(addresses.c[name]).where(addresses.c.id == cards.c.address_id).scalar_subquery()
+            })
+        )
+    op.drop_column("cards", "address_id")
+    op.drop_table("addresses")
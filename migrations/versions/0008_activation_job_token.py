@@ -0,0 +1,28 @@
+"""批量激活任务访问令牌
+
+提交任务时生成随机令牌返回给提交者，只保存其 SHA-256 摘要；
+未登录时查询进度、读取结果、取消任务需要在 X-Job-Token 请求头中带上该令牌
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("activation_jobs", sa.Column("token_hash", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("activation_jobs") as batch_op:
+        batch_op.drop_column("token_hash")